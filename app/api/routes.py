@@ -1,58 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session as DBSession
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timezone
-import uuid
+from typing import Literal
 import os
+import json
+import asyncio
 
-from app.database.db import get_db
-from app.database.db import engine, Base
+from app.database.db import get_async_db, new_async_session
 
 from app.database.models import Report
+from business.config import REPORT_EXECUTOR, REPORT_MAX_WAIT_SECONDS, REPORT_SSE_KEEPALIVE_SECONDS
+from business import report_formats
+from business.report_progress import describe_progress
+from business.report_queue import enqueue_report_async
 from business.generate_report import generate_report_data_and_save_csv
+from app.services.store_index import store_status_index
+from app.services.report_download import accepts_gzip, file_etag, etag_matches
+from app.services.report_events import report_events
 
 
 router = APIRouter()
 
+IN_PROGRESS_STATUSES = ("Pending", "Running")
+
 @router.get("/")
 async def read_root():
     return {"message": "Welcome to the Store Monitoring API. Use /trigger_report to start a report."}
     
 
 @router.post("/trigger_report", status_code=status.HTTP_202_ACCEPTED)
-async def trigger_report(background_tasks: BackgroundTasks, db: DBSession = Depends(get_db)):
+async def trigger_report(background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     """
-    Triggers the generation of an uptime/downtime report as a background task.
+    Queues the generation of an uptime/downtime report for a report worker (python -m business.worker),
+    or runs it as a background task of this process with REPORT_EXECUTOR=background.
     Returns a report_id to poll for status.
     """
 
-    report_id = str(uuid.uuid4())
-    
-    new_report = Report(
-        report_id=report_id,
-        status="Pending", 
-        created_at=datetime.now(timezone.utc)
-    )
-    db.add(new_report)
-    db.commit()
-    db.refresh(new_report)
+    report_id = await enqueue_report_async(db)
     print(f"Report {report_id} created with status 'Pending'.")
-    
-    background_tasks.add_task(generate_report_data_and_save_csv, report_id)
-    return {"report_id": report_id, "status": "Queued", "message": "Report generation started in background."}
+
+    if REPORT_EXECUTOR == "background":
+        background_tasks.add_task(generate_report_data_and_save_csv, report_id)
+        return {"report_id": report_id, "status": "Queued", "message": "Report generation started in background."}
+    return {"report_id": report_id, "status": "Queued", "message": "Report queued for a report worker."}
 
 @router.get("/get_report/{report_id}")
-async def get_report(report_id: str, db: DBSession = Depends(get_db)):
+async def get_report(
+    report_id: str,
+    request: Request,
+    report_format: Literal["csv", "parquet"] = Query("csv", alias="format"),
+    wait: float = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Checks the status of a report or returns the generated CSV file if complete.
+    Checks the status of a report or returns the generated file if complete:
+    CSV (gzip-encoded when Accept-Encoding allows it) or Parquet with ?format=parquet.
+    Downloads carry an ETag, answer If-None-Match with 304 and support Range/If-Range.
+    With ?wait=<seconds>, a Pending/Running report is held until its status changes or the wait ends;
+    longer waits are cut to REPORT_MAX_WAIT_SECONDS.
     """
-    report_entry = db.query(Report).filter(Report.report_id == report_id).first()
+    if wait > 0:
+        report_entry = await _wait_for_status_change(db, report_id, min(wait, REPORT_MAX_WAIT_SECONDS))
+    else:
+        report_entry = await _load_report(db, report_id)
 
     if not report_entry:
         raise HTTPException(status_code=404, detail="Report ID not found.")
 
-    if report_entry.status in ["Running", "Pending"]:
-        return {"status": report_entry.status, "message": "Report is still being generated. Please try again later."}
+    if report_entry.status in IN_PROGRESS_STATUSES:
+        return _report_status_body(report_id, report_entry)
     
     if report_entry.status == "Failed":
         raise HTTPException(status_code=500, detail={"status": report_entry.status, "message": f"Report generation failed: {report_entry.error_message}"})
@@ -61,6 +81,144 @@ async def get_report(report_id: str, db: DBSession = Depends(get_db)):
         if not report_entry.report_file_path or not os.path.exists(report_entry.report_file_path):
             raise HTTPException(status_code=500, detail="Report file not found or path invalid. Report status is 'Completed' but file is missing.")
         
-        return FileResponse(report_entry.report_file_path, media_type="text/csv", filename=f"report_{report_id}.csv")
+        return await _report_download_response(request, report_id, report_entry.report_file_path, report_format)
+
+    raise HTTPException(status_code=500, detail="Unexpected report status.")
+
+@router.get("/get_report/{report_id}/events")
+async def stream_report_events(report_id: str):
+    """
+    Server-Sent Events stream of a report: a "status" event on every status change and a "progress"
+    event on every progress update, ending after the Completed or Failed event.
+    """
+    async with new_async_session() as db:
+        report_entry = await _load_report(db, report_id)
+    if not report_entry:
+        raise HTTPException(status_code=404, detail="Report ID not found.")
+
+    return StreamingResponse(
+        _report_event_stream(report_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _load_report(db: AsyncSession, report_id: str):
+    report_entry = (await db.execute(
+        select(Report).where(Report.report_id == report_id).execution_options(populate_existing=True)
+    )).scalars().first()
+    # Ends the read transaction so waiting requests do not hold a pooled connection
+    await db.commit()
+    return report_entry
+
+async def _wait_for_status_change(db: AsyncSession, report_id: str, wait: float):
+    """
+    Re-reads the report whenever its status is notified to have changed (or a recheck is due)
+    until it leaves the status it had on the first read, or `wait` seconds pass.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    async with report_events.subscribe(report_id) as subscription:
+        report_entry = await _load_report(db, report_id)
+        initial_status = report_entry.status if report_entry else None
+        progress_notified = False
+        while report_entry and report_entry.status == initial_status and initial_status in IN_PROGRESS_STATUSES:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            notified_status = await subscription.next_event(remaining)
+            if notified_status == initial_status:
+                # progress update only, read once when the wait ends
+                progress_notified = True
+                continue
+            report_entry = await _load_report(db, report_id)
+            progress_notified = False
+        if progress_notified:
+            report_entry = await _load_report(db, report_id)
+    return report_entry
+
+def _report_status_body(report_id: str, report_entry: Report) -> dict:
+    if report_entry.status in IN_PROGRESS_STATUSES:
+        response = {"status": report_entry.status, "message": "Report is still being generated. Please try again later."}
+        progress = describe_progress(report_entry)
+        if progress is not None:
+            response["progress"] = progress
+        return response
+    if report_entry.status == "Failed":
+        return {"status": report_entry.status, "message": f"Report generation failed: {report_entry.error_message}"}
+    if report_entry.status == "Completed":
+        return {"status": report_entry.status, "message": "Report is ready.", "download_url": f"/get_report/{report_id}"}
+    return {"status": report_entry.status, "message": "Unexpected report status."}
+
+async def _report_event_stream(report_id: str):
+    async with report_events.subscribe(report_id) as subscription, new_async_session() as db:
+        report_entry = await _load_report(db, report_id)
+        last_sent = None
+        while report_entry is not None:
+            state = (report_entry.status, report_entry.progress_updated_at)
+            if state != last_sent:
+                event = "progress" if last_sent is not None and last_sent[0] == report_entry.status else "status"
+                body = json.dumps(jsonable_encoder(_report_status_body(report_id, report_entry)))
+                yield f"event: {event}\ndata: {body}\n\n"
+                last_sent = state
+                if report_entry.status not in IN_PROGRESS_STATUSES:
+                    return
+            else:
+                yield ": keepalive\n\n"
+
+            await subscription.next_event(REPORT_SSE_KEEPALIVE_SECONDS)
+            report_entry = await _load_report(db, report_id)
+
+async def _report_download_response(request: Request, report_id: str, report_filepath: str, report_format: str) -> Response:
+    """
+    Picks the stored representation (building it on first use) and serves it as a file.
+    """
+    headers = {}
+    if report_format == "parquet":
+        variant = report_formats.PARQUET
+    else:
+        variant = report_formats.CSV_GZIP if accepts_gzip(request.headers.get("accept-encoding")) else report_formats.CSV
+        headers["Vary"] = "Accept-Encoding"
+
+    try:
+        variant_path = await run_in_threadpool(report_formats.ensure_report_variant, report_filepath, variant)
+    except Exception as e:
+        if variant != report_formats.CSV_GZIP:
+            raise HTTPException(status_code=500, detail=f"Could not build the {variant} report: {e}")
+        print(f"Report {report_id}: Warning: Could not build the gzip variant ({e}). Serving plain CSV.")
+        variant, variant_path = report_formats.CSV, report_filepath
+
+    stat_result = os.stat(variant_path)
+    etag = file_etag(stat_result, variant)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, **headers})
+
+    if variant == report_formats.CSV_GZIP:
+        headers["Content-Encoding"] = "gzip"
+
+    extension = "parquet" if variant == report_formats.PARQUET else "csv"
+    return FileResponse(
+        variant_path,
+        media_type=report_formats.MEDIA_TYPES[variant],
+        filename=f"report_{report_id}.{extension}",
+        stat_result=stat_result,
+        headers={"ETag": etag, **headers}
+    )
+
+# Plain def: the first call loads the index and runs in the threadpool instead of the event loop
+@router.get("/stores/{store_id}/uptime")
+def get_store_uptime(store_id: str, start: datetime = None, end: datetime = None):
+    """
+    Returns one store's uptime/downtime for the report windows ending at `end` (default: the
+    report end), or for the single window [start, end) when `start` is given, at most
+    STORE_INDEX_MAX_WINDOW long (422 otherwise). Naive datetimes are taken as UTC.
+    """
+    start_utc = start.replace(tzinfo=timezone.utc) if start and start.tzinfo is None else start
+    end_utc = end.replace(tzinfo=timezone.utc) if end and end.tzinfo is None else end
 
-    raise HTTPException(status_code=500, detail="Unexpected report status.")
\ No newline at end of file
+    try:
+        store_uptime = store_status_index.get_store_uptime(store_id, start_utc, end_utc)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if store_uptime is None:
+        raise HTTPException(status_code=404, detail="Store ID not found.")
+    return store_uptime
\ No newline at end of file
@@ -1,16 +1,48 @@
 import os
+import asyncio
+import importlib
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 load_dotenv()
 
+# after load_dotenv, so the settings in .env apply
+from business.config import INGEST_WORKERS
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("No DATABASE_URL set")
 
+# Connection pool of each engine (per process): connections kept open, extra connections
+# allowed under load, and seconds a checkout waits for a free connection.
+# The default covers one connection per ingestion worker plus the ingestion's own
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", max(5, INGEST_WORKERS + 1)))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+def _to_async_url(database_url: str) -> str:
+    """
+    postgresql://... (or postgres://, postgresql+psycopg2://) -> postgresql+asyncpg://...
+    """
+    scheme, separator, rest = database_url.partition("://")
+    if scheme.split("+")[0] in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    return database_url
+
+# asyncpg does not take libpq query parameters such as sslmode; set ASYNC_DATABASE_URL when DATABASE_URL has them
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
 try:
-    engine = create_engine(DATABASE_URL, echo=False)
+    engine = create_engine(
+        DATABASE_URL,
+        echo=False,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_pre_ping=True
+    )
     Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     Base = declarative_base()
 except Exception as e:
@@ -22,3 +54,96 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async engine for the API routes, created on first use so the worker and ingestion scripts
+# do not need asyncpg. URLs without an async driver (e.g. sqlite://, or asyncpg not installed)
+# fall back to the sync engine, each session call run in a worker thread.
+_async_engine = None
+_AsyncSession = None
+
+ASYNC_DRIVERS = ("asyncpg", "aiosqlite")
+
+def uses_async_driver(database_url: str = ASYNC_DATABASE_URL) -> bool:
+    """
+    Returns: True if the URL names an async driver that is installed.
+    """
+    driver = make_url(database_url).get_driver_name()
+    if driver not in ASYNC_DRIVERS:
+        return False
+    try:
+        importlib.import_module(driver)
+    except ImportError:
+        return False
+    return True
+
+
+class ThreadedSession:
+    """
+    The part of AsyncSession the API routes use, over a sync Session: every call that touches
+    the database runs in a worker thread, so the event loop is not blocked.
+    Attributes stay readable after commit (expire_on_commit=False), as with the async sessions.
+    """
+
+    def __init__(self):
+        self._session = _ThreadedSessionFactory()
+
+    def add(self, instance):
+        self._session.add(instance)
+
+    async def execute(self, *args, **kwargs):
+        return await asyncio.to_thread(self._session.execute, *args, **kwargs)
+
+    async def commit(self):
+        await asyncio.to_thread(self._session.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._session.rollback)
+
+    async def close(self):
+        await asyncio.to_thread(self._session.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+_ThreadedSessionFactory = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+def get_async_engine():
+    """
+    Returns: The async engine of the API routes, or None if ASYNC_DATABASE_URL has no async
+    driver and the routes use ThreadedSession instead.
+    """
+    global _async_engine, _AsyncSession
+    if _async_engine is None and _AsyncSession is None:
+        if not uses_async_driver():
+            print(f"Database: No async driver for {make_url(ASYNC_DATABASE_URL).drivername}. API routes use the sync engine in worker threads.")
+            _AsyncSession = ThreadedSession
+            return None
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True
+        )
+        # expire_on_commit=False: attributes stay readable after commit without an implicit (sync) reload
+        _AsyncSession = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def new_async_session():
+    get_async_engine()
+    return _AsyncSession()
+
+async def get_async_db():
+    async with new_async_session() as db:
+        yield db
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncSession
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine, _AsyncSession = None, None
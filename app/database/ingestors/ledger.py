@@ -0,0 +1,113 @@
+"""
+Ingestion ledger: what has already been loaded from each source file.
+
+A checkpoint records the sha256 of the first byte_offset bytes of a file, all of which are in the
+database. On the next run a file whose prefix still hashes the same is either unchanged
+(skipped) or has grown (loading resumes at byte_offset); any other file is loaded in full.
+Append-only files (store_status.csv) are checkpointed after every loaded chunk, so a crashed run
+resumes from its last committed chunk. Other files are checkpointed once fully loaded.
+
+Every store_status load is also recorded with the oldest and newest poll it loaded, so that
+state derived from earlier polls (business/incremental_report.py) can tell when rows arrived
+behind it.
+"""
+import os
+import hashlib
+
+from collections import namedtuple
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.db import engine
+from app.database.models import Ingestion_Ledger, Status_Load
+
+HASH_READ_BYTES = 8 * 1024 * 1024
+
+SKIP = "skip"
+RESUME = "resume"
+FULL = "full"
+
+# hasher: sha256 of the whole file for files that are not append-only; otherwise of the file up to
+# start_offset, to be continued while loading
+IngestionPlan = namedtuple("IngestionPlan", ["action", "start_offset", "hasher", "checkpoint"])
+
+
+def ledger_key(path: str) -> str:
+    return os.path.realpath(path)
+
+def hash_file(path: str, end_offset: int = None):
+    """
+    Returns: sha256 object fed with the file's bytes up to end_offset (default: all of them).
+    """
+    hasher = hashlib.sha256()
+    remaining = end_offset
+    with open(path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            data = f.read(HASH_READ_BYTES if remaining is None else min(HASH_READ_BYTES, remaining))
+            if not data:
+                break
+            hasher.update(data)
+            if remaining is not None:
+                remaining -= len(data)
+    return hasher
+
+def load_checkpoint(path: str):
+    """
+    Returns: Dict of the file's ledger columns, or None if it was never loaded.
+    """
+    with engine.begin() as conn:
+        row = conn.execute(
+            Ingestion_Ledger.__table__.select().where(Ingestion_Ledger.source_file == ledger_key(path))
+        ).mappings().first()
+    return dict(row) if row else None
+
+def save_checkpoint(path: str, content_hash: str, byte_offset: int, rows_loaded: int, max_timestamp_utc: datetime = None):
+    values = {
+        'source_file': ledger_key(path),
+        'content_hash': content_hash,
+        'byte_offset': byte_offset,
+        'rows_loaded': rows_loaded,
+        'max_timestamp_utc': max_timestamp_utc,
+        'updated_at': datetime.now(timezone.utc)
+    }
+    stmt = insert(Ingestion_Ledger.__table__).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['source_file'],
+        set_={column: stmt.excluded[column] for column in values if column != 'source_file'}
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+def record_status_load(oldest_timestamp_utc: datetime, newest_timestamp_utc: datetime):
+    """
+    Records a store_status load; call once all of its rows are committed.
+    """
+    with engine.begin() as conn:
+        conn.execute(Status_Load.__table__.insert().values(
+            oldest_timestamp_utc=oldest_timestamp_utc,
+            newest_timestamp_utc=newest_timestamp_utc,
+            loaded_at=datetime.now(timezone.utc)
+        ))
+
+def plan_ingestion(path: str, append_only: bool = False) -> IngestionPlan:
+    """
+    Decides how to load a file from its checkpoint.
+    append_only: Resume a grown file at its checkpoint instead of reloading it in full.
+    """
+    checkpoint = load_checkpoint(path)
+    file_size = os.path.getsize(path)
+
+    if not append_only:
+        hasher = hash_file(path)
+        unchanged = checkpoint is not None and checkpoint['byte_offset'] == file_size and hasher.hexdigest() == checkpoint['content_hash']
+        return IngestionPlan(SKIP if unchanged else FULL, 0, hasher, checkpoint)
+
+    if checkpoint is None or checkpoint['byte_offset'] is None or checkpoint['byte_offset'] > file_size:
+        return IngestionPlan(FULL, 0, hashlib.sha256(), checkpoint)
+    hasher = hash_file(path, checkpoint['byte_offset'])
+    if hasher.hexdigest() != checkpoint['content_hash']:
+        # rewritten rather than appended to
+        return IngestionPlan(FULL, 0, hashlib.sha256(), checkpoint)
+    if checkpoint['byte_offset'] == file_size:
+        return IngestionPlan(SKIP, file_size, hasher, checkpoint)
+    return IngestionPlan(RESUME, checkpoint['byte_offset'], hasher, checkpoint)
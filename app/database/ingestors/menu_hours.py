@@ -14,6 +14,7 @@ from sqlalchemy.dialects.postgresql import insert
 
 from app.database.db import engine
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone
+from app.services import metrics
 from app.services.conflict import _get_insert_statement_on_conflict
 
 from business.config import (
@@ -24,35 +25,45 @@ from business.config import (
     SMALL_TABLE_BATCH_SIZE,
     STORE_STATUS_BATCH_SIZE,
     DEFAULT_MENU_HOURS,
-    DEFAULT_TIMEZONE
+    DEFAULT_TIMEZONE,
+    MENU_HOURS_TIME_FORMAT
 )
 
-def ingest_menu_hours(df: pd.DataFrame):
+MENU_HOURS_COLUMNS = ['store_id', 'day_of_week', 'start_time_local', 'end_time_local']
+
+
+def build_menu_hours_records(df: pd.DataFrame) -> list:
+    """
+    Insert records of menu_hours.csv rows, built column-wise: times parsed with a fixed format.
+    """
+    with metrics.time_record_build(Menu_Hours.__tablename__):
+        records_df = pd.DataFrame({
+            'store_id': df['store_id'].astype(str),
+            'day_of_week': df['day_of_week'].astype(int),
+            'start_time_local': pd.to_datetime(df['start_time_local'], format=MENU_HOURS_TIME_FORMAT).dt.time,
+            'end_time_local': pd.to_datetime(df['end_time_local'], format=MENU_HOURS_TIME_FORMAT).dt.time,
+        }, columns=MENU_HOURS_COLUMNS)
+        records = records_df.to_dict('records')
+    return records
+
+def ingest_explicit_menu_hours(csv_path: str = MENU_HOURS_CSV) -> tuple:
     """
-    Ingests data from menu_hours.csv, applying explicit and default hours in batches.
-    Filters out existing records to prevent IntegrityError during bulk inserts.
+    Reads menu_hours.csv and ingests its hours in batches. Needs no stores table, so it can run
+    alongside the store status load; ingest_default_menu_hours fills in the rest afterwards.
+    Returns: (True if every batch was loaded, store IDs in the file, rows read).
     """
     start_time = datetime.now()
+    failed_batches = 0
     
-    print(f"Ingesting data from {MENU_HOURS_CSV}...")
+    print(f"Ingesting data from {csv_path}...")
     try:
+        df = pd.read_csv(csv_path)
         with engine.begin() as conn:
 
             df.rename(columns={'dayOfWeek': 'day_of_week'}, inplace=True)
-            print("stripping time from start_time_local and end_time_local")
-            df['start_time_local'] = df['start_time_local'].apply(lambda x: datetime.strptime(x, '%H:%M:%S').time())
-            df['end_time_local'] = df['end_time_local'].apply(lambda x: datetime.strptime(x, '%H:%M:%S').time())
+            print("parsing start_time_local and end_time_local")
+            explicit_menu_hours_records = build_menu_hours_records(df)
 
-
-            explicit_menu_hours_records = []
-            for _, record in df.iterrows():
-                explicit_menu_hours_records.append({
-                    'store_id': str(record['store_id']),
-                    'day_of_week': int(record['day_of_week']),
-                    'start_time_local': record['start_time_local'],
-                    'end_time_local': record['end_time_local']
-                })
-                    
             if explicit_menu_hours_records:
                 total_count = 0
                 print(f"Starting ingestion of {len(explicit_menu_hours_records)} new explicit menu hours records in batches of {SMALL_TABLE_BATCH_SIZE}...")
@@ -60,10 +71,12 @@ def ingest_menu_hours(df: pd.DataFrame):
                     batch = explicit_menu_hours_records[i:i + SMALL_TABLE_BATCH_SIZE]
                     try:
                         stmt = _get_insert_statement_on_conflict(Menu_Hours.__table__, batch, ['store_id', 'day_of_week', 'start_time_local', 'end_time_local'])
-                        conn.execute(stmt)
+                        with metrics.time_batch_insert(Menu_Hours.__tablename__, len(batch)):
+                            conn.execute(stmt)
                         total_count += len(batch)
                         print(f"Ingested {total_count} explicit menu hours records so far...")
                     except Exception as e:
+                        failed_batches += 1
                         print(f"Error ingesting explicit menu hours batch {i//SMALL_TABLE_BATCH_SIZE + 1} ({len(batch)} records): , ......................")
                         """
                         ERROR: 
@@ -76,7 +89,26 @@ def ingest_menu_hours(df: pd.DataFrame):
                 print(f"Total ingested {total_count} explicit menu hours records.")
             else:
                 print("No new explicit menu hours to ingest.")
+        return failed_batches == 0, set(df['store_id'].dropna().astype(str)), len(df)
+    except FileNotFoundError as e:
+        print(f"Error: The menu hours CSV file was not found. Please ensure it is in the 'data' directory. {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during menu hours ingestion: {e}")
+    finally:
+        print(f"Explicit menu hours function ended in {datetime.now() - start_time} seconds.")
+    return False, set(), 0
+
+def ingest_default_menu_hours() -> bool:
+    """
+    Adds DEFAULT_MENU_HOURS for every day a store in the stores table has no hours for, in batches.
+    Run after the stores table and the explicit hours are complete.
+    Returns: True if every batch was loaded.
+    """
+    start_time = datetime.now()
+    failed_batches = 0
 
+    try:
+        with engine.begin() as conn:
             existing_store_day_combinations = {
                 (store_id, day_of_week)
                 for store_id, day_of_week in conn.execute(text("SELECT store_id, day_of_week FROM menu_hours"))
@@ -103,17 +135,19 @@ def ingest_menu_hours(df: pd.DataFrame):
                     batch = default_menu_hours_records[i:i + SMALL_TABLE_BATCH_SIZE]
                     try:
                         stmt = _get_insert_statement_on_conflict(Menu_Hours.__table__, batch, ['store_id', 'day_of_week', 'start_time_local', 'end_time_local'])
-                        conn.execute(stmt)
+                        with metrics.time_batch_insert(Menu_Hours.__tablename__, len(batch)):
+                            conn.execute(stmt)
                         total_count += len(batch)
                         print(f"Ingested {total_count} default menu hours records so far...")
                     except Exception as e:
+                        failed_batches += 1
                         print(f"  Error adding default menu hours batch {i//SMALL_TABLE_BATCH_SIZE + 1} ({len(batch)} records): {e}")
                 print(f"Total added {total_count} default menu hours records.")
             else:
                 print("No new default menu hours to add.")
-    except FileNotFoundError as e:
-        print(f"Error: The menu hours CSV file was not found. Please ensure it is in the 'data' directory. {e}")
+        return failed_batches == 0
     except Exception as e:
-        print(f"An unexpected error occurred during menu hours ingestion: {e}")
+        print(f"An unexpected error occurred while adding default menu hours: {e}")
     finally:
-        print(f"Menu hours function ended in {datetime.now() - start_time} seconds.")
+        print(f"Default menu hours function ended in {datetime.now() - start_time} seconds.")
+    return False
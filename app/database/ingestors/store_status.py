@@ -1,24 +1,23 @@
 """
 using engine (no session) to resolve confict with batch commit.
 """
+import io
 import os
+import hashlib
 import pytz
-import numpy as np
 import pandas as pd
 
 from sqlalchemy import text
-from datetime import datetime, time
+from datetime import datetime, time, timezone
 from sqlalchemy.exc import IntegrityError
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
 from sqlalchemy.dialects.postgresql import insert
 
 from app.database.db import engine
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone
 
-from app.database.ingestors.stores import ingest_stores
-from app.database.ingestors.menu_hours import ingest_menu_hours
-from app.database.ingestors.timezones import ingest_timezones
 
+from app.services import metrics
 from app.services.conflict import _get_insert_statement_on_conflict
 
 from business.config import (
@@ -27,68 +26,311 @@ from business.config import (
     STORE_STATUS_CSV,
     TIMEZONES_CSV,
     STORE_STATUS_BATCH_SIZE,
+    STORE_STATUS_LOADER,
+    STORE_STATUS_TIMESTAMP_FORMAT,
+    STORE_STATUS_CSV_CHUNK_ROWS,
+    STORE_STATUS_PIPELINE_QUEUE_DEPTH,
+    INGEST_WORKERS,
     SMALL_TABLE_BATCH_SIZE,
     DEFAULT_MENU_HOURS,
     DEFAULT_TIMEZONE
 )
 
-def ingest_store_status(df: pd.DataFrame, threads=6):
+STORE_STATUS_COPY_COLUMNS = ['store_id', 'timestamp_utc', 'status']
+
+# Temporary tables are unlogged and private to the connection, so concurrent batches do not share one
+CREATE_STAGING_TABLE_SQL = text("""
+    CREATE TEMPORARY TABLE store_status_staging (
+        store_id VARCHAR,
+        timestamp_utc TIMESTAMP WITH TIME ZONE,
+        status BOOLEAN
+    ) ON COMMIT DROP
+""")
+COPY_TO_STAGING_SQL = "COPY store_status_staging (store_id, timestamp_utc, status) FROM STDIN WITH (FORMAT csv)"
+INSERT_FROM_STAGING_SQL = text("""
+    INSERT INTO store_status (store_id, timestamp_utc, status)
+    SELECT store_id, timestamp_utc, status FROM store_status_staging
+    ON CONFLICT (store_id, timestamp_utc) DO NOTHING
+""")
+
+# Explicit dtypes: no type inference per chunk, and the two status strings are stored once
+STORE_STATUS_CSV_DTYPES = {'store_id': str, 'status': 'category', 'timestamp_utc': str}
+# Typical store_status.csv line length; reads of chunk_rows * this many bytes hold about chunk_rows rows
+STATUS_LINE_BYTES_ESTIMATE = 80
+
+
+class StoreStatusReadError(Exception):
+    """
+    Reading store_status.csv failed part way. The chunks read before the error are loaded and
+    checkpointed; loaded holds what ingest_store_status_csv would have returned for them.
+    """
+
+    def __init__(self, message: str, loaded: tuple):
+        super().__init__(message)
+        self.loaded = loaded
+
+
+def _parse_status_timestamps(raw_timestamps: pd.Series) -> pd.Series:
+    timestamps = pd.to_datetime(raw_timestamps, format=STORE_STATUS_TIMESTAMP_FORMAT, utc=True, errors='coerce')
+    # e.g. polls without fractional seconds; parsed one by one, only those
+    unmatched = timestamps.isna() & raw_timestamps.notna()
+    if unmatched.any():
+        timestamps[unmatched] = pd.to_datetime(raw_timestamps[unmatched], utc=True, format='mixed')
+    return timestamps
+
+def _prepare_status_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parses timestamps, drops incomplete rows and maps status to a boolean ('active' -> True), column-wise.
+    """
+    with metrics.time_record_build(Store_Status.__tablename__):
+        df['timestamp_utc'] = _parse_status_timestamps(df['timestamp_utc'])
+        df.dropna(subset=['store_id', 'status', 'timestamp_utc'], inplace=True)
+        df['status'] = df['status'].astype(str).str.lower().eq('active')
+    return df
+
+def build_status_records(df: pd.DataFrame) -> list:
+    """
+    Insert records of a prepared store status frame.
+    """
+    with metrics.time_record_build(Store_Status.__tablename__):
+        records = df[STORE_STATUS_COPY_COLUMNS].astype({'store_id': str}).to_dict('records')
+    return records
+
+def _read_csv_blocks(csv_path: str, block_bytes: int, start_offset: int, hasher):
+    """
+    Reads csv_path from start_offset (0: from the header) in blocks that end at a line break.
+    hasher must hold the sha256 of the file up to start_offset; it is fed every block read.
+    Yields: (header line, block, file offset after the block, sha256 hex digest up to that offset)
+    """
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        if start_offset == 0:
+            hasher.update(header)
+            offset = len(header)
+        else:
+            f.seek(start_offset)
+            offset = start_offset
+
+        remainder = b''
+        while data := f.read(block_bytes):
+            data = remainder + data
+            cut = data.rfind(b'\n') + 1
+            block, remainder = data[:cut], data[cut:]
+            if block:
+                hasher.update(block)
+                offset += len(block)
+                yield header, block, offset, hasher.hexdigest()
+        # A last line without a line break may still be being written: it is loaded, but it is
+        # not hashed or checkpointed, so the next run reads it again
+        if remainder:
+            yield header, remainder, None, None
+
+def _load_status_block(header: bytes, block: bytes) -> tuple:
+    """
+    Process-pool entry point: parses, prepares and loads one block of store_status.csv.
+    Returns: Tuple (every batch loaded, rows in the block, store IDs, oldest and newest timestamp_utc or None)
+    """
+    chunk = pd.read_csv(io.BytesIO(header + block), dtype=STORE_STATUS_CSV_DTYPES, usecols=list(STORE_STATUS_CSV_DTYPES))
+    file_rows = len(chunk)
+    chunk = _prepare_status_frame(chunk)
+    loaded = ingest_batch(chunk)
+    if chunk.empty:
+        return loaded, file_rows, [], None, None
+    timestamps = chunk['timestamp_utc']
+    return loaded, file_rows, chunk['store_id'].unique().tolist(), timestamps.min().to_pydatetime(), timestamps.max().to_pydatetime()
+
+def ingest_store_status_csv(csv_path: str = STORE_STATUS_CSV, chunk_rows: int = STORE_STATUS_CSV_CHUNK_ROWS,
+                            executor=None, workers: int = INGEST_WORKERS, queue_depth: int = STORE_STATUS_PIPELINE_QUEUE_DEPTH,
+                            start_offset: int = 0, hasher=None, checkpoint: dict = None, on_checkpoint=None) -> tuple:
+    """
+    Streams store_status.csv into the database chunk by chunk: this thread reads line-aligned blocks
+    and `executor` (with `workers` workers; a process pool shards the parsing across processes) parses,
+    prepares and loads them. Reading runs at most `queue_depth` blocks ahead of the workers, so about
+    (workers + queue_depth + 1) blocks are in memory whatever the file size.
+    executor: Default is a pool of `workers` threads.
+    start_offset, hasher, checkpoint: Resume after the rows a previous run loaded (app/database/ingestors/ledger.py).
+    on_checkpoint: Called as on_checkpoint(content_hash, byte_offset, rows_loaded, max_timestamp_utc) whenever
+        every chunk up to byte_offset is loaded; chunks are loaded out of order, and a failed one stops checkpoints.
+    Returns: (set of store IDs seen, oldest and newest timestamp_utc loaded or None)
+    Raises: StoreStatusReadError if reading the file fails, once the chunks read before are loaded.
+    """
     start_time = datetime.now()
+    print(f"Streaming {csv_path} from byte {start_offset} in chunks of about {chunk_rows} rows on {workers} workers...")
 
-    print("changing timestamp_utc column to datetime...")
-    df['timestamp_utc'] = pd.to_datetime(df['timestamp_utc'], utc=True)
-    print("dropping the NA values from table...")
-    df.dropna(subset=['store_id', 'status', 'timestamp_utc'], inplace=True)
-    print("converting status column as boolean...")
-    df['status'] = df['status'].apply(lambda x: True if str(x).lower() == 'active' else False)
+    hasher = hasher if hasher is not None else hashlib.sha256()
+    checkpoint = checkpoint or {}
+    block_bytes = max(chunk_rows, 1) * STATUS_LINE_BYTES_ESTIMATE
 
-    split_df = np.array_split(df, threads)
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    # worker processes record their metrics in their own registry; threads record them here
+    merge_worker_metrics = isinstance(executor, ProcessPoolExecutor)
 
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        futures = [executor.submit(ingest_batch, batch) for batch in split_df]
-    for future in futures:
-        try:
-            future.result()  # Wait
-        except Exception as e:
-            print(f"An error occurred during store status ingestion: {e}")
-            
-    print(f"Store status function ended in {datetime.now() - start_time} seconds.")
-def ingest_batch(df: pd.DataFrame):
+    checkpoint_max_timestamp_utc = checkpoint.get('max_timestamp_utc')
+    if checkpoint_max_timestamp_utc is not None and checkpoint_max_timestamp_utc.tzinfo is None:
+        # e.g. read back from SQLite, which drops the offset
+        checkpoint_max_timestamp_utc = checkpoint_max_timestamp_utc.replace(tzinfo=timezone.utc)
+
+    store_ids = set()
+    counts = {'read': 0, 'written': 0}
+    # Loaded chunks by sequence number, and the state after the contiguous loaded prefix
+    loaded_chunks = {}
+    progress = {
+        'next_sequence': 0,
+        'blocked': False,
+        'rows_loaded': checkpoint.get('rows_loaded') or 0,
+        'max_timestamp_utc': checkpoint_max_timestamp_utc,
+        'min_timestamp_utc': None,
+        'new_max_timestamp_utc': None
+    }
+
+    def record_loaded_chunk(sequence, loaded, file_rows, end_offset, content_hash, min_timestamp_utc, max_timestamp_utc):
+        loaded_chunks[sequence] = (loaded, file_rows, end_offset, content_hash, max_timestamp_utc)
+        # a chunk with a failed batch may still have committed its other batches
+        if min_timestamp_utc is not None:
+            progress['min_timestamp_utc'] = min(filter(None, (progress['min_timestamp_utc'], min_timestamp_utc)))
+            progress['new_max_timestamp_utc'] = max(filter(None, (progress['new_max_timestamp_utc'], max_timestamp_utc)))
+
+        checkpoint_state = None
+        while not progress['blocked'] and progress['next_sequence'] in loaded_chunks:
+            loaded, file_rows, end_offset, content_hash, max_timestamp_utc = loaded_chunks.pop(progress['next_sequence'])
+            if not loaded or end_offset is None:
+                progress['blocked'] = True
+                break
+            progress['next_sequence'] += 1
+            progress['rows_loaded'] += file_rows
+            if max_timestamp_utc is not None:
+                progress['max_timestamp_utc'] = max(filter(None, (progress['max_timestamp_utc'], max_timestamp_utc)))
+            checkpoint_state = (content_hash, end_offset, progress['rows_loaded'], progress['max_timestamp_utc'])
+
+        if checkpoint_state is not None and on_checkpoint is not None:
+            try:
+                on_checkpoint(*checkpoint_state)
+            except Exception as e:
+                # the next checkpoint covers these rows too
+                print(f"Warning: Could not save the store status checkpoint: {e}")
+
+    in_flight = {}
+    read_error = None
+
+    def collect(return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            sequence, end_offset, content_hash = in_flight.pop(future)
+            try:
+                result, metrics_after, metrics_before = future.result()
+                if merge_worker_metrics:
+                    metrics.merge_ingest_metrics(metrics_after, metrics_before)
+                loaded, file_rows, chunk_store_ids, min_timestamp_utc, max_timestamp_utc = result
+            except Exception as e:
+                print(f"Error loading chunk {sequence + 1} of {csv_path}: {e}")
+                loaded, file_rows, chunk_store_ids, min_timestamp_utc, max_timestamp_utc = False, 0, [], None, None
+            counts['read'] += file_rows
+            if loaded:
+                counts['written'] += file_rows
+            store_ids.update(chunk_store_ids)
+            record_loaded_chunk(sequence, loaded, file_rows, end_offset, content_hash, min_timestamp_utc, max_timestamp_utc)
+
+    try:
+        for sequence, (header, block, end_offset, content_hash) in enumerate(_read_csv_blocks(csv_path, block_bytes, start_offset, hasher)):
+            while len(in_flight) >= workers + queue_depth:
+                collect(FIRST_COMPLETED)
+            in_flight[executor.submit(metrics.run_with_ingest_metrics, _load_status_block, header, block)] = (sequence, end_offset, content_hash)
+    except Exception as e:
+        print(f"An error occurred while streaming {csv_path}: {e}")
+        read_error = e
+    finally:
+        while in_flight:
+            collect(ALL_COMPLETED)
+        if owns_executor:
+            executor.shutdown()
+
+    print(f"Store status streaming ended in {datetime.now() - start_time} seconds ({counts['read']} rows read, {counts['written']} rows loaded).")
+    loaded = (store_ids, progress['min_timestamp_utc'], progress['new_max_timestamp_utc'])
+    if read_error is not None:
+        # checkpoints stop at the last chunk read; the next run resumes there
+        raise StoreStatusReadError(f"Reading {csv_path} failed after {counts['read']} rows: {read_error}", loaded) from read_error
+    return loaded
+
+def ingest_batch(df: pd.DataFrame) -> bool:
     """
     Ingests data from store_status.csv in batches.
     Uses Python-side pre-filtering to prevent duplicates and avoid batch rollbacks.
     Handles timestamp conversion to timezone-aware UTC datetime.
+    Returns: True if every batch was loaded.
     """
 
     try:
-        
-        records_to_insert = [
-            {
-                'store_id': str(row['store_id']),
-                'timestamp_utc': row['timestamp_utc'],
-                'status': row['status']
-            }
-            for _, row in df.iterrows()
-        ]
+        if STORE_STATUS_LOADER == "copy" and engine.dialect.name == 'postgresql':
+            return copy_batch(df)
+
+        records_to_insert = build_status_records(df)
 
         if not records_to_insert:
             print("No new store status records to ingest (all found in DB).")
-            return
+            return True
 
         total_count = 0
+        failed_batches = 0
         print(f"Starting ingestion of {len(records_to_insert)} new store status records in batches of {STORE_STATUS_BATCH_SIZE}...")
         for i in range(0, len(records_to_insert), STORE_STATUS_BATCH_SIZE):
             batch = records_to_insert[i:i + STORE_STATUS_BATCH_SIZE]
             try:
                 stmt = _get_insert_statement_on_conflict(Store_Status.__table__, batch, ['store_id', 'timestamp_utc'])
                 with engine.begin() as conn:
-                    conn.execute(stmt)
+                    with metrics.time_batch_insert(Store_Status.__tablename__, len(batch)):
+                        conn.execute(stmt)
                 total_count += len(batch)
                 print(f"Ingested {total_count} store status records so far...")
             except Exception as e:
+                failed_batches += 1
                 print(f"Error ingesting batch {i//STORE_STATUS_BATCH_SIZE + 1} ({len(batch)} records) of store status records: {e}")
         print(f"Total ingested {total_count} store status records.")
+        return failed_batches == 0
     except FileNotFoundError as e:
         print(f"Error: The store status CSV file was not found. Please ensure it is in the 'data' directory. {e}")
     except Exception as e:
         print(f"An unexpected error occurred during store status ingestion: {e}")
+    return False
+
+def copy_batch(df: pd.DataFrame) -> bool:
+    """
+    Loads store status rows with COPY, one staging table and INSERT ... SELECT per batch.
+    Duplicates are skipped by ON CONFLICT DO NOTHING, as with the INSERT loader.
+    Returns: True if every batch was loaded.
+    """
+    total_count = 0
+    new_count = 0
+    failed_batches = 0
+    print(f"Starting COPY of {len(df)} store status records in batches of {STORE_STATUS_BATCH_SIZE}...")
+    for i in range(0, len(df), STORE_STATUS_BATCH_SIZE):
+        batch = df.iloc[i:i + STORE_STATUS_BATCH_SIZE]
+        try:
+            with engine.begin() as conn:
+                with metrics.time_batch_insert(Store_Status.__tablename__, len(batch)):
+                    new_count += _copy_through_staging(conn, batch)
+            total_count += len(batch)
+            print(f"Ingested {total_count} store status records so far...")
+        except Exception as e:
+            failed_batches += 1
+            print(f"Error copying batch {i//STORE_STATUS_BATCH_SIZE + 1} ({len(batch)} records) of store status records: {e}")
+    print(f"Total ingested {total_count} store status records ({new_count} new, duplicates skipped).")
+    return failed_batches == 0
+
+def _copy_through_staging(conn, batch: pd.DataFrame) -> int:
+    """
+    Returns: Number of rows inserted into store_status.
+    """
+    buffer = io.StringIO()
+    batch[STORE_STATUS_COPY_COLUMNS].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    conn.execute(CREATE_STAGING_TABLE_SQL)
+    # COPY goes through the psycopg2 cursor of the same connection, inside the same transaction
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(COPY_TO_STAGING_SQL, buffer)
+    finally:
+        cursor.close()
+    return conn.execute(INSERT_FROM_STAGING_SQL).rowcount
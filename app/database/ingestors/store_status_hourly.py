@@ -0,0 +1,108 @@
+"""
+using engine (no session) to resolve confict with batch commit.
+"""
+from sqlalchemy import func
+from datetime import datetime, timedelta
+
+from app.database.db import engine, Session
+from app.database.models import Store, Store_Status, Store_Status_Hourly
+from app.services import metrics
+
+from business import uptime_kernel
+from business.generate_report import (
+    _get_all_store_details,
+    _get_all_relevant_status_data,
+    _build_batch_kernel_arrays
+)
+from business.config import (
+    STORE_STATUS_BATCH_SIZE,
+    STORE_STATUS_HOURLY_STORE_CHUNK_SIZE
+)
+
+HOUR_US = 3600 * 1_000_000
+
+
+def ingest_store_status_hourly(since_utc: datetime = None):
+    """
+    Rebuilds the store_status_hourly rollup from store_status, store by store chunk.
+    Every store gets one row per UTC hour from the first rebuilt hour up to the hour of
+    the latest poll; that last hour only covers time up to the latest poll.
+    since_utc: Only rebuild hours from the one containing since_utc (e.g. the oldest newly
+        ingested poll). None rebuilds the whole table, as needed after menu hours or
+        timezones change.
+    """
+    start_time = datetime.now()
+    print("Building store_status_hourly rollup...")
+
+    db = Session()
+    try:
+        earliest_status_utc, latest_status_utc = db.query(
+            func.min(Store_Status.timestamp_utc), func.max(Store_Status.timestamp_utc)
+        ).one()
+        if latest_status_utc is None:
+            print("No store status data found. Skipping hourly rollup.")
+            return
+
+        rebuild_from_us = uptime_kernel.to_epoch_us(since_utc if since_utc is not None else earliest_status_utc)
+        rebuild_from_us -= rebuild_from_us % HOUR_US
+        rebuild_from_utc = uptime_kernel.from_epoch_us(rebuild_from_us)
+        latest_us = uptime_kernel.to_epoch_us(latest_status_utc)
+        latest_utc = uptime_kernel.from_epoch_us(latest_us)
+
+        all_store_ids = [s[0] for s in db.query(Store.store_id).order_by(Store.store_id)]
+        print(f"Rolling up {len(all_store_ids)} stores from {rebuild_from_utc} to {latest_utc} UTC in chunks of {STORE_STATUS_HOURLY_STORE_CHUNK_SIZE} stores...")
+
+        total_count = 0
+        for i in range(0, len(all_store_ids), STORE_STATUS_HOURLY_STORE_CHUNK_SIZE):
+            store_ids = all_store_ids[i:i + STORE_STATUS_HOURLY_STORE_CHUNK_SIZE]
+            store_details = _get_all_store_details(db, store_ids, store_ids)
+            status_by_store = _get_all_relevant_status_data(db, rebuild_from_utc, latest_utc + timedelta(microseconds=1), store_ids)
+
+            uptime_us, downtime_us, closing_codes = uptime_kernel.calculate_bucketed_uptime_downtime_batch_us(
+                *_build_batch_kernel_arrays(store_ids, status_by_store, store_details, rebuild_from_utc, latest_utc),
+                rebuild_from_us, latest_us, HOUR_US
+            )
+
+            hour_starts_utc = [
+                uptime_kernel.from_epoch_us(rebuild_from_us + hour * HOUR_US) for hour in range(uptime_us.shape[1])
+            ]
+            closing_statuses = {
+                uptime_kernel.STATUS_ACTIVE: True,
+                uptime_kernel.STATUS_INACTIVE: False,
+                uptime_kernel.STATUS_UNKNOWN: None
+            }
+            # Seconds with microsecond precision; Numeric(10, 6) stores them exactly.
+            uptime_seconds = (uptime_us / 1_000_000).tolist()
+            downtime_seconds = (downtime_us / 1_000_000).tolist()
+            closing_codes = closing_codes.tolist()
+
+            records_to_insert = [
+                {
+                    'store_id': store_id,
+                    'hour_start_utc': hour_start_utc,
+                    'uptime_seconds': uptime_seconds[position][hour],
+                    'downtime_seconds': downtime_seconds[position][hour],
+                    'closing_status': closing_statuses[closing_codes[position][hour]]
+                }
+                for position, store_id in enumerate(store_ids)
+                for hour, hour_start_utc in enumerate(hour_starts_utc)
+            ]
+
+            with engine.begin() as conn:
+                conn.execute(Store_Status_Hourly.__table__.delete().where(
+                    Store_Status_Hourly.store_id.in_(store_ids),
+                    Store_Status_Hourly.hour_start_utc >= rebuild_from_utc
+                ))
+                for j in range(0, len(records_to_insert), STORE_STATUS_BATCH_SIZE):
+                    batch = records_to_insert[j:j + STORE_STATUS_BATCH_SIZE]
+                    with metrics.time_batch_insert(Store_Status_Hourly.__tablename__, len(batch)):
+                        conn.execute(Store_Status_Hourly.__table__.insert(), batch)
+
+            total_count += len(records_to_insert)
+            print(f"  Rolled up {min(i + STORE_STATUS_HOURLY_STORE_CHUNK_SIZE, len(all_store_ids))}/{len(all_store_ids)} stores ({total_count} hourly rows) so far...")
+        print(f"Total written {total_count} hourly rollup rows.")
+    except Exception as e:
+        print(f"An unexpected error occurred during hourly rollup: {e}")
+    finally:
+        db.close()
+        print(f"Hourly rollup function ended in {datetime.now() - start_time} seconds.")
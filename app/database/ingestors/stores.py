@@ -15,6 +15,7 @@ from sqlalchemy.dialects.postgresql import insert
 
 from app.database.db import engine
 from app.database.models import Store
+from app.services import metrics
 from app.services.conflict import _get_insert_statement_on_conflict
 
 
@@ -35,10 +36,16 @@ def ingest_stores(df_status: pd.DataFrame, df_hours: pd.DataFrame):
     Filters out existing stores to prevent duplicates and applies batching.
     """
 
-    try:
-        all_store_ids = set(df_status['store_id'].unique())
-        all_store_ids.update(df_hours['store_id'].unique())
+    all_store_ids = set(df_status['store_id'].unique())
+    all_store_ids.update(df_hours['store_id'].unique())
+    ingest_store_ids(all_store_ids)
 
+def ingest_store_ids(all_store_ids: set):
+    """
+    Ingests the given store IDs into the 'stores' table in batches, skipping existing ones.
+    """
+
+    try:
         print(f"Ingesting {len(all_store_ids)} potential unique store IDs into the database...")
 
         records_to_insert = [{'store_id': str(store_id)} for store_id in all_store_ids]
@@ -51,7 +58,8 @@ def ingest_stores(df_status: pd.DataFrame, df_hours: pd.DataFrame):
                 try:
                     stmt = _get_insert_statement_on_conflict(Store.__table__, batch, ['store_id'])
                     with engine.begin() as conn:
-                        conn.execute(stmt)
+                        with metrics.time_batch_insert(Store.__tablename__, len(batch)):
+                            conn.execute(stmt)
                     total_count += len(batch)
                     print(f"  Ingested {total_count} store IDs so far...")
                 except Exception as e:
@@ -2,7 +2,6 @@
 using engine (no session) to resolve confict with batch commit.
 """
 import os
-import pytz
 import threading
 import pandas as pd
 
@@ -16,8 +15,10 @@ from app.database.db import engine
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone
 
 from app.database.ingestors.stores import ingest_stores
+from app.services import metrics
 from app.services.conflict import _get_insert_statement_on_conflict
 
+from business.timezones import is_known_timezone
 from business.config import (
     DATA_DIR,
     MENU_HOURS_CSV,
@@ -28,35 +29,51 @@ from business.config import (
     DEFAULT_TIMEZONE
 )
 
-def ingest_timezones(df: pd.DataFrame):
+
+def _is_valid_timezone(timezone_str) -> bool:
+    try:
+        return is_known_timezone(timezone_str)
+    except Exception as e:
+        print(f"Error validating timezone '{timezone_str}': {e}")
+        return False
+
+def build_timezone_records(df: pd.DataFrame) -> list:
     """
-    Ingests data from timezones.csv, applying explicit and default timezones in batches.
-    Filters out existing records to prevent IntegrityError during bulk inserts.
+    Insert records of timezones.csv rows with a known timezone. Each distinct timezone string
+    is validated once; rows with unknown ones are skipped with one warning per timezone.
+    """
+    with metrics.time_record_build(Timezone.__tablename__):
+        known_timezones = {timezone_str: _is_valid_timezone(timezone_str) for timezone_str in df['timezone_str'].unique()}
+        is_known = df['timezone_str'].map(known_timezones).astype(bool)
+
+        for timezone_str, store_count in df.loc[~is_known, 'timezone_str'].value_counts().items():
+            print(f"Warning: Unknown timezone '{timezone_str}' for {store_count} store(s). Skipping these entries.")
+
+        records = pd.DataFrame({
+            'store_id': df.loc[is_known, 'store_id'].astype(str),
+            'timezone_str': df.loc[is_known, 'timezone_str'],
+        }).to_dict('records')
+    return records
+
+def ingest_explicit_timezones(csv_path: str = TIMEZONES_CSV) -> tuple:
+    """
+    Reads timezones.csv and ingests its timezones in batches. Needs no stores table, so it can run
+    alongside the store status load; ingest_default_timezones fills in the rest afterwards.
+    Returns: (True if every batch was loaded, rows read).
     """
     start_time = datetime.now()
+    failed_batches = 0
 
-    print(f"Ingesting data from {TIMEZONES_CSV}...")
+    print(f"Ingesting data from {csv_path}...")
 
     try:
+        df = pd.read_csv(csv_path)
+        rows_read = len(df)
         with engine.begin() as conn:
 
             df.dropna(subset=['store_id', 'timezone_str'], inplace=True)
 
-            explicit_timezone_records = []
-            for _, record in df.iterrows():
-                store_id_str = str(record['store_id'])
-                timezone_str_val = record['timezone_str']
-
-                try:
-                    pytz.timezone(timezone_str_val)
-                    explicit_timezone_records.append({
-                            'store_id': store_id_str,
-                            'timezone_str': timezone_str_val
-                        })
-                except pytz.UnknownTimeZoneError:
-                    print(f"Warning: Unknown timezone '{timezone_str_val}' for store {store_id_str}. Skipping this entry.")
-                except Exception as e:
-                    print(f"Error creating timezone record for {record}: {e}")
+            explicit_timezone_records = build_timezone_records(df)
 
             if explicit_timezone_records:
                 total_count = 0
@@ -66,15 +83,36 @@ def ingest_timezones(df: pd.DataFrame):
                     try:
                         stmt = _get_insert_statement_on_conflict(Timezone.__table__, batch, ['store_id'])
                         
-                        conn.execute(stmt)
+                        with metrics.time_batch_insert(Timezone.__tablename__, len(batch)):
+                            conn.execute(stmt)
                         total_count += len(batch)
                         print(f"  Ingested {total_count} explicit timezone records so far...")
                     except Exception as e:
+                        failed_batches += 1
                         print(f"  Error ingesting explicit timezone batch {i//SMALL_TABLE_BATCH_SIZE + 1} ({len(batch)} records): {e}")
                 print(f"Total ingested {total_count} explicit timezone records.")
             else:
                 print("No new explicit timezones to ingest.")
+        return failed_batches == 0, rows_read
+    except FileNotFoundError as e:
+        print(f"Error: The timezones CSV file was not found. Please ensure it is in the 'data' directory. {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred during timezone ingestion: {e}")
+    finally:
+        print(f"Explicit timezone ingestion function ended in {datetime.now() - start_time} seconds.")
+    return False, 0
+
+def ingest_default_timezones() -> bool:
+    """
+    Adds DEFAULT_TIMEZONE for every store in the stores table without a timezone, in batches.
+    Run after the stores table and the explicit timezones are complete.
+    Returns: True if every batch was loaded.
+    """
+    start_time = datetime.now()
+    failed_batches = 0
 
+    try:
+        with engine.begin() as conn:
             existing_tz_stores_distinct = {s[0] for s in conn.execute(
                 text("SELECT DISTINCT store_id FROM timezones")
             )}
@@ -98,17 +136,19 @@ def ingest_timezones(df: pd.DataFrame):
                     batch = default_timezone_records[i:i + SMALL_TABLE_BATCH_SIZE]
                     try:
                         stmt = _get_insert_statement_on_conflict(Timezone.__table__, batch, ['store_id'])
-                        conn.execute(stmt)
+                        with metrics.time_batch_insert(Timezone.__tablename__, len(batch)):
+                            conn.execute(stmt)
                         total_count += len(batch)
                         print(f"  Ingested {total_count} default timezone records so far...")
                     except Exception as e:
+                        failed_batches += 1
                         print(f"  Error adding default timezone batch {i//SMALL_TABLE_BATCH_SIZE + 1} ({len(batch)} records): {e}")
                 print(f"Total added {total_count} default timezone records.")
             else:
                 print("No new default timezones to add.")
-    except FileNotFoundError as e:
-        print(f"Error: The timezones CSV file was not found. Please ensure it is in the 'data' directory. {e}")
+        return failed_batches == 0
     except Exception as e:
-        print(f"An unexpected error occurred during timezone ingestion: {e}")
+        print(f"An unexpected error occurred while adding default timezones: {e}")
     finally:
-        print(f"Timezone ingestion function ended in {datetime.now() - start_time} seconds.")
+        print(f"Default timezone ingestion function ended in {datetime.now() - start_time} seconds.")
+    return False
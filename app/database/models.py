@@ -1,7 +1,7 @@
 """
 Inside modesl handling duplicate entries and when batch process run, it will remain unaffected.
 """
-from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, UniqueConstraint, Boolean, Time
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Text, DateTime, UniqueConstraint, Boolean, Time, Numeric, JSON, Index, text
 from .db import Base
 import uuid
 
@@ -26,6 +26,23 @@ class Store_Status(Base):
         UniqueConstraint('store_id','timestamp_utc', name='uq_store_status'),
     )
 
+# rollup of store_status, filled at ingest time (app/database/ingestors/store_status_hourly.py)
+class Store_Status_Hourly(Base):
+    __tablename__ = "store_status_hourly"
+
+    # business-hours uptime/downtime within [hour_start_utc, hour_start_utc + 1h)
+    # and the status in effect at the end of the hour (NULL = unknown)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    store_id = Column(String, index=True)
+    hour_start_utc = Column(DateTime(timezone=True), index=True)
+    uptime_seconds = Column(Numeric(10, 6))
+    downtime_seconds = Column(Numeric(10, 6))
+    closing_status = Column(Boolean, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('store_id', 'hour_start_utc', name='uq_store_status_hourly'),
+    )
+
 # csv headers:- store_id, dayOfWeek, start_time_local, end_time_local
 class Menu_Hours(Base):
     __tablename__ = "menu_hours"
@@ -55,6 +72,29 @@ class Timezone(Base):
         UniqueConstraint('store_id', 'timezone_str', name='uq_timezone'),
     )
 
+# ingestion checkpoints per source file (app/database/ingestors/ledger.py)
+class Ingestion_Ledger(Base):
+    __tablename__ = "ingestion_ledger"
+
+    # content_hash: sha256 of the first byte_offset bytes of the file, all of which are loaded;
+    # rows_loaded and max_timestamp_utc describe those bytes
+    source_file = Column(String, primary_key=True)
+    content_hash = Column(String)
+    byte_offset = Column(BigInteger)
+    rows_loaded = Column(BigInteger)
+    max_timestamp_utc = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True))
+
+# one row per store_status load (app/database/ingestors/ledger.py); the incremental report
+# engine refolds from oldest_timestamp_utc when it is older than its watermark
+class Status_Load(Base):
+    __tablename__ = "status_loads"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    oldest_timestamp_utc = Column(DateTime(timezone=True))
+    newest_timestamp_utc = Column(DateTime(timezone=True), index=True)
+    loaded_at = Column(DateTime(timezone=True))
+
 #  metadata for report generation
 class Report(Base):
     __tablename__ = "reports"
@@ -67,6 +107,20 @@ class Report(Base):
     report_file_path = Column(String, nullable=True)
     error_message = Column(Text, nullable=True)
 
+    # progress while Running (business/report_progress.py); stage_timings: stage -> seconds
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    total_stores = Column(Integer, nullable=True)
+    stores_processed = Column(Integer, nullable=True)
+    stage_timings = Column(JSON, nullable=True)
+    progress_updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    # job queue (business/report_queue.py): claiming worker, its last heartbeat, times claimed
+    worker_id = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=True)
+
     __table_args__ = (
         UniqueConstraint('report_id', name='uq_report_id'),
+        # claim order of queued reports
+        Index('ix_reports_pending', 'created_at', postgresql_where=text("status = 'Pending'")),
     )
\ No newline at end of file
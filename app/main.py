@@ -1,7 +1,18 @@
 import os
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api.routes import router
+from app.services.metrics import render_metrics
+from app.database.db import dispose_async_engine
+from app.services.report_events import report_events
 
 app = FastAPI()
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(router)
+app.add_event_handler("shutdown", dispose_async_engine)
+app.add_event_handler("shutdown", report_events.stop)
+
+# Prometheus text exposition for a local scraper
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,318 @@
+"""
+In-process metrics with a Prometheus text exposition (format 0.0.4), served on /metrics.
+
+Counters and histograms live in this process. Processes without an HTTP endpoint
+(ingestion) write their metric families to METRICS_DIR/<name>.prom with
+write_metrics_textfile(), and render_metrics() merges the samples of those files into
+the exposition, labelled source="<name>".
+"""
+import os
+import glob
+import bisect
+import threading
+import time as timer_module
+
+from sqlalchemy import event
+from contextlib import contextmanager
+
+from app.database.db import engine
+
+from business.config import METRICS_DIR
+
+
+PREFIX = "store_monitoring_"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+STORE_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 25000)
+
+
+def _format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Monotonic counter, optionally labelled. Doubles as a gauge through set().
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), metric_type: str = "counter"):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.metric_type = metric_type
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}"
+            for label_values, value in sorted(values.items())
+        ]
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, optionally labelled.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: tuple, label_names: tuple = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = label_names
+        self.metric_type = "histogram"
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get_series(self, label_values: tuple) -> list:
+        # [per-bucket counts (last one is +Inf), sum, count]
+        if label_values not in self._series:
+            self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return self._series[label_values]
+
+    def observe(self, value: float, *label_values):
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get_series(label_values)
+            series[0][bucket_index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns: Copy of the raw series, for merge() in another process.
+        """
+        with self._lock:
+            return {label_values: [list(series[0]), series[1], series[2]] for label_values, series in self._series.items()}
+
+    def merge(self, after: dict, before: dict = None):
+        """
+        Adds the observations recorded between two snapshots (or all of `after`).
+        """
+        before = before or {}
+        with self._lock:
+            for label_values, (counts, total, count) in after.items():
+                previous_counts, previous_total, previous_count = before.get(label_values, ([0] * len(counts), 0.0, 0))
+                series = self._get_series(label_values)
+                for i, (bucket_count, previous_bucket_count) in enumerate(zip(counts, previous_counts)):
+                    series[0][i] += bucket_count - previous_bucket_count
+                series[1] += total - previous_total
+                series[2] += count - previous_count
+
+    def collect(self) -> list[str]:
+        lines = []
+        for label_values, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(upper_bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {count}")
+        return lines
+
+
+# Reports
+REPORTS_TOTAL = Counter("reports_total", "Reports finished, by engine and final status.", ("engine", "status"))
+REPORT_DURATION_SECONDS = Histogram("report_duration_seconds", "Wall time of a report run.", DURATION_BUCKETS, ("engine",))
+REPORT_STAGE_SECONDS = Histogram("report_stage_duration_seconds", "Time spent per report stage (db_fetch, intervals, sweep, write, compute, variants).", DURATION_BUCKETS, ("stage",))
+REPORT_STORE_COMPUTE_SECONDS = Histogram("report_store_compute_seconds", "Per-store uptime/downtime compute latency (intervals + sweep).", STORE_LATENCY_BUCKETS)
+REPORT_SQL_QUERIES = Histogram("report_sql_queries", "SQL statements issued per report.", QUERY_COUNT_BUCKETS, ("engine",))
+
+# Database
+SQL_QUERIES_TOTAL = Counter("sql_queries_total", "SQL statements executed through the SQLAlchemy engine.")
+
+# Ingestion
+INGEST_ROWS_TOTAL = Counter("ingest_rows_total", "Rows sent in batch inserts, by table.", ("table",))
+INGEST_ROWS_PER_SECOND = Counter("ingest_rows_per_second", "Rows per second of batch insert time, by table.", ("table",), metric_type="gauge")
+INGEST_BATCH_INSERT_SECONDS = Histogram("ingest_batch_insert_seconds", "Latency of one batch insert, by table.", DURATION_BUCKETS, ("table",))
+INGEST_RECORD_BUILD_SECONDS = Histogram("ingest_record_build_seconds", "Time spent turning a DataFrame into insert records (no database time), by table.", DURATION_BUCKETS, ("table",))
+
+REGISTRY = [
+    REPORTS_TOTAL, REPORT_DURATION_SECONDS, REPORT_STAGE_SECONDS, REPORT_STORE_COMPUTE_SECONDS, REPORT_SQL_QUERIES,
+    SQL_QUERIES_TOTAL,
+    INGEST_ROWS_TOTAL, INGEST_ROWS_PER_SECOND, INGEST_BATCH_INSERT_SECONDS, INGEST_RECORD_BUILD_SECONDS,
+]
+
+
+# SQL statements are counted process-wide and per thread; per-report counts are the
+# difference of thread_sql_query_count() before and after the report.
+_thread_query_counts = threading.local()
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_sql_query(conn, cursor, statement, parameters, context, executemany):
+    SQL_QUERIES_TOTAL.inc()
+    _thread_query_counts.count = getattr(_thread_query_counts, "count", 0) + 1
+
+def thread_sql_query_count() -> int:
+    """
+    Returns: SQL statements executed so far by the current thread.
+    """
+    return getattr(_thread_query_counts, "count", 0)
+
+
+_insert_seconds_by_table = {}
+_insert_lock = threading.Lock()
+
+@contextmanager
+def time_batch_insert(table_name: str, row_count: int):
+    """
+    Records the latency and rows of one batch insert executed inside the block.
+    """
+    insert_start = timer_module.perf_counter()
+    yield
+    elapsed_seconds = timer_module.perf_counter() - insert_start
+
+    INGEST_BATCH_INSERT_SECONDS.observe(elapsed_seconds, table_name)
+    INGEST_ROWS_TOTAL.inc(row_count, table_name)
+    with _insert_lock:
+        seconds, rows = _insert_seconds_by_table.get(table_name, (0.0, 0))
+        seconds, rows = seconds + elapsed_seconds, rows + row_count
+        _insert_seconds_by_table[table_name] = (seconds, rows)
+    if seconds > 0:
+        INGEST_ROWS_PER_SECOND.set(rows / seconds, table_name)
+
+
+@contextmanager
+def time_record_build(table_name: str):
+    """
+    Records the time spent building insert records inside the block.
+    """
+    build_start = timer_module.perf_counter()
+    yield
+    INGEST_RECORD_BUILD_SECONDS.observe(timer_module.perf_counter() - build_start, table_name)
+
+def ingest_metrics_snapshot() -> dict:
+    """
+    Returns: Copy of this process's ingestion metrics, for merge_ingest_metrics() in another process.
+    """
+    with _insert_lock:
+        insert_totals = dict(_insert_seconds_by_table)
+    return {
+        "batch_insert": INGEST_BATCH_INSERT_SECONDS.snapshot(),
+        "record_build": INGEST_RECORD_BUILD_SECONDS.snapshot(),
+        "insert_totals": insert_totals,
+    }
+
+def merge_ingest_metrics(after: dict, before: dict = None):
+    """
+    Adds the ingestion metrics recorded between two snapshots (or all of `after`), e.g. by a worker process.
+    """
+    before = before or {}
+    INGEST_BATCH_INSERT_SECONDS.merge(after["batch_insert"], before.get("batch_insert"))
+    INGEST_RECORD_BUILD_SECONDS.merge(after["record_build"], before.get("record_build"))
+    previous_totals = before.get("insert_totals", {})
+    for table_name, (seconds_after, rows_after) in after["insert_totals"].items():
+        seconds_before, rows_before = previous_totals.get(table_name, (0.0, 0))
+        INGEST_ROWS_TOTAL.inc(rows_after - rows_before, table_name)
+        with _insert_lock:
+            seconds, rows = _insert_seconds_by_table.get(table_name, (0.0, 0))
+            seconds, rows = seconds + seconds_after - seconds_before, rows + rows_after - rows_before
+            _insert_seconds_by_table[table_name] = (seconds, rows)
+        if seconds > 0:
+            INGEST_ROWS_PER_SECOND.set(rows / seconds, table_name)
+
+def run_with_ingest_metrics(function, *args):
+    """
+    Process-pool entry point: calls function(*args) in a worker process.
+    Returns: Tuple (result, ingestion metrics after, before), for merge_ingest_metrics() in the parent.
+    """
+    before = ingest_metrics_snapshot()
+    result = function(*args)
+    return result, ingest_metrics_snapshot(), before
+
+
+def _render_families(metrics: list) -> str:
+    lines = []
+    for metric in metrics:
+        samples = metric.collect()
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n" if lines else ""
+
+def _add_source_label(sample: str, source: str) -> str:
+    series, _, value = sample.rpartition(" ")
+    source_label = f'source="{source}"'
+    if series.endswith("}"):
+        return f"{series[:-1]},{source_label}}} {value}"
+    return f"{series}{{{source_label}}} {value}"
+
+def _read_textfile_families(textfile_paths: list) -> dict:
+    """
+    Parses textfiles written by write_metrics_textfile(); every sample gets a source label
+    with the file's name, so the same family from several processes stays distinct.
+    Returns: Dict family name -> [documentation, metric type, samples], in file order.
+    """
+    families = {}
+    for textfile_path in textfile_paths:
+        source = os.path.splitext(os.path.basename(textfile_path))[0]
+        with open(textfile_path) as f:
+            family = None
+            for line in f.read().splitlines():
+                if line.startswith("# HELP "):
+                    _, _, name, *documentation = line.split(" ", 3)
+                    family = families.setdefault(name, [" ".join(documentation), "untyped", []])
+                elif line.startswith("# TYPE "):
+                    _, _, name, metric_type = line.split(" ", 3)
+                    family = families.setdefault(name, ["", metric_type, []])
+                    family[1] = metric_type
+                elif line and not line.startswith("#") and family is not None:
+                    family[2].append(_add_source_label(line, source))
+    return families
+
+def render_metrics() -> str:
+    """
+    Returns: Prometheus text exposition of this process's metrics merged with the samples
+    of the METRICS_DIR/*.prom files written by other processes (one block per family).
+    """
+    textfile_families = _read_textfile_families(sorted(glob.glob(os.path.join(METRICS_DIR, "*.prom"))))
+
+    lines = []
+    for metric in REGISTRY:
+        _, _, textfile_samples = textfile_families.pop(metric.name, (None, None, []))
+        samples = metric.collect() + textfile_samples
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        lines.extend(samples)
+    for name, (documentation, metric_type, samples) in textfile_families.items():
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n" if lines else ""
+
+def write_metrics_textfile(name: str, metrics: list):
+    """
+    Atomically writes the given metrics of this process to METRICS_DIR/<name>.prom.
+    """
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    textfile_path = os.path.join(METRICS_DIR, f"{name}.prom")
+    partial_path = textfile_path + ".tmp"
+    with open(partial_path, "w") as f:
+        f.write(_render_families(metrics))
+    os.replace(partial_path, textfile_path)
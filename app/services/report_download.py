@@ -0,0 +1,53 @@
+"""
+HTTP helpers for report downloads: content-coding negotiation and ETag validation.
+Range and If-Range requests are answered by Starlette's FileResponse, using the ETag set here.
+"""
+import os
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    True if an Accept-Encoding header allows gzip: listed with q > 0, or covered by
+    a "*" with q > 0 and not refused explicitly.
+    """
+    qualities = {}
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    return qualities.get("*", 0) > 0
+
+def file_etag(stat_result: os.stat_result, variant: str) -> str:
+    """
+    Returns: Strong ETag of one stored representation (variant + size + mtime), quoted.
+    """
+    return f'"{variant}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match evaluation (weak comparison): "*" or any listed tag equal to etag
+    once W/ prefixes are dropped.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
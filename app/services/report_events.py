@@ -0,0 +1,136 @@
+"""
+Push-based report status for long-polling (/get_report/{report_id}?wait=) and SSE
+(/get_report/{report_id}/events).
+
+One asyncpg connection per API process LISTENs on REPORT_EVENTS_CHANNEL, where the reports
+table trigger (business/report_queue.py) publishes "<report_id>:<status>" on every status change
+and progress update. Notifications are handed to the subscriptions of that report, so waiting
+clients re-read the report only when it changed instead of polling it.
+Waiters still re-read the report every REPORT_EVENTS_RECHECK_SECONDS in case a notification was
+missed, and every REPORT_EVENTS_FALLBACK_POLL_SECONDS while LISTEN is unavailable (always on
+databases other than Postgres).
+"""
+import asyncio
+import time as timer_module
+
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from sqlalchemy.engine import make_url
+
+from app.database.db import ASYNC_DATABASE_URL
+
+from business.report_queue import REPORT_EVENTS_CHANNEL
+from business.config import REPORT_EVENTS_RECHECK_SECONDS, REPORT_EVENTS_FALLBACK_POLL_SECONDS
+
+
+def _listen_dsn() -> str:
+    # asyncpg.connect takes a plain postgresql:// DSN
+    return make_url(ASYNC_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class ReportSubscription:
+    """
+    Statuses notified for one report since it was subscribed.
+    """
+
+    def __init__(self, listener):
+        self._listener = listener
+        self._queue = asyncio.Queue()
+
+    async def next_event(self, timeout: float):
+        """
+        Waits up to `timeout` seconds (capped at the recheck or fallback poll interval) for a notification.
+        Returns: Latest notified status, or None if nothing was notified and the report should be re-read.
+        """
+        max_wait = REPORT_EVENTS_RECHECK_SECONDS if self._listener.listening else REPORT_EVENTS_FALLBACK_POLL_SECONDS
+        try:
+            status = await asyncio.wait_for(self._queue.get(), timeout=max(0.0, min(timeout, max_wait)))
+        except asyncio.TimeoutError:
+            return None
+        # Coalesce notifications that queued up meanwhile
+        while not self._queue.empty():
+            status = self._queue.get_nowait()
+        return status
+
+
+class ReportEventListener:
+    """
+    Process-wide LISTEN connection, opened on the first subscription and reopened after it drops.
+    """
+
+    def __init__(self):
+        self._connection = None
+        self._connect_lock = None
+        self._retry_at = 0.0
+        self._subscriptions = defaultdict(set)
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def _ensure_listening(self) -> bool:
+        if self.listening:
+            return True
+        if make_url(ASYNC_DATABASE_URL).get_backend_name() != "postgresql":
+            # LISTEN/NOTIFY is Postgres only: waiters poll
+            return False
+        if timer_module.monotonic() < self._retry_at:
+            return False
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self.listening:
+                return True
+            try:
+                import asyncpg
+                connection = await asyncpg.connect(_listen_dsn())
+                await connection.add_listener(REPORT_EVENTS_CHANNEL, self._on_notification)
+                connection.add_termination_listener(self._on_termination)
+                self._connection = connection
+                print(f"Report events: Listening on '{REPORT_EVENTS_CHANNEL}'.")
+                return True
+            except Exception as e:
+                # Waiters fall back to polling until the next attempt
+                self._retry_at = timer_module.monotonic() + REPORT_EVENTS_RECHECK_SECONDS
+                print(f"Report events: Warning: Could not LISTEN on '{REPORT_EVENTS_CHANNEL}': {e}")
+                return False
+
+    def _on_notification(self, connection, pid, channel, payload):
+        report_id, _, status = payload.partition(":")
+        for subscription in self._subscriptions.get(report_id, ()):
+            subscription._queue.put_nowait(status)
+
+    def _on_termination(self, connection):
+        if self._connection is connection:
+            self._connection = None
+            print("Report events: LISTEN connection closed.")
+
+    @asynccontextmanager
+    async def subscribe(self, report_id: str):
+        """
+        Subscribes to a report's notifications; subscribe before reading the report so no change is missed.
+        Usage:
+            async with report_events.subscribe(report_id) as subscription:
+                ...
+                status = await subscription.next_event(timeout)
+        """
+        await self._ensure_listening()
+        subscription = ReportSubscription(self)
+        self._subscriptions[report_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscriptions = self._subscriptions.get(report_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[report_id]
+
+    async def stop(self):
+        connection, self._connection = self._connection, None
+        if connection is not None and not connection.is_closed():
+            await connection.close()
+
+
+report_events = ReportEventListener()
@@ -0,0 +1,233 @@
+"""
+In-memory per-store status index for low-latency single-store uptime lookups.
+
+Each store's polls are kept as sorted int64 epoch-us timestamps and int8 status codes.
+The index is loaded from store_status on first use and then refreshed incrementally
+(rows with an id above the last one seen) at most every STORE_INDEX_REFRESH_SECONDS.
+Ids are handed out before commit, so concurrent ingestion can commit a lower id after a
+higher one; once a store_status load is recorded in status_loads (read by id, above the
+last load seen), its rows are re-read from its oldest poll on. Polls older than INDEX_HORIZON
+before the latest poll are evicted, except the last one before it, which still decides the
+status at the start of a window; windows starting before the horizon are rejected.
+Timezones and menu hours are reloaded every STORE_INDEX_DETAILS_REFRESH_SECONDS. Refreshes
+query the database outside the lock that lookups take, and swap the results in under it.
+"""
+import threading
+import numpy as np
+import time as timer_module
+
+from sqlalchemy import or_
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.database.db import Session
+from app.database.models import Store, Store_Status, Status_Load
+
+from business import uptime_kernel
+from business.report_rows import _get_reporting_periods, _build_report_row
+from business.generate_report import (
+    _get_all_store_details,
+    _get_cached_utc_business_intervals,
+    _get_utc_business_interval_arrays,
+    _schedule_signature,
+)
+from business.config import REPORT_WINDOWS, STORE_INDEX_REFRESH_SECONDS, STORE_INDEX_DETAILS_REFRESH_SECONDS, STORE_INDEX_MAX_WINDOW
+
+# Polls kept before the latest one: enough for every window the index answers
+INDEX_HORIZON = max([STORE_INDEX_MAX_WINDOW] + [window["duration"] for window in REPORT_WINDOWS])
+INDEX_HORIZON_US = int(INDEX_HORIZON.total_seconds() * 1_000_000)
+
+
+class StoreStatusIndex:
+    """
+    Thread-safe index of every store's polls plus its timezone and menu hours.
+    """
+
+    def __init__(self):
+        # _lock guards the indexed data for lookups; _refresh_lock admits one refresh at a time
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._timestamps = {}
+        self._codes = {}
+        self._store_details = {}
+        self._last_status_id = 0
+        self._last_load_id = 0
+        self._latest_status_us = None
+        self._status_refreshed_at = None
+        self._details_refreshed_at = None
+
+    def refresh(self, force: bool = False):
+        """
+        Pulls store_status rows added since the last refresh (and store details when due).
+        While another thread refreshes, lookups are answered from the current index; only
+        the first load is waited for.
+        """
+        if not self._refresh_lock.acquire(blocking=force or self._details_refreshed_at is None):
+            return
+        try:
+            now = timer_module.monotonic()
+            details_due = force or self._details_refreshed_at is None or now - self._details_refreshed_at >= STORE_INDEX_DETAILS_REFRESH_SECONDS
+            status_due = force or self._status_refreshed_at is None or now - self._status_refreshed_at >= STORE_INDEX_REFRESH_SECONDS
+            if not details_due and not status_due:
+                return
+
+            store_details = None
+            db = Session()
+            try:
+                if details_due:
+                    store_ids = [s[0] for s in db.query(Store.store_id)]
+                    store_details = _get_all_store_details(db, store_ids)
+                if status_due:
+                    status_update = self._load_new_status_rows(db)
+            finally:
+                db.close()
+
+            with self._lock:
+                if details_due:
+                    self._store_details = store_details
+                    self._details_refreshed_at = now
+                if status_due:
+                    merged_timestamps, merged_codes, self._last_status_id, self._last_load_id, self._latest_status_us = status_update
+                    self._timestamps.update(merged_timestamps)
+                    self._codes.update(merged_codes)
+                    self._status_refreshed_at = now
+        finally:
+            self._refresh_lock.release()
+
+    def _load_new_status_rows(self, db) -> tuple:
+        """
+        Reads rows with an id above the last one seen, plus every row from the oldest poll
+        of status loads recorded since the last refresh, and merges them into copies of the
+        affected stores' arrays; when the latest poll moved, every store is trimmed to the
+        horizon. Runs under _refresh_lock only: the arrays in the index are replaced, never
+        modified, so lookups can keep reading them meanwhile.
+        Returns: (merged timestamps and codes by store, last status id, last load id, latest status us)
+        """
+        # One ingestion records its loads one at a time, each in its own transaction, so their ids commit in order
+        loads = db.query(Status_Load.id, Status_Load.oldest_timestamp_utc).filter(Status_Load.id > self._last_load_id).all()
+        last_load_id = max([self._last_load_id] + [load_id for load_id, _ in loads])
+        # The first load reads every row anyway
+        new_load_oldest = [oldest for _, oldest in loads if self._last_status_id > 0]
+
+        status_filter = Store_Status.id > self._last_status_id
+        if new_load_oldest:
+            status_filter = or_(status_filter, Store_Status.timestamp_utc >= min(new_load_oldest))
+        new_rows = db.query(
+            Store_Status.id, Store_Status.store_id, Store_Status.timestamp_utc, Store_Status.status
+        ).filter(status_filter).order_by(Store_Status.store_id, Store_Status.timestamp_utc)
+
+        last_status_id = self._last_status_id
+        new_timestamps = defaultdict(list)
+        new_codes = defaultdict(list)
+        for status_id, store_id, timestamp_utc, status in new_rows:
+            last_status_id = max(last_status_id, status_id)
+            new_timestamps[store_id].append(uptime_kernel.to_epoch_us(timestamp_utc))
+            new_codes[store_id].append(uptime_kernel.to_status_code(status))
+
+        latest_status_us = self._latest_status_us
+        merged_timestamps, merged_codes = {}, {}
+        for store_id, store_timestamps in new_timestamps.items():
+            timestamps = np.array(store_timestamps, dtype=np.int64)
+            codes = np.array(new_codes[store_id], dtype=np.int8)
+            if store_id in self._timestamps:
+                timestamps = np.concatenate((self._timestamps[store_id], timestamps))
+                codes = np.concatenate((self._codes[store_id], codes))
+                # Late polls can be older than what is already indexed, and re-read rows are indexed twice;
+                # (store_id, timestamp_utc) is unique, so equal timestamps are the same row
+                if np.any(np.diff(timestamps) <= 0):
+                    order = np.argsort(timestamps, kind="stable")
+                    timestamps, codes = timestamps[order], codes[order]
+                    distinct = np.concatenate(([True], np.diff(timestamps) != 0))
+                    timestamps, codes = timestamps[distinct], codes[distinct]
+            merged_timestamps[store_id] = timestamps
+            merged_codes[store_id] = codes
+            if latest_status_us is None or timestamps[-1] > latest_status_us:
+                latest_status_us = int(timestamps[-1])
+
+        if latest_status_us is not None and latest_status_us != self._latest_status_us:
+            self._trim_to_horizon(merged_timestamps, merged_codes, latest_status_us - INDEX_HORIZON_US)
+
+        if new_timestamps:
+            print(f"Store index: Indexed {sum(len(v) for v in new_timestamps.values())} new status rows for {len(new_timestamps)} stores.")
+        return merged_timestamps, merged_codes, last_status_id, last_load_id, latest_status_us
+
+    def _trim_to_horizon(self, merged_timestamps: dict, merged_codes: dict, horizon_us: int):
+        """
+        Adds to the merged arrays every store whose polls reach back further than horizon_us,
+        cut to the last poll before it and those after.
+        """
+        for store_id in set(self._timestamps) | set(merged_timestamps):
+            timestamps = merged_timestamps.get(store_id, self._timestamps.get(store_id))
+            first = np.searchsorted(timestamps, horizon_us, side="left") - 1
+            if first > 0:
+                codes = merged_codes.get(store_id, self._codes.get(store_id))
+                merged_timestamps[store_id] = timestamps[first:]
+                merged_codes[store_id] = codes[first:]
+
+    def get_store_uptime(self, store_id: str, start_utc: datetime = None, end_utc: datetime = None):
+        """
+        Uptime/downtime of one store for the configured report windows ending at end_utc, or
+        for the single window [start_utc, end_utc) when start_utc is given. end_utc defaults
+        to the report end (latest poll's minute + 1), as in the full report.
+        Returns: Dict shaped like a report row plus the window bounds, or None for an unknown store.
+        Raises: ValueError if start_utc is not before end_utc, the window is longer than
+            STORE_INDEX_MAX_WINDOW, starts more than INDEX_HORIZON before the latest poll or end_utc
+            is out of range.
+        """
+        self.refresh()
+
+        end_is_report_end = end_utc is None
+        with self._lock:
+            store_details = self._store_details.get(store_id)
+            if store_details is None:
+                return None
+            if end_utc is None:
+                if self._latest_status_us is None:
+                    return None
+                latest_status_timestamp_utc = uptime_kernel.from_epoch_us(self._latest_status_us)
+                end_utc = latest_status_timestamp_utc.replace(second=0, microsecond=0) + timedelta(minutes=1)
+            timestamps = self._timestamps.get(store_id, np.zeros(0, dtype=np.int64))
+            codes = self._codes.get(store_id, np.zeros(0, dtype=np.int8))
+            latest_status_us = self._latest_status_us
+
+        if start_utc is not None:
+            if start_utc >= end_utc:
+                raise ValueError("start must be before end.")
+            if end_utc - start_utc > STORE_INDEX_MAX_WINDOW:
+                raise ValueError(f"The window from start to end may be at most {STORE_INDEX_MAX_WINDOW} long.")
+            reporting_periods = [{"name": "custom", "unit": "minutes", "start_utc": start_utc, "end_utc": end_utc}]
+        else:
+            try:
+                reporting_periods = _get_reporting_periods(end_utc)
+            except OverflowError:
+                raise ValueError("end is out of range.")
+        window_starts_utc = [period['start_utc'] for period in reporting_periods]
+        widest_period_start_utc = min(window_starts_utc)
+        if latest_status_us is not None and uptime_kernel.to_epoch_us(widest_period_start_utc) < latest_status_us - INDEX_HORIZON_US:
+            # evicted polls
+            raise ValueError(f"Windows may start at most {INDEX_HORIZON} before the latest poll.")
+
+        # Polls inside the widest window plus the last one before it
+        first = max(np.searchsorted(timestamps, uptime_kernel.to_epoch_us(widest_period_start_utc), side="left") - 1, 0)
+        last = np.searchsorted(timestamps, uptime_kernel.to_epoch_us(end_utc), side="left")
+
+        timezone_obj, menu_hours_data = store_details
+        if start_utc is None and end_is_report_end:
+            _, bh_starts, bh_ends = _get_cached_utc_business_intervals(
+                timezone_obj.key, _schedule_signature(menu_hours_data), widest_period_start_utc, end_utc
+            )
+        else:
+            # Caller-chosen windows would each take an entry of the cache the report engines share
+            bh_starts, bh_ends = _get_utc_business_interval_arrays(timezone_obj.key, menu_hours_data, widest_period_start_utc, end_utc)
+        uptime, downtime = uptime_kernel.calculate_uptime_downtime_windows(
+            timestamps[first:last], codes[first:last], bh_starts, bh_ends,
+            [uptime_kernel.to_epoch_us(window_start_utc) for window_start_utc in window_starts_utc],
+            uptime_kernel.to_epoch_us(end_utc)
+        )
+
+        store_uptime = {"store_id": store_id, "start_utc": widest_period_start_utc, "end_utc": end_utc}
+        store_uptime.update(_build_report_row(store_id, reporting_periods, zip(uptime.tolist(), downtime.tolist())))
+        return store_uptime
+
+
+store_status_index = StoreStatusIndex()
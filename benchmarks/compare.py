@@ -0,0 +1,70 @@
+"""
+Compares two benchmarks/run.py result files scale by scale.
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import json
+import argparse
+
+
+# (section, metric, True if higher is better)
+COMPARED_METRICS = [
+    ("ingest", "seconds", False),
+    ("ingest", "rows_per_second", True),
+    ("ingest", "record_build_seconds", False),
+    ("ingest", "db_insert_seconds", False),
+    ("ingest", "peak_rss_mb", False),
+    ("report", "seconds", False),
+    ("report", "stores_per_second", True),
+    ("report", "peak_rss_mb", False),
+]
+
+
+def compare_runs(baseline: dict, candidate: dict) -> list[dict]:
+    """
+    Returns: One row per (scale, metric) present in both runs, with the candidate/baseline ratio.
+    """
+    baseline_by_scale = {result["scale"]: result for result in baseline["results"]}
+    rows = []
+    for candidate_result in candidate["results"]:
+        baseline_result = baseline_by_scale.get(candidate_result["scale"])
+        if baseline_result is None:
+            continue
+        for section, metric, higher_is_better in COMPARED_METRICS:
+            # e.g. metrics added after the baseline was recorded
+            if metric not in baseline_result.get(section, {}) or metric not in candidate_result.get(section, {}):
+                continue
+            before = baseline_result[section][metric]
+            after = candidate_result[section][metric]
+            ratio = after / before if before else None
+            rows.append({
+                "scale": candidate_result["scale"],
+                "metric": f"{section}.{metric}",
+                "baseline": before,
+                "candidate": after,
+                "ratio": ratio,
+                "improved": None if ratio is None or ratio == 1 else (ratio > 1) == higher_is_better,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{'scale':>5}  {'metric':<26} {'baseline':>12} {'candidate':>12} {'ratio':>8}")
+    for row in compare_runs(baseline, candidate):
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "n/a"
+        marker = {True: "+", False: "-", None: " "}[row["improved"]]
+        print(f"{row['scale']:>4}x  {row['metric']:<26} {row['baseline']:>12} {row['candidate']:>12} {ratio:>8} {marker}")
+
+if __name__ == "__main__":
+    main()
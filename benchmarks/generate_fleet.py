@@ -0,0 +1,115 @@
+"""
+Synthetic fleet generator for benchmarks.
+
+Writes store_status.csv, menu_hours.csv and timezones.csv in the same format as the
+source data, so the output directory can be ingested with INPUT_CSV_DIR=<dir>.
+Output is deterministic for a given seed and set of parameters.
+
+Usage:
+    python -m benchmarks.generate_fleet --out /tmp/fleet --stores 1000 --polls-per-store 140
+"""
+import os
+import csv
+import uuid
+import random
+import argparse
+
+from datetime import datetime, timedelta, timezone
+
+
+DEFAULT_TIMEZONES = [
+    "America/Chicago", "America/New_York", "America/Denver", "America/Los_Angeles",
+    "America/Boise", "Asia/Kolkata", "Europe/London", "Australia/Sydney",
+]
+DEFAULT_END_UTC = datetime(2024, 10, 14, 0, 0, 0, tzinfo=timezone.utc)
+
+
+def _random_day_hours(rng: random.Random, overnight_fraction: float) -> tuple[str, str]:
+    if rng.random() < overnight_fraction:
+        # e.g. 20:00 -> 02:30, crossing local midnight
+        return f"{rng.randint(18, 22):02d}:{rng.choice((0, 30)):02d}:00", f"{rng.randint(0, 4):02d}:{rng.choice((0, 30)):02d}:00"
+    return f"{rng.randint(6, 11):02d}:{rng.choice((0, 15, 30, 45)):02d}:00", f"{rng.randint(15, 23):02d}:{rng.choice((0, 15, 30, 45)):02d}:00"
+
+def generate_fleet(
+    output_dir: str,
+    stores: int = 1000,
+    polls_per_store: int = 140,
+    days: int = 8,
+    overnight_fraction: float = 0.1,
+    timezones: list = None,
+    missing_timezone_fraction: float = 0.05,
+    missing_hours_fraction: float = 0.1,
+    uptime_probability: float = 0.9,
+    end_utc: datetime = DEFAULT_END_UTC,
+    seed: int = 42
+) -> dict:
+    """
+    Writes a synthetic fleet to output_dir. Each store gets polls_per_store polls spread
+    randomly over the `days` before end_utc. Stores get a timezone (except a
+    missing_timezone_fraction) and explicit hours for every day (except a
+    missing_hours_fraction, which fall back to the 24x7 default). overnight_fraction of
+    the store-days cross local midnight.
+    Returns: Dict of row counts per file.
+    """
+    rng = random.Random(seed)
+    timezones = timezones or DEFAULT_TIMEZONES
+    os.makedirs(output_dir, exist_ok=True)
+    period_us = days * 24 * 3600 * 1_000_000
+
+    store_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(stores)]
+    row_counts = {"store_status": 0, "menu_hours": 0, "timezones": 0}
+
+    with open(os.path.join(output_dir, "timezones.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["store_id", "timezone_str"])
+        for store_id in store_ids:
+            if rng.random() >= missing_timezone_fraction:
+                writer.writerow([store_id, rng.choice(timezones)])
+                row_counts["timezones"] += 1
+
+    with open(os.path.join(output_dir, "menu_hours.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["store_id", "dayOfWeek", "start_time_local", "end_time_local"])
+        for store_id in store_ids:
+            if rng.random() < missing_hours_fraction:
+                continue
+            for day_of_week in range(7):
+                start_time_local, end_time_local = _random_day_hours(rng, overnight_fraction)
+                writer.writerow([store_id, day_of_week, start_time_local, end_time_local])
+                row_counts["menu_hours"] += 1
+
+    with open(os.path.join(output_dir, "store_status.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["store_id", "status", "timestamp_utc"])
+        for store_id in store_ids:
+            for offset_us in sorted(rng.sample(range(period_us), polls_per_store)):
+                timestamp_utc = end_utc - timedelta(microseconds=period_us - offset_us)
+                status = "active" if rng.random() < uptime_probability else "inactive"
+                writer.writerow([store_id, status, timestamp_utc.strftime("%Y-%m-%d %H:%M:%S.%f UTC")])
+            row_counts["store_status"] += polls_per_store
+
+    return row_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic store fleet as source CSVs.")
+    parser.add_argument("--out", required=True, help="Output directory.")
+    parser.add_argument("--stores", type=int, default=1000)
+    parser.add_argument("--polls-per-store", type=int, default=140)
+    parser.add_argument("--days", type=int, default=8, help="Days of polls before the end timestamp.")
+    parser.add_argument("--overnight-fraction", type=float, default=0.1, help="Share of store-days whose hours cross midnight.")
+    parser.add_argument("--timezones", default=",".join(DEFAULT_TIMEZONES), help="Comma-separated timezone names to draw from.")
+    parser.add_argument("--missing-timezone-fraction", type=float, default=0.05)
+    parser.add_argument("--missing-hours-fraction", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    row_counts = generate_fleet(
+        args.out, args.stores, args.polls_per_store, args.days, args.overnight_fraction,
+        args.timezones.split(","), args.missing_timezone_fraction, args.missing_hours_fraction,
+        seed=args.seed
+    )
+    print(f"Fleet written to {args.out}: {row_counts}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import os
-from datetime import time
+from datetime import time, timedelta
 
 # Configuration
 DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
-MENU_HOURS_CSV = os.path.join(DATA_DIR, 'menu_hours.csv')
-STORE_STATUS_CSV = os.path.join(DATA_DIR, 'store_status.csv')
-TIMEZONES_CSV = os.path.join(DATA_DIR, 'timezones.csv')
+# Directory holding the input CSVs (e.g. a synthetic fleet from benchmarks/generate_fleet.py)
+INPUT_CSV_DIR = os.getenv("INPUT_CSV_DIR", DATA_DIR)
+MENU_HOURS_CSV = os.path.join(INPUT_CSV_DIR, 'menu_hours.csv')
+STORE_STATUS_CSV = os.path.join(INPUT_CSV_DIR, 'store_status.csv')
+TIMEZONES_CSV = os.path.join(INPUT_CSV_DIR, 'timezones.csv')
 
 # Default Values
 DEFAULT_TIMEZONE = 'America/Chicago'
@@ -17,7 +19,116 @@ DEFAULT_MENU_HOURS = {
 # Batch Sizes
 STORE_STATUS_BATCH_SIZE = 100000
 SMALL_TABLE_BATCH_SIZE = 50000
+STORE_STATUS_HOURLY_STORE_CHUNK_SIZE = 500
 
-# Report Dir
+# store_status loader
+# "copy": stream each batch with COPY FROM STDIN into a temporary staging table, then one
+#   INSERT ... SELECT ... ON CONFLICT DO NOTHING into store_status (Postgres only).
+# "insert": multi-row INSERT ... VALUES ... ON CONFLICT DO NOTHING per batch (original behaviour).
+STORE_STATUS_LOADER = os.getenv("STORE_STATUS_LOADER", "copy")
+# Format of store_status.csv timestamps; values that do not match fall back to pandas' parser
+STORE_STATUS_TIMESTAMP_FORMAT = os.getenv("STORE_STATUS_TIMESTAMP_FORMAT", "%Y-%m-%d %H:%M:%S.%f UTC")
+MENU_HOURS_TIME_FORMAT = "%H:%M:%S"
+
+# Ingestion worker processes (business/ingest_data.py): store_status.csv chunks are parsed and
+# loaded in parallel, and tables that do not depend on each other load concurrently
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", min(os.cpu_count() or 1, 4)))
+# store_status.csv is streamed in chunks of about this many rows; reading runs ahead of the
+# workers by at most STORE_STATUS_PIPELINE_QUEUE_DEPTH chunks
+STORE_STATUS_CSV_CHUNK_ROWS = int(os.getenv("STORE_STATUS_CSV_CHUNK_ROWS", 100000))
+STORE_STATUS_PIPELINE_QUEUE_DEPTH = int(os.getenv("STORE_STATUS_PIPELINE_QUEUE_DEPTH", 2))
+
+# Report Engine
+# "bulk": load timezones, menu hours and the weekly status slice once for all stores.
+# "per_store": query the database per store and per period (original behaviour).
+# "rollup": sum the pre-aggregated store_status_hourly rows (filled at ingest time) and
+#   only replay the partial hours at the window edges from store_status.
+# "sql": compute everything in Postgres with window functions (business/sql_report.py).
+# "duckdb": columnar queries over a local DuckDB file or Parquet files (business/duckdb_report.py).
+# "incremental": keep hourly uptime/downtime buckets between runs and only read status
+#   rows newer than the last run's watermark (business/incremental_report.py).
+REPORT_ENGINE = os.getenv("REPORT_ENGINE", "bulk")
+
+# Uptime Kernel
+# "numpy": vectorized kernel over int64 epoch arrays (business/uptime_kernel.py).
+# "python": original per-interval loop.
+UPTIME_KERNEL = os.getenv("UPTIME_KERNEL", "numpy")
+
+# Report Windows
+# Each window is [report_end - duration, report_end); all windows are computed in one sweep
+# over the widest one. Columns are written as uptime_<name>(<unit>) / downtime_<name>(<unit>).
+REPORT_WINDOWS = [
+    {"name": "last_hour", "duration": timedelta(hours=1), "unit": "minutes"},
+    {"name": "last_day", "duration": timedelta(days=1), "unit": "hours"},
+    {"name": "last_week", "duration": timedelta(days=7), "unit": "hours"},
+]
+
+# Report Workers
+# REPORT_WORKERS > 1 splits the store list into shards of REPORT_SHARD_SIZE stores and
+# computes them in a process pool, each worker with its own DB connection.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", 1))
+REPORT_SHARD_SIZE = int(os.getenv("REPORT_SHARD_SIZE", 500))
+
+# Report Writer
+# Rows are appended to <report>.csv.part every REPORT_WRITE_CHUNK_SIZE rows and the file is
+# renamed to <report>.csv on completion.
+REPORT_WRITE_CHUNK_SIZE = int(os.getenv("REPORT_WRITE_CHUNK_SIZE", 1000))
+
+# Report Downloads
+# Variants of <report>.csv served by GET /get_report: "csv.gz" (gzip Content-Encoding) and
+# "parquet" (zstd-compressed, written with DuckDB). Variants listed in REPORT_PRECOMPUTED_VARIANTS
+# are built when the report completes; the others on their first download.
+REPORT_PRECOMPUTED_VARIANTS = [variant for variant in os.getenv("REPORT_PRECOMPUTED_VARIANTS", "csv.gz,parquet").split(",") if variant]
+REPORT_GZIP_LEVEL = int(os.getenv("REPORT_GZIP_LEVEL", 6))
+
+# Report Executor
+# "worker": POST /trigger_report only queues a Pending row; `python -m business.worker` processes
+#   claimed reports (SELECT ... FOR UPDATE SKIP LOCKED) outside the API process.
+# "background": run the report in the API process as a FastAPI background task (original behaviour);
+#   do not run a worker against the same database in this mode.
+REPORT_EXECUTOR = os.getenv("REPORT_EXECUTOR", "worker")
+# Reports one worker process runs at once
+REPORT_WORKER_CONCURRENCY = int(os.getenv("REPORT_WORKER_CONCURRENCY", 2))
+# Seconds between queue polls while idle, and between heartbeats of running reports
+REPORT_WORKER_POLL_SECONDS = float(os.getenv("REPORT_WORKER_POLL_SECONDS", 1))
+REPORT_WORKER_HEARTBEAT_SECONDS = float(os.getenv("REPORT_WORKER_HEARTBEAT_SECONDS", 10))
+# A Running report without a heartbeat for this long is requeued (its worker is presumed dead),
+# or marked Failed once it has been claimed REPORT_MAX_ATTEMPTS times
+REPORT_WORKER_STALE_SECONDS = float(os.getenv("REPORT_WORKER_STALE_SECONDS", 60))
+REPORT_MAX_ATTEMPTS = int(os.getenv("REPORT_MAX_ATTEMPTS", 3))
+
+# Report events (long-poll ?wait= and SSE on /get_report), pushed with Postgres LISTEN/NOTIFY
+# Longest ?wait= honoured, in seconds; longer waits are cut to it
+REPORT_MAX_WAIT_SECONDS = float(os.getenv("REPORT_MAX_WAIT_SECONDS", 60))
+# Waiters re-read the report at least this often in case a notification was missed,
+# and every REPORT_EVENTS_FALLBACK_POLL_SECONDS while LISTEN is unavailable
+REPORT_EVENTS_RECHECK_SECONDS = float(os.getenv("REPORT_EVENTS_RECHECK_SECONDS", 10))
+REPORT_EVENTS_FALLBACK_POLL_SECONDS = float(os.getenv("REPORT_EVENTS_FALLBACK_POLL_SECONDS", 2))
+# SSE comment line sent when nothing else was sent for this long, keeping proxies from closing the stream
+REPORT_SSE_KEEPALIVE_SECONDS = float(os.getenv("REPORT_SSE_KEEPALIVE_SECONDS", 15))
+
+# Minimum seconds between progress updates written to the Report row while it runs
+REPORT_PROGRESS_INTERVAL_SECONDS = float(os.getenv("REPORT_PROGRESS_INTERVAL_SECONDS", 2))
+
+# Business-hours interval cache (entries keyed by timezone, weekly schedule and period)
+BUSINESS_INTERVAL_CACHE_SIZE = int(os.getenv("BUSINESS_INTERVAL_CACHE_SIZE", 4096))
+
+# Report Dir, created by the first report written
 REPORTS_DIR = os.path.join(DATA_DIR, 'reports')
-os.makedirs(REPORTS_DIR, exist_ok=True)
\ No newline at end of file
+
+# Incremental report state (REPORT_ENGINE=incremental); delete the file to force a rebuild
+INCREMENTAL_STATE_PATH = os.getenv("INCREMENTAL_STATE_PATH", os.path.join(DATA_DIR, 'incremental_report_state.pkl'))
+
+# DuckDB/Parquet backend (REPORT_ENGINE=duckdb, python -m business.duckdb_report)
+# Reports read DUCKDB_PARQUET_DIR/<table>.parquet when it is set, otherwise the DUCKDB_PATH file.
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", os.path.join(DATA_DIR, 'store_monitoring.duckdb'))
+DUCKDB_PARQUET_DIR = os.getenv("DUCKDB_PARQUET_DIR", "")
+
+# Metrics textfiles (<name>.prom) written by processes without an HTTP endpoint, served on /metrics
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(DATA_DIR, 'metrics'))
+
+# In-memory store status index behind GET /stores/{store_id}/uptime
+STORE_INDEX_REFRESH_SECONDS = float(os.getenv("STORE_INDEX_REFRESH_SECONDS", 5))
+STORE_INDEX_DETAILS_REFRESH_SECONDS = float(os.getenv("STORE_INDEX_DETAILS_REFRESH_SECONDS", 300))
+# Longest start..end window it answers; default the widest report window
+STORE_INDEX_MAX_WINDOW = timedelta(seconds=float(os.getenv("STORE_INDEX_MAX_WINDOW_SECONDS", max(window["duration"] for window in REPORT_WINDOWS).total_seconds())))
@@ -6,12 +6,12 @@ from sqlalchemy.orm import Session as DBSession
 from sqlalchemy import func
 import os
 from collections import defaultdict
-import bisect
 import uuid
 
 # Import your database session and models
 from app.database.db import Session, engine
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone, Report
+from business.status_series import StatusSeries
 
 # --- Configuration ---
 DEFAULT_TIMEZONE = 'America/Chicago'
@@ -56,19 +56,19 @@ def _get_store_details(db: DBSession, store_id: str):
 
     return pytz_timezone_obj, menu_hours_dict
 
-def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: datetime, period_end_utc: datetime):
+def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: datetime, period_end_utc: datetime) -> StatusSeries:
     """
     Fetches Store_Status records for a store within a given UTC period,
     plus the last known status *before* the period starts for accurate interpolation.
-    Returns: List of sorted Store_Status objects.
+    Returns: StatusSeries of the sorted polls.
     """
-    status_within_period = db.query(Store_Status).filter(
+    status_within_period = db.query(Store_Status.timestamp_utc, Store_Status.status).filter(
         Store_Status.store_id == store_id,
         Store_Status.timestamp_utc >= period_start_utc,
         Store_Status.timestamp_utc < period_end_utc
     ).order_by(Store_Status.timestamp_utc).all()
 
-    last_status_before_period = db.query(Store_Status).filter(
+    last_status_before_period = db.query(Store_Status.timestamp_utc, Store_Status.status).filter(
         Store_Status.store_id == store_id,
         Store_Status.timestamp_utc < period_start_utc
     ).order_by(Store_Status.timestamp_utc.desc()).first()
@@ -77,29 +77,16 @@ def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: da
     if last_status_before_period:
         all_relevant_statuses.append(last_status_before_period)
     all_relevant_statuses.extend(status_within_period)
-    
-    all_relevant_statuses.sort(key=lambda x: x.timestamp_utc)
 
-    return all_relevant_statuses
+    return StatusSeries.from_rows(all_relevant_statuses)
 
-def _get_status_at_time(sorted_status_data: list, current_time_utc: datetime) -> bool: # Changed return type hint to bool
+def _get_status_at_time(status_series: StatusSeries, current_time_utc: datetime) -> bool:
     """
     Determines the interpolated 'active'/'inactive' status at a specific UTC timestamp
-    based on sorted status data using a binary search (bisect).
-    Returns True for 'active', False for 'inactive'.
+    with a binary search over the store's StatusSeries.
+    Returns True for 'active', False for 'inactive' (also before the first entry).
     """
-    # Assuming 'active' is True and 'inactive' is False based on fetched data
-    current_status = False # Default if no status data available or before first entry (inactive)
-
-    timestamps = [entry.timestamp_utc for entry in sorted_status_data]
-    
-    idx = bisect.bisect_right(timestamps, current_time_utc)
-
-    if idx > 0:
-        # Assuming status_entry.status returns a boolean now
-        current_status = sorted_status_data[idx - 1].status 
-    
-    return current_status
+    return status_series.status_at(current_time_utc)
 
 def _is_within_business_hours(local_datetime: datetime, menu_hours_for_day: list) -> bool:
     """
@@ -242,13 +229,10 @@ def _calculate_uptime_downtime_for_period(
     
     if debug_mode:
         print("Relevant Status Data (fetched):")
-        for entry in relevant_status_data:
-            print(f"  {entry.timestamp_utc} -> {entry.status}")
+        for timestamp_utc, status in relevant_status_data:
+            print(f"  {timestamp_utc} -> {status}")
         print("--- End Relevant Status Data ---")
 
-    # Extract just the timestamps from relevant_status_data for bisect
-    status_timestamps = [entry.timestamp_utc for entry in relevant_status_data]
-    
     # Pre-calculate all UTC business hour intervals for this period
     utc_business_hours_intervals = _get_all_utc_business_intervals_for_period(
         timezone_obj, menu_hours_data, period_start_utc, period_end_utc, debug_mode=debug_mode
@@ -259,13 +243,13 @@ def _calculate_uptime_downtime_for_period(
     all_event_timestamps_utc.add(period_start_utc)
     all_event_timestamps_utc.add(period_end_utc)
 
-    for status_entry in relevant_status_data:
+    for status_timestamp_utc in relevant_status_data.datetimes():
         # Only add status timestamps that are within the calculation period or define the start
         # of a segment inside the period.
         # It's crucial to only add timestamps that fall within the *actual* period boundaries
         # to avoid extraneous intervals. The last_status_before_period handles the state just before.
-        if period_start_utc <= status_entry.timestamp_utc <= period_end_utc:
-            all_event_timestamps_utc.add(status_entry.timestamp_utc)
+        if period_start_utc <= status_timestamp_utc <= period_end_utc:
+            all_event_timestamps_utc.add(status_timestamp_utc)
     
     for bh_start, bh_end in utc_business_hours_intervals:
         all_event_timestamps_utc.add(bh_start)
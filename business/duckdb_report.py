@@ -0,0 +1,406 @@
+"""
+Embedded DuckDB/Parquet analytical backend.
+
+Loads store_status, menu_hours and timezones into a local DuckDB file, either straight from
+the CSVs or exported from Postgres, optionally exports them to Parquet, and computes the
+report as columnar queries over those files. The report path needs no Postgres at all.
+
+Usage:
+    python -m business.duckdb_report ingest-csv          # CSVs in data/ -> DUCKDB_PATH
+    python -m business.duckdb_report export-postgres     # Postgres tables -> DUCKDB_PATH
+    python -m business.duckdb_report export-parquet DIR  # DUCKDB_PATH -> DIR/<table>.parquet
+    python -m business.duckdb_report report [--out PATH] # report from DUCKDB_PATH (or DUCKDB_PARQUET_DIR)
+"""
+import os
+import uuid
+import argparse
+import time as timer_module
+
+from datetime import datetime, timedelta
+
+from business import uptime_kernel
+from business.timezones import get_local_offset_segments
+from business.report_writer import StreamingReportWriter
+from business.report_rows import _get_reporting_periods, _get_output_columns, _build_report_row
+from business.config import (
+    DUCKDB_PATH,
+    DUCKDB_PARQUET_DIR,
+    REPORTS_DIR,
+    MENU_HOURS_CSV,
+    STORE_STATUS_CSV,
+    TIMEZONES_CSV,
+    STORE_STATUS_BATCH_SIZE,
+    DEFAULT_TIMEZONE,
+    DEFAULT_MENU_HOURS as DEFAULT_BUSINESS_HOURS
+)
+
+TABLES = ["stores", "store_status", "menu_hours", "timezones"]
+DAY_US = 86400 * 1_000_000
+
+SCHEMA_SQL = """
+CREATE OR REPLACE TABLE stores (store_id VARCHAR);
+CREATE OR REPLACE TABLE store_status (store_id VARCHAR, status BOOLEAN, timestamp_utc TIMESTAMPTZ);
+CREATE OR REPLACE TABLE menu_hours (store_id VARCHAR, day_of_week SMALLINT, start_time_local TIME, end_time_local TIME);
+CREATE OR REPLACE TABLE timezones (store_id VARCHAR, timezone_str VARCHAR);
+"""
+
+# Same computation as business/sql_report.py, in BIGINT epoch microseconds.
+# $period_start_us is the widest window's start, $period_end_us the report end.
+UPTIME_DOWNTIME_SQL = """
+WITH
+-- Offset-transition segments per zone: a local time t in [local_from_us, local_to_us) is UTC t - offset_us.
+tz_segments AS (
+    SELECT unnest($seg_timezones) AS timezone_str,
+        CAST(unnest($seg_local_from_us) AS BIGINT) AS local_from_us,
+        CAST(unnest($seg_local_to_us) AS BIGINT) AS local_to_us,
+        CAST(unnest($seg_offset_us) AS BIGINT) AS offset_us
+),
+store_zones AS (
+    SELECT s.store_id, COALESCE(tz.timezone_str, $default_timezone) AS timezone_str
+    FROM stores s
+    LEFT JOIN timezones tz ON tz.store_id = s.store_id
+),
+-- Explicit hours replace the default for their day; days without any use the default.
+store_hours AS (
+    SELECT store_id, day_of_week,
+        epoch_us(DATE '1970-01-01' + start_time_local) AS start_us,
+        epoch_us(DATE '1970-01-01' + end_time_local) AS end_us
+    FROM menu_hours
+    UNION ALL
+    SELECT s.store_id, dow.day_of_week,
+        epoch_us(DATE '1970-01-01' + CAST($default_start AS TIME)),
+        epoch_us(DATE '1970-01-01' + CAST($default_end AS TIME))
+    FROM stores s
+    CROSS JOIN range(0, 7) AS dow(day_of_week)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM menu_hours mh WHERE mh.store_id = s.store_id AND mh.day_of_week = dow.day_of_week
+    )
+),
+local_days AS (
+    SELECT $first_day_us + i * $day_us AS day_us, ($first_day_of_week + i) % 7 AS day_of_week
+    FROM range(0, $day_count) AS t(i)
+),
+bh_local AS (
+    SELECT sz.store_id, sz.timezone_str,
+        ld.day_us + h.start_us AS local_start,
+        ld.day_us + h.end_us + CASE WHEN h.start_us > h.end_us THEN $day_us ELSE 0 END AS local_end
+    FROM store_zones sz
+    JOIN store_hours h ON h.store_id = sz.store_id
+    JOIN local_days ld ON ld.day_of_week = h.day_of_week
+),
+bh_clipped AS (
+    SELECT store_id,
+        GREATEST(utc_start, $period_start_us) AS bh_start,
+        LEAST(utc_end, $period_end_us) AS bh_end
+    FROM (
+        SELECT bl.store_id,
+            bl.local_start - ss.offset_us AS utc_start,
+            bl.local_end - se.offset_us AS utc_end
+        FROM bh_local bl
+        JOIN tz_segments ss
+            ON ss.timezone_str = bl.timezone_str AND bl.local_start >= ss.local_from_us AND bl.local_start < ss.local_to_us
+        JOIN tz_segments se
+            ON se.timezone_str = bl.timezone_str AND bl.local_end >= se.local_from_us AND bl.local_end < se.local_to_us
+    ) bh
+    WHERE utc_start < $period_end_us AND utc_end > $period_start_us
+),
+-- Gaps-and-islands merge of overlapping or touching intervals.
+bh_marked AS (
+    SELECT store_id, bh_start, bh_end,
+        CASE WHEN bh_start <= MAX(bh_end) OVER (
+            PARTITION BY store_id ORDER BY bh_start, bh_end ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ) THEN 0 ELSE 1 END AS starts_island
+    FROM bh_clipped
+    WHERE bh_start < bh_end
+),
+bh_islands AS (
+    SELECT store_id, bh_start, bh_end,
+        SUM(starts_island) OVER (PARTITION BY store_id ORDER BY bh_start, bh_end ROWS UNBOUNDED PRECEDING) AS island
+    FROM bh_marked
+),
+business_hours AS (
+    SELECT store_id, MIN(bh_start) AS bh_start, MAX(bh_end) AS bh_end
+    FROM bh_islands
+    GROUP BY store_id, island
+),
+-- Polls in the period, each store's last poll before it, and an inactive sentinel so
+-- time before a store's first poll counts as downtime.
+polls AS (
+    SELECT store_id, epoch_us(timestamp_utc) AS ts_us, status
+    FROM store_status
+    WHERE epoch_us(timestamp_utc) >= $period_start_us AND epoch_us(timestamp_utc) < $period_end_us
+    UNION ALL
+    SELECT store_id, MAX(epoch_us(timestamp_utc)) AS ts_us, ARG_MAX(status, epoch_us(timestamp_utc)) AS status
+    FROM store_status
+    WHERE epoch_us(timestamp_utc) < $period_start_us
+    GROUP BY store_id
+    UNION ALL
+    SELECT store_id, CAST(-9223372036854775807 AS BIGINT), false
+    FROM stores
+),
+status_intervals AS (
+    SELECT store_id, status,
+        GREATEST(ts_us, $period_start_us) AS status_start,
+        LEAST(GREATEST(COALESCE(LEAD(ts_us) OVER (PARTITION BY store_id ORDER BY ts_us), $period_end_us), $period_start_us), $period_end_us) AS status_end
+    FROM polls
+),
+windows AS (
+    SELECT unnest($window_starts_us) AS window_start, unnest(range(1, len($window_starts_us) + 1)) AS window_index
+),
+status_overlaps AS (
+    SELECT si.store_id, w.window_index, si.status,
+        LEAST(si.status_end, bh.bh_end) - GREATEST(si.status_start, bh.bh_start, w.window_start) AS overlap_us
+    FROM status_intervals si
+    JOIN business_hours bh
+        ON bh.store_id = si.store_id
+       AND bh.bh_start < si.status_end
+       AND bh.bh_end > si.status_start
+    CROSS JOIN windows w
+    WHERE si.status IS NOT NULL
+      AND LEAST(si.status_end, bh.bh_end) > GREATEST(si.status_start, bh.bh_start, w.window_start)
+)
+SELECT
+    store_id,
+    window_index,
+    CAST(COALESCE(SUM(overlap_us) FILTER (WHERE status), 0) AS BIGINT) AS uptime_us,
+    CAST(COALESCE(SUM(overlap_us) FILTER (WHERE NOT status), 0) AS BIGINT) AS downtime_us
+FROM status_overlaps
+GROUP BY store_id, window_index
+"""
+
+
+def import_duckdb():
+    """
+    Returns: The duckdb module.
+    Raises: RuntimeError if the optional 'duckdb' package is not installed.
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise RuntimeError("The DuckDB backend needs the 'duckdb' package: pip install duckdb") from e
+    return duckdb
+
+def connect(read_only: bool = False):
+    """
+    Opens the report source: the DuckDB file at DUCKDB_PATH, or, if DUCKDB_PARQUET_DIR is set
+    (and read_only), an in-memory database with views over <dir>/<table>.parquet.
+    """
+    duckdb = import_duckdb()
+    if read_only and DUCKDB_PARQUET_DIR:
+        con = duckdb.connect()
+        for table in TABLES:
+            parquet_path = os.path.join(DUCKDB_PARQUET_DIR, f"{table}.parquet").replace("'", "''")
+            con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{parquet_path}')")
+        return con
+    return duckdb.connect(DUCKDB_PATH, read_only=read_only)
+
+
+# Loading
+
+def ingest_csv_to_duckdb():
+    """
+    Loads the CSVs in data/ into DUCKDB_PATH, applying the same cleaning as the Postgres
+    ingestors: rows missing required fields are dropped, status is 'active' -> True,
+    duplicate (store_id, timestamp_utc) polls and per-store timezones keep the first row,
+    and stores are the union of store ids in store_status and menu_hours.
+    """
+    start_time = datetime.now()
+    print(f"Ingesting CSV files into {DUCKDB_PATH}...")
+
+    con = connect()
+    try:
+        con.execute(SCHEMA_SQL)
+        con.execute("""
+            INSERT INTO store_status
+            SELECT store_id, status, timestamp_utc FROM (
+                SELECT store_id, lower(status) = 'active' AS status, CAST(timestamp_utc AS TIMESTAMPTZ) AS timestamp_utc,
+                    row_number() OVER () AS file_row
+                FROM read_csv(?, header = true, all_varchar = true)
+                WHERE store_id IS NOT NULL AND status IS NOT NULL AND timestamp_utc IS NOT NULL
+            )
+            QUALIFY row_number() OVER (PARTITION BY store_id, timestamp_utc ORDER BY file_row) = 1
+        """, [STORE_STATUS_CSV])
+        con.execute("""
+            INSERT INTO menu_hours
+            SELECT DISTINCT store_id, CAST(dayOfWeek AS SMALLINT), CAST(start_time_local AS TIME), CAST(end_time_local AS TIME)
+            FROM read_csv(?, header = true, all_varchar = true)
+            WHERE store_id IS NOT NULL AND dayOfWeek IS NOT NULL AND start_time_local IS NOT NULL AND end_time_local IS NOT NULL
+        """, [MENU_HOURS_CSV])
+        con.execute("""
+            INSERT INTO timezones
+            SELECT store_id, timezone_str FROM (
+                SELECT store_id, timezone_str, row_number() OVER () AS file_row
+                FROM read_csv(?, header = true, all_varchar = true)
+                WHERE store_id IS NOT NULL AND timezone_str IS NOT NULL
+            )
+            QUALIFY row_number() OVER (PARTITION BY store_id ORDER BY file_row) = 1
+        """, [TIMEZONES_CSV])
+        con.execute("""
+            INSERT INTO stores
+            SELECT store_id FROM store_status UNION SELECT store_id FROM menu_hours
+        """)
+        for table in TABLES:
+            print(f"  {table}: {con.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]} rows")
+    finally:
+        con.close()
+    print(f"DuckDB ingestion finished in {datetime.now() - start_time} seconds.")
+
+def export_postgres_to_duckdb():
+    """
+    Copies the stores, store_status, menu_hours and timezones tables from Postgres
+    (DATABASE_URL) into DUCKDB_PATH, STORE_STATUS_BATCH_SIZE rows at a time.
+    """
+    import pandas as pd
+    from app.database.db import engine
+
+    start_time = datetime.now()
+    print(f"Exporting Postgres tables into {DUCKDB_PATH}...")
+
+    columns_by_table = {
+        "stores": "store_id",
+        "store_status": "store_id, status, timestamp_utc",
+        "menu_hours": "store_id, day_of_week, CAST(start_time_local AS VARCHAR) AS start_time_local, CAST(end_time_local AS VARCHAR) AS end_time_local",
+        "timezones": "store_id, timezone_str",
+    }
+    con = connect()
+    try:
+        con.execute(SCHEMA_SQL)
+        with engine.connect() as pg_conn:
+            for table, columns in columns_by_table.items():
+                total_count = 0
+                for chunk in pd.read_sql_query(f"SELECT {columns} FROM {table}", pg_conn, chunksize=STORE_STATUS_BATCH_SIZE):
+                    con.register("export_chunk", chunk)
+                    con.execute(f"INSERT INTO {table} SELECT * FROM export_chunk")
+                    con.unregister("export_chunk")
+                    total_count += len(chunk)
+                print(f"  {table}: {total_count} rows")
+    finally:
+        con.close()
+    print(f"Postgres export finished in {datetime.now() - start_time} seconds.")
+
+def export_duckdb_to_parquet(parquet_dir: str):
+    """
+    Writes every table of DUCKDB_PATH to <parquet_dir>/<table>.parquet.
+    """
+    os.makedirs(parquet_dir, exist_ok=True)
+    con = connect(read_only=True)
+    try:
+        for table in TABLES:
+            parquet_path = os.path.join(parquet_dir, f"{table}.parquet").replace("'", "''")
+            con.execute(f"COPY {table} TO '{parquet_path}' (FORMAT PARQUET)")
+            print(f"  {table} -> {parquet_path}")
+    finally:
+        con.close()
+
+
+# Report
+
+def get_duckdb_report_inputs(con) -> tuple:
+    """
+    Returns: Tuple (latest status timestamp as aware UTC datetime or None, sorted store ids)
+    """
+    latest_us = con.execute("SELECT MAX(epoch_us(timestamp_utc)) FROM store_status").fetchone()[0]
+    store_ids = [row[0] for row in con.execute("SELECT DISTINCT store_id FROM stores ORDER BY store_id").fetchall()]
+    latest_status_timestamp_utc = uptime_kernel.from_epoch_us(latest_us) if latest_us is not None else None
+    return latest_status_timestamp_utc, store_ids
+
+def compute_duckdb_report_rows(con, report_id: str, store_ids: list, report_end_time_utc: datetime) -> list[dict]:
+    """
+    Produces the report rows for store_ids with a single columnar query.
+    """
+    reporting_periods = _get_reporting_periods(report_end_time_utc)
+    window_starts_us = [uptime_kernel.to_epoch_us(period['start_utc']) for period in reporting_periods]
+    period_start_us = min(window_starts_us)
+    period_end_us = uptime_kernel.to_epoch_us(report_end_time_utc)
+
+    timezone_names = [row[0] for row in con.execute("SELECT DISTINCT timezone_str FROM timezones").fetchall()]
+    timezone_segments = get_local_offset_segments(timezone_names, min(period['start_utc'] for period in reporting_periods), report_end_time_utc)
+    segments = [(timezone_name, *segment) for timezone_name, zone_segments in timezone_segments.items() for segment in zone_segments]
+
+    # Local days to expand menu hours over, with margin for any UTC offset
+    first_day_us = period_start_us - period_start_us % DAY_US - 3 * DAY_US
+    day_count = (period_end_us - first_day_us) // DAY_US + 4
+
+    print(f"Report {report_id}: Computing uptime/downtime in DuckDB.")
+    result = con.execute(UPTIME_DOWNTIME_SQL, {
+        "seg_timezones": [segment[0] for segment in segments],
+        "seg_local_from_us": [segment[1] for segment in segments],
+        "seg_local_to_us": [segment[2] for segment in segments],
+        "seg_offset_us": [segment[3] for segment in segments],
+        "default_timezone": DEFAULT_TIMEZONE,
+        "default_start": DEFAULT_BUSINESS_HOURS['start_time_local'].isoformat(),
+        "default_end": DEFAULT_BUSINESS_HOURS['end_time_local'].isoformat(),
+        "first_day_us": first_day_us,
+        "first_day_of_week": uptime_kernel.from_epoch_us(first_day_us).weekday(),
+        "day_count": day_count,
+        "day_us": DAY_US,
+        "period_start_us": period_start_us,
+        "period_end_us": period_end_us,
+        "window_starts_us": window_starts_us,
+    }).fetchall()
+
+    window_us_by_store = {}
+    for store_id, window_index, uptime_us, downtime_us in result:
+        window_us_by_store.setdefault(store_id, [(0, 0)] * len(reporting_periods))[window_index - 1] = (uptime_us, downtime_us)
+
+    no_business_hours = [(0, 0)] * len(reporting_periods)
+    return [
+        _build_report_row(store_id, reporting_periods, [
+            (uptime_us / uptime_kernel.MICROSECONDS_PER_MINUTE, downtime_us / uptime_kernel.MICROSECONDS_PER_MINUTE)
+            for uptime_us, downtime_us in window_us_by_store.get(store_id, no_business_hours)
+        ])
+        for store_id in store_ids
+    ]
+
+def generate_duckdb_report_csv(report_filepath: str, report_id: str) -> dict:
+    """
+    Standalone report run against DuckDB/Parquet only (no Postgres).
+    Returns: Run stats dict.
+    """
+    process_start_time = timer_module.monotonic()
+    con = connect(read_only=True)
+    try:
+        latest_status_timestamp_utc, store_ids = get_duckdb_report_inputs(con)
+        if latest_status_timestamp_utc is None:
+            raise ValueError("No store status data available for report generation.")
+
+        report_end_time_utc = latest_status_timestamp_utc.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        print(f"Report {report_id}: Calculations relative to: {report_end_time_utc} UTC")
+        print(f"Report {report_id}: Found {len(store_ids)} unique stores to process.")
+
+        reporting_periods = _get_reporting_periods(report_end_time_utc)
+        with StreamingReportWriter(report_filepath, _get_output_columns(reporting_periods)) as report_writer:
+            report_writer.write_rows(compute_duckdb_report_rows(con, report_id, store_ids, report_end_time_utc))
+            report_writer.commit()
+    finally:
+        con.close()
+
+    return {"stores": len(store_ids), "elapsed_seconds": round(timer_module.monotonic() - process_start_time, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DuckDB/Parquet report backend.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("ingest-csv", help="Load the CSVs in data/ into DUCKDB_PATH.")
+    subparsers.add_parser("export-postgres", help="Copy the Postgres tables into DUCKDB_PATH.")
+    parquet_parser = subparsers.add_parser("export-parquet", help="Write DUCKDB_PATH tables as Parquet files.")
+    parquet_parser.add_argument("parquet_dir")
+    report_parser = subparsers.add_parser("report", help="Generate a report CSV from DUCKDB_PATH or DUCKDB_PARQUET_DIR.")
+    report_parser.add_argument("--out", help="Output CSV path (default: data/reports/<report_id>.csv).")
+    args = parser.parse_args()
+
+    if args.command == "ingest-csv":
+        ingest_csv_to_duckdb()
+    elif args.command == "export-postgres":
+        export_postgres_to_duckdb()
+    elif args.command == "export-parquet":
+        export_duckdb_to_parquet(args.parquet_dir)
+    elif args.command == "report":
+        report_id = str(uuid.uuid4())
+        report_filepath = args.out or os.path.join(REPORTS_DIR, f"{report_id}.csv")
+        run_stats = generate_duckdb_report_csv(report_filepath, report_id)
+        print(f"Report {report_id}: Report saved to {report_filepath}")
+        print(f"Report {report_id}: Run stats: {run_stats}")
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,61 @@
 import os
-import pytz
-import bisect
-import pandas as pd
+import threading
+import numpy as np
+import multiprocessing
 import time as timer_module
 
 
-from sqlalchemy import func
+from itertools import repeat
+from zoneinfo import ZoneInfo
+from functools import lru_cache
+from sqlalchemy import func, and_, update
 from collections import defaultdict
 from sqlalchemy.orm import Session as DBSession
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone, time
 
 from app.database.db import Session, engine
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone, Report
+from app.services import metrics
+
+from business import uptime_kernel
+from business.report_writer import StreamingReportWriter, report_csv_path
+from business.report_progress import StageTimer, ReportProgress
+from business.report_queue import ReportClaim, ReportClaimLost, claim_filter
+from business.report_formats import build_report_variants, remove_report_files
+from business.status_series import StatusSeries, EMPTY_STATUS_SERIES, split_by_store
+from business.report_rows import _get_reporting_periods, _get_output_columns, _build_report_row
+from business.timezones import DAY_US, UnknownTimezoneError, get_timezone, get_offset_table, utc_offset_us, local_to_utc_us
 
 from business.config import (
-    REPORTS_DIR,
+    REPORT_ENGINE,
+    UPTIME_KERNEL,
+    REPORT_WORKERS,
+    REPORT_SHARD_SIZE,
+    BUSINESS_INTERVAL_CACHE_SIZE,
+    REPORT_PRECOMPUTED_VARIANTS,
     DEFAULT_TIMEZONE,
     DEFAULT_MENU_HOURS as DEFAULT_BUSINESS_HOURS
 )
 
-
-def _get_store_details(db: DBSession, store_id: str):
+def _build_store_details(store_id: str, timezone_str: str, explicit_hours: list):
     """
-    Fetches a store's timezone and organized menu hours.
-    Returns: Tuple (pytz_timezone_obj, menu_hours_dict)
+    Builds a store's ZoneInfo timezone and organized menu hours from already-fetched rows.
+    explicit_hours: Iterable of rows exposing day_of_week, start_time_local, end_time_local.
+    Returns: Tuple (timezone_obj, menu_hours_dict)
     """
-    store_timezone_entry = db.query(Timezone).filter(Timezone.store_id == store_id).first()
-    timezone_str = store_timezone_entry.timezone_str if store_timezone_entry else DEFAULT_TIMEZONE
+    timezone_str = timezone_str or DEFAULT_TIMEZONE
     try:
-        pytz_timezone_obj = pytz.timezone(timezone_str)
-    except pytz.UnknownTimeZoneError:
+        timezone_obj = get_timezone(timezone_str)
+    except UnknownTimezoneError:
         print(f"Warning: Unknown timezone '{timezone_str}' for store {store_id}. Using default '{DEFAULT_TIMEZONE}'.")
-        pytz_timezone_obj = pytz.timezone(DEFAULT_TIMEZONE)
+        timezone_obj = get_timezone(DEFAULT_TIMEZONE)
 
     menu_hours_dict = defaultdict(lambda: [
         {'start_time_local': DEFAULT_BUSINESS_HOURS['start_time_local'],
          'end_time_local': DEFAULT_BUSINESS_HOURS['end_time_local']}
     ])
 
-    explicit_hours = db.query(Menu_Hours).filter(Menu_Hours.store_id == store_id).all()
-    
     for mh in explicit_hours:
         if mh.day_of_week not in menu_hours_dict or \
            menu_hours_dict[mh.day_of_week] == [{'start_time_local': DEFAULT_BUSINESS_HOURS['start_time_local'], 'end_time_local': DEFAULT_BUSINESS_HOURS['end_time_local']}]:
@@ -50,21 +66,57 @@ def _get_store_details(db: DBSession, store_id: str):
             'end_time_local': mh.end_time_local
         })
 
-    return pytz_timezone_obj, menu_hours_dict
+    return timezone_obj, menu_hours_dict
 
-def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: datetime, period_end_utc: datetime):
+def _get_store_details(db: DBSession, store_id: str):
+    """
+    Fetches a store's timezone and organized menu hours.
+    Returns: Tuple (timezone_obj, menu_hours_dict)
+    """
+    store_timezone_entry = db.query(Timezone).filter(Timezone.store_id == store_id).first()
+    timezone_str = store_timezone_entry.timezone_str if store_timezone_entry else DEFAULT_TIMEZONE
+
+    explicit_hours = db.query(Menu_Hours).filter(Menu_Hours.store_id == store_id).all()
+
+    return _build_store_details(store_id, timezone_str, explicit_hours)
+
+def _get_all_store_details(db: DBSession, store_ids: list, filter_store_ids: list = None) -> dict:
+    """
+    Bulk variant of _get_store_details: loads timezones and menu hours for many
+    stores with one query per table and groups them in memory.
+    filter_store_ids: Restricts the queries to these stores (None loads whole tables).
+    Returns: Dict store_id -> (timezone_obj, menu_hours_dict) for store_ids.
+    """
+    timezone_query = db.query(Timezone.store_id, Timezone.timezone_str)
+    menu_hours_query = db.query(Menu_Hours.store_id, Menu_Hours.day_of_week, Menu_Hours.start_time_local, Menu_Hours.end_time_local)
+    if filter_store_ids is not None:
+        timezone_query = timezone_query.filter(Timezone.store_id.in_(filter_store_ids))
+        menu_hours_query = menu_hours_query.filter(Menu_Hours.store_id.in_(filter_store_ids))
+
+    timezone_by_store = {store_id: timezone_str for store_id, timezone_str in timezone_query}
+
+    hours_by_store = defaultdict(list)
+    for mh in menu_hours_query:
+        hours_by_store[mh.store_id].append(mh)
+
+    return {
+        store_id: _build_store_details(store_id, timezone_by_store.get(store_id), hours_by_store.get(store_id, []))
+        for store_id in store_ids
+    }
+
+def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: datetime, period_end_utc: datetime) -> StatusSeries:
     """
     Fetches Store_Status records for a store within a given UTC period,
     plus the last known status *before* the period starts for accurate interpolation.
-    Returns: List of sorted Store_Status objects.
+    Returns: StatusSeries of the sorted polls.
     """
-    status_within_period = db.query(Store_Status).filter(
+    status_within_period = db.query(Store_Status.timestamp_utc, Store_Status.status).filter(
         Store_Status.store_id == store_id,
         Store_Status.timestamp_utc >= period_start_utc,
         Store_Status.timestamp_utc < period_end_utc
     ).order_by(Store_Status.timestamp_utc).all()
 
-    last_status_before_period = db.query(Store_Status).filter(
+    last_status_before_period = db.query(Store_Status.timestamp_utc, Store_Status.status).filter(
         Store_Status.store_id == store_id,
         Store_Status.timestamp_utc < period_start_utc
     ).order_by(Store_Status.timestamp_utc.desc()).first()
@@ -73,25 +125,66 @@ def _get_relevant_status_data(db: DBSession, store_id: str, period_start_utc: da
     if last_status_before_period:
         all_relevant_statuses.append(last_status_before_period)
     all_relevant_statuses.extend(status_within_period)
-    
-    all_relevant_statuses.sort(key=lambda x: x.timestamp_utc)
 
-    return all_relevant_statuses
+    return StatusSeries.from_rows(all_relevant_statuses)
 
-def _get_status_at_time(sorted_status_data: list, current_time_utc: datetime) -> str:
+def _get_all_relevant_status_data(db: DBSession, period_start_utc: datetime, period_end_utc: datetime, filter_store_ids: list = None) -> dict:
     """
-    Determines the interpolated 'active'/'inactive' status at a specific UTC timestamp
-    based on sorted status data using a binary search (bisect).
+    Bulk variant of _get_relevant_status_data: loads the status rows of every store
+    within a UTC period, plus each store's last status *before* the period, in two
+    set-based queries.
+    filter_store_ids: Restricts the queries to these stores (None loads all stores).
+    Returns: Dict store_id -> StatusSeries (views of one fleet-wide series); stores
+    without polls are absent.
     """
-    current_status = False 
-    timestamps = [entry.timestamp_utc for entry in sorted_status_data]
-    
-    idx = bisect.bisect_right(timestamps, current_time_utc)
+    status_columns = (Store_Status.store_id, Store_Status.timestamp_utc, Store_Status.status)
+
+    last_before_period = db.query(
+        Store_Status.store_id,
+        func.max(Store_Status.timestamp_utc).label("timestamp_utc")
+    ).filter(
+        Store_Status.timestamp_utc < period_start_utc
+    )
+    if filter_store_ids is not None:
+        last_before_period = last_before_period.filter(Store_Status.store_id.in_(filter_store_ids))
+    last_before_period = last_before_period.group_by(Store_Status.store_id).subquery()
+
+    status_before_period = db.query(*status_columns).join(
+        last_before_period,
+        and_(
+            Store_Status.store_id == last_before_period.c.store_id,
+            Store_Status.timestamp_utc == last_before_period.c.timestamp_utc
+        )
+    )
+
+    status_within_period = db.query(*status_columns).filter(
+        Store_Status.timestamp_utc >= period_start_utc,
+        Store_Status.timestamp_utc < period_end_utc
+    )
 
-    if idx > 0:
-        current_status = sorted_status_data[idx - 1].status
-    
-    return current_status
+    if filter_store_ids is not None:
+        status_before_period = status_before_period.filter(Store_Status.store_id.in_(filter_store_ids))
+        status_within_period = status_within_period.filter(Store_Status.store_id.in_(filter_store_ids))
+
+    store_index, store_ids = {}, []
+    store_positions, timestamps_us, status_codes = [], [], []
+    for query in (status_before_period, status_within_period):
+        for store_id, timestamp_utc, status in query:
+            if store_id not in store_index:
+                store_index[store_id] = len(store_ids)
+                store_ids.append(store_id)
+            store_positions.append(store_index[store_id])
+            timestamps_us.append(uptime_kernel.to_epoch_us(timestamp_utc))
+            status_codes.append(uptime_kernel.to_status_code(status))
+
+    return split_by_store(store_ids, store_positions, timestamps_us, status_codes)
+
+def _get_status_at_time(status_series: StatusSeries, current_time_utc: datetime):
+    """
+    Determines the interpolated active (True) / inactive (False) status at a specific
+    UTC timestamp with a binary search over the store's StatusSeries.
+    """
+    return status_series.status_at(current_time_utc)
 
 def _is_within_business_hours(local_datetime: datetime, menu_hours_for_day: list) -> bool:
     """
@@ -116,8 +209,59 @@ def _is_within_business_hours(local_datetime: datetime, menu_hours_for_day: list
                 return True
     return False
 
+def _time_of_day_us(time_of_day: time) -> int:
+    return ((time_of_day.hour * 60 + time_of_day.minute) * 60 + time_of_day.second) * 1_000_000 + time_of_day.microsecond
+
+def _get_utc_business_interval_arrays(
+    timezone_str: str,
+    menu_hours_data: dict,
+    period_start_utc: datetime,
+    period_end_utc: datetime
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Builds every local business interval of the days around the period, converts them
+    to UTC through the zone's offset-transition table, clips them to the period and
+    merges overlapping or touching intervals.
+    Returns: (int64 starts, int64 ends) in UTC epoch microseconds, sorted and disjoint.
+    """
+    offset_table = get_offset_table(timezone_str, period_start_utc, period_end_utc)
+    period_start_us = uptime_kernel.to_epoch_us(period_start_utc)
+    period_end_us = uptime_kernel.to_epoch_us(period_end_utc)
+
+    # Local days (days since the epoch on the local clock), a bit wider than the period
+    first_local_day = int(period_start_us + utc_offset_us(offset_table, period_start_us)) // DAY_US - 2
+    last_local_day = int(period_end_us + utc_offset_us(offset_table, period_end_us)) // DAY_US + 2
+
+    local_starts, local_ends = [], []
+    for local_day in range(first_local_day, last_local_day + 1):
+        day_of_week = (local_day + 3) % 7  # 1970-01-01 was a Thursday; 0=Monday, 6=Sunday
+        for hours_interval in menu_hours_data[day_of_week]:
+            start_time = hours_interval['start_time_local']
+            end_time = hours_interval['end_time_local']
+            local_starts.append(local_day * DAY_US + _time_of_day_us(start_time))
+            # Overnight shift ends on the next local day
+            local_ends.append((local_day + (start_time > end_time)) * DAY_US + _time_of_day_us(end_time))
+
+    starts = np.maximum(local_to_utc_us(offset_table, np.array(local_starts, dtype=np.int64)), period_start_us)
+    ends = np.minimum(local_to_utc_us(offset_table, np.array(local_ends, dtype=np.int64)), period_end_us)
+    non_empty = starts < ends
+    starts, ends = starts[non_empty], ends[non_empty]
+    if len(starts) == 0:
+        return starts, ends
+
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    running_ends = np.maximum.accumulate(ends)
+    # A new merged interval begins where the start is past every earlier end
+    begins_new = np.empty(len(starts), dtype=bool)
+    begins_new[0] = True
+    begins_new[1:] = starts[1:] > running_ends[:-1]
+    group_starts = np.flatnonzero(begins_new)
+    group_ends = np.append(group_starts[1:], len(starts)) - 1
+    return starts[group_starts], running_ends[group_ends]
+
 def _get_all_utc_business_intervals_for_period(
-    timezone_obj: pytz.BaseTzInfo,
+    timezone_obj: ZoneInfo,
     menu_hours_data: dict, 
     period_start_utc: datetime,
     period_end_utc: datetime
@@ -127,7 +271,7 @@ def _get_all_utc_business_intervals_for_period(
     within the specified UTC reporting period.
 
     Args:
-        timezone_obj: The pytz timezone object for the store.
+        timezone_obj: The ZoneInfo timezone of the store.
         menu_hours_data: A dictionary mapping day_of_week (0-6) to a list of
                          time intervals (e.g., {'start_time_local': time, 'end_time_local': time}).
         period_start_utc: The start of the reporting period in UTC.
@@ -137,73 +281,81 @@ def _get_all_utc_business_intervals_for_period(
         A list of tuples, where each tuple is (utc_start_datetime, utc_end_datetime)
         representing a continuous period of business hours in UTC.
     """
-    utc_business_intervals = []
-
-    if period_start_utc.tzinfo is None:
-        period_start_utc = period_start_utc.replace(tzinfo=timezone.utc)
-    
-    start_local_date_for_loop = period_start_utc.astimezone(timezone_obj).date() - timedelta(days=2) # Start a bit earlier
-    end_local_date_for_loop = period_end_utc.astimezone(timezone_obj).date() + timedelta(days=2) # End a bit later
-
-    current_local_date = start_local_date_for_loop
-    while current_local_date <= end_local_date_for_loop:
-        day_of_week = current_local_date.weekday() # 0=Monday, 6=Sunday
-        
-        daily_menu_hours = menu_hours_data[day_of_week]
-
-        for hours_interval in daily_menu_hours:
-            start_time = hours_interval['start_time_local']
-            end_time = hours_interval['end_time_local']
-
-            local_bh_start_dt = datetime.combine(current_local_date, start_time).replace(tzinfo=timezone_obj)
-            local_bh_end_dt = datetime.combine(current_local_date, end_time).replace(tzinfo=timezone_obj)
-
-            if start_time > end_time: # Overnight shift
-                local_bh_end_dt += timedelta(days=1)
+    starts, ends = _get_utc_business_interval_arrays(timezone_obj.key, menu_hours_data, period_start_utc, period_end_utc)
+    return [
+        (uptime_kernel.from_epoch_us(start), uptime_kernel.from_epoch_us(end))
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
 
-            utc_bh_start_dt = local_bh_start_dt.astimezone(timezone.utc)
-            utc_bh_end_dt = local_bh_end_dt.astimezone(timezone.utc)
 
-            # Clip intervals to the reporting period
-            overlap_start_utc = max(utc_bh_start_dt, period_start_utc)
-            overlap_end_utc = min(utc_bh_end_dt, period_end_utc)
+def _schedule_signature(menu_hours_data: dict) -> tuple:
+    """
+    Canonical, hashable form of a store's weekly schedule: for each day 0-6, the
+    sorted (start_time_local, end_time_local) pairs.
+    """
+    return tuple(
+        tuple(sorted((hours['start_time_local'], hours['end_time_local']) for hours in menu_hours_data[day_of_week]))
+        for day_of_week in range(7)
+    )
 
-            if overlap_start_utc < overlap_end_utc: # If there's a valid overlap
-                utc_business_intervals.append((overlap_start_utc, overlap_end_utc))
-        
-        current_local_date += timedelta(days=1)
+# The cache is shared by the process, its hits and misses are counted per thread; per-report
+# counts are the difference of _business_interval_cache_stats() before and after the report.
+_thread_cache_counts = threading.local()
 
-    # Sort and merge overlapping intervals
-    if not utc_business_intervals:
-        return []
+@lru_cache(maxsize=BUSINESS_INTERVAL_CACHE_SIZE)
+def _build_cached_utc_business_intervals(
+    timezone_str: str,
+    schedule_signature: tuple,
+    period_start_utc: datetime,
+    period_end_utc: datetime
+) -> tuple:
+    """
+    Cache miss of _get_cached_utc_business_intervals.
+    """
+    _thread_cache_counts.missed = True
+    menu_hours_data = {
+        day_of_week: [{'start_time_local': start, 'end_time_local': end} for start, end in day_hours]
+        for day_of_week, day_hours in enumerate(schedule_signature)
+    }
+    bh_starts, bh_ends = _get_utc_business_interval_arrays(timezone_str, menu_hours_data, period_start_utc, period_end_utc)
+    intervals = tuple(
+        (uptime_kernel.from_epoch_us(start), uptime_kernel.from_epoch_us(end))
+        for start, end in zip(bh_starts.tolist(), bh_ends.tolist())
+    )
 
-    utc_business_intervals.sort(key=lambda x: x[0])
+    bh_starts.flags.writeable = False
+    bh_ends.flags.writeable = False
 
-    merged_intervals = []
-    current_merged_start = None
-    current_merged_end = None
+    return intervals, bh_starts, bh_ends
 
-    for start, end in utc_business_intervals:
-        if current_merged_start is None:
-            current_merged_start = start
-            current_merged_end = end
-        elif start <= current_merged_end: # Overlap or touch
-            current_merged_end = max(current_merged_end, end)
-        else:
-            merged_intervals.append((current_merged_start, current_merged_end))
-            current_merged_start = start
-            current_merged_end = end
-    
-    if current_merged_start is not None:
-        merged_intervals.append((current_merged_start, current_merged_end))
-
-    return merged_intervals
+def _get_cached_utc_business_intervals(
+    timezone_str: str,
+    schedule_signature: tuple,
+    period_start_utc: datetime,
+    period_end_utc: datetime
+) -> tuple:
+    """
+    Memoized _get_all_utc_business_intervals_for_period keyed by schedule signature, so
+    stores sharing a timezone and weekly schedule (e.g. the 24x7 default) build the
+    merged UTC intervals once per period.
+    Returns: Tuple (intervals, int64 starts array, int64 ends array); treat as read-only.
+    """
+    _thread_cache_counts.missed = False
+    cached = _build_cached_utc_business_intervals(timezone_str, schedule_signature, period_start_utc, period_end_utc)
+    outcome = "misses" if _thread_cache_counts.missed else "hits"
+    setattr(_thread_cache_counts, outcome, getattr(_thread_cache_counts, outcome, 0) + 1)
+    return cached
 
+def _business_interval_cache_stats() -> dict:
+    """
+    Hit/miss counters of the business-interval cache in the current thread.
+    """
+    return {"hits": getattr(_thread_cache_counts, "hits", 0), "misses": getattr(_thread_cache_counts, "misses", 0)}
 
 def _calculate_uptime_downtime_for_period(
     db: DBSession,
     store_id: str,
-    timezone_obj: pytz.BaseTzInfo,
+    timezone_obj: ZoneInfo,
     menu_hours_data: dict, 
     period_start_utc: datetime,
     period_end_utc: datetime
@@ -213,12 +365,32 @@ def _calculate_uptime_downtime_for_period(
     considering business hours and interpolating status, using an interval-based approach.
     Returns: (uptime_minutes, downtime_minutes)
     """
+    relevant_status_data = _get_relevant_status_data(db, store_id, period_start_utc, period_end_utc)
+
+    return _calculate_uptime_downtime_from_status_data(
+        relevant_status_data, timezone_obj, menu_hours_data, period_start_utc, period_end_utc
+    )
+
+def _calculate_uptime_downtime_from_status_data(
+    status_series: StatusSeries,
+    timezone_obj: ZoneInfo,
+    menu_hours_data: dict,
+    period_start_utc: datetime,
+    period_end_utc: datetime
+) -> tuple[float, float]:
+    """
+    Same as _calculate_uptime_downtime_for_period, over an already-fetched StatusSeries
+    (the polls within the period plus the last one before it).
+    Returns: (uptime_minutes, downtime_minutes)
+    """
+    if UPTIME_KERNEL == "numpy":
+        return _calculate_uptime_downtime_numpy(
+            status_series, timezone_obj, menu_hours_data, period_start_utc, period_end_utc
+        )
+
     uptime_minutes = 0.0
     downtime_minutes = 0.0
 
-    relevant_status_data = _get_relevant_status_data(db, store_id, period_start_utc, period_end_utc)
-    
-    status_timestamps = [entry.timestamp_utc for entry in relevant_status_data]    
     utc_business_hours_intervals = _get_all_utc_business_intervals_for_period(
         timezone_obj, menu_hours_data, period_start_utc, period_end_utc
     )
@@ -227,10 +399,11 @@ def _calculate_uptime_downtime_for_period(
     all_event_timestamps_utc.add(period_start_utc)
     all_event_timestamps_utc.add(period_end_utc)
 
-    for status_entry in relevant_status_data:
-        if period_start_utc <= status_entry.timestamp_utc <= period_end_utc:
-            all_event_timestamps_utc.add(status_entry.timestamp_utc)
-    
+    all_event_timestamps_utc.update(status_series.slice_range(
+        uptime_kernel.to_epoch_us(period_start_utc), uptime_kernel.to_epoch_us(period_end_utc) + 1
+    ).datetimes())
+
+
     for bh_start, bh_end in utc_business_hours_intervals:
         all_event_timestamps_utc.add(bh_start)
         all_event_timestamps_utc.add(bh_end)
@@ -256,7 +429,7 @@ def _calculate_uptime_downtime_for_period(
         duration_seconds = (interval_end_utc - interval_start_utc).total_seconds()
         duration_minutes = duration_seconds / 60.0
 
-        current_status = _get_status_at_time(relevant_status_data, interval_start_utc)
+        current_status = _get_status_at_time(status_series, interval_start_utc)
 
         # Check interval within business hour
         is_within_bh = False
@@ -276,16 +449,265 @@ def _calculate_uptime_downtime_for_period(
 
     return uptime_minutes, downtime_minutes
 
+def _calculate_uptime_downtime_numpy(
+    status_series: StatusSeries,
+    timezone_obj: ZoneInfo,
+    menu_hours_data: dict,
+    period_start_utc: datetime,
+    period_end_utc: datetime
+) -> tuple[float, float]:
+    """
+    NumPy-kernel equivalent of _calculate_uptime_downtime_from_status_data.
+    Returns: (uptime_minutes, downtime_minutes)
+    """
+    utc_business_hours_intervals = _get_all_utc_business_intervals_for_period(
+        timezone_obj, menu_hours_data, period_start_utc, period_end_utc
+    )
+
+    bh_starts, bh_ends = uptime_kernel.intervals_to_arrays(utc_business_hours_intervals)
+
+    return uptime_kernel.calculate_uptime_downtime(
+        status_series.timestamps_us, status_series.codes, bh_starts, bh_ends,
+        uptime_kernel.to_epoch_us(period_start_utc), uptime_kernel.to_epoch_us(period_end_utc)
+    )
+
+def _sweep_uptime_downtime_for_windows(
+    status_series: StatusSeries,
+    utc_business_hours_intervals: list,
+    window_starts_utc: list,
+    period_end_utc: datetime
+) -> list[tuple[float, float]]:
+    """
+    Single pass over a store's events that accumulates uptime/downtime for several
+    windows sharing the same end. Window starts are event points, so each sub-interval
+    lies either fully inside or fully outside a given window.
+    Returns: List of (uptime_minutes, downtime_minutes), one per window.
+    """
+    sweep_start_utc = min(window_starts_utc)
+
+    status_timestamps_utc = status_series.datetimes()
+    statuses = status_series.statuses()
+
+    all_event_timestamps_utc = set(window_starts_utc)
+    all_event_timestamps_utc.add(period_end_utc)
+    all_event_timestamps_utc.update(
+        timestamp_utc for timestamp_utc in status_timestamps_utc if sweep_start_utc <= timestamp_utc <= period_end_utc
+    )
+    for bh_start, bh_end in utc_business_hours_intervals:
+        all_event_timestamps_utc.add(bh_start)
+        all_event_timestamps_utc.add(bh_end)
+
+    sorted_event_timestamps_utc = sorted(all_event_timestamps_utc)
+
+    totals = [[0.0, 0.0] for _ in window_starts_utc]
+    current_status = False
+    status_idx = 0
+    bh_idx = 0
+
+    for interval_start_utc, interval_end_utc in zip(sorted_event_timestamps_utc, sorted_event_timestamps_utc[1:]):
+        if interval_start_utc >= period_end_utc:
+            break
+
+        # Advance the status and business-hour pointers instead of searching per interval
+        while status_idx < len(status_timestamps_utc) and status_timestamps_utc[status_idx] <= interval_start_utc:
+            current_status = statuses[status_idx]
+            status_idx += 1
+        while bh_idx < len(utc_business_hours_intervals) and utc_business_hours_intervals[bh_idx][1] <= interval_start_utc:
+            bh_idx += 1
+
+        is_within_bh = bh_idx < len(utc_business_hours_intervals) and utc_business_hours_intervals[bh_idx][0] <= interval_start_utc
+        if not is_within_bh:
+            continue
+
+        duration_minutes = (interval_end_utc - interval_start_utc).total_seconds() / 60.0
+
+        for window_idx, window_start_utc in enumerate(window_starts_utc):
+            if window_start_utc > interval_start_utc:
+                continue
+            if current_status == True:
+                totals[window_idx][0] += duration_minutes
+            elif current_status == False:
+                totals[window_idx][1] += duration_minutes
+
+    return [tuple(window_totals) for window_totals in totals]
+
+def _calculate_uptime_downtime_for_windows(
+    status_series: StatusSeries,
+    timezone_obj: ZoneInfo,
+    menu_hours_data: dict,
+    window_starts_utc: list,
+    period_end_utc: datetime,
+    stage_timer: StageTimer = None
+) -> list[tuple[float, float]]:
+    """
+    Calculates uptime and downtime for every window [window_start, period_end) of a store
+    in one sweep: status rows are fetched and business intervals are built once, for the
+    widest window.
+    status_series: Polls within the widest window plus the last one before it.
+    stage_timer: Optional; receives the "intervals" and "sweep" times.
+    Returns: List of (uptime_minutes, downtime_minutes), one per window.
+    """
+    stage_timer = stage_timer or StageTimer()
+
+    with stage_timer.time("intervals"):
+        utc_business_hours_intervals, bh_starts, bh_ends = _get_cached_utc_business_intervals(
+            timezone_obj.key, _schedule_signature(menu_hours_data), min(window_starts_utc), period_end_utc
+        )
+
+    with stage_timer.time("sweep"):
+        if UPTIME_KERNEL == "numpy":
+            uptime, downtime = uptime_kernel.calculate_uptime_downtime_windows(
+                status_series.timestamps_us, status_series.codes, bh_starts, bh_ends,
+                [uptime_kernel.to_epoch_us(window_start_utc) for window_start_utc in window_starts_utc],
+                uptime_kernel.to_epoch_us(period_end_utc)
+            )
+            return list(zip(uptime.tolist(), downtime.tolist()))
+
+        return _sweep_uptime_downtime_for_windows(
+            status_series, utc_business_hours_intervals, window_starts_utc, period_end_utc
+        )
+
+def _build_batch_kernel_arrays(store_ids: list, status_by_store: dict, store_details: dict, period_start_utc: datetime, period_end_utc: datetime) -> tuple:
+    """
+    Lays out the status rows and business-hour intervals of several stores as the CSR
+    arrays taken by the uptime_kernel batch functions, in the order of store_ids.
+    status_by_store: Dict store_id -> StatusSeries (including the last poll before the period).
+    store_details: Dict store_id -> (timezone_obj, menu_hours_data).
+    Returns: (status_timestamps, status_codes, status_offsets, bh_starts, bh_ends, bh_offsets)
+    """
+    status_timestamps, status_codes, status_offsets = [], [], [0]
+    bh_starts, bh_ends, bh_offsets = [], [], [0]
+    for store_id in store_ids:
+        store_status_series = status_by_store.get(store_id, EMPTY_STATUS_SERIES)
+        status_timestamps.append(store_status_series.timestamps_us)
+        status_codes.append(store_status_series.codes)
+        status_offsets.append(status_offsets[-1] + len(store_status_series))
+
+        timezone_obj, menu_hours_data = store_details[store_id]
+        _, store_bh_starts, store_bh_ends = _get_cached_utc_business_intervals(
+            timezone_obj.key, _schedule_signature(menu_hours_data), period_start_utc, period_end_utc
+        )
+        bh_starts.append(store_bh_starts)
+        bh_ends.append(store_bh_ends)
+        bh_offsets.append(bh_offsets[-1] + len(store_bh_starts))
+
+    return (
+        np.concatenate(status_timestamps or [np.zeros(0, dtype=np.int64)]),
+        np.concatenate(status_codes or [np.zeros(0, dtype=np.int8)]),
+        np.array(status_offsets),
+        np.concatenate(bh_starts or [np.zeros(0, dtype=np.int64)]),
+        np.concatenate(bh_ends or [np.zeros(0, dtype=np.int64)]),
+        np.array(bh_offsets)
+    )
 
 # Main Report Generator
 
-def generate_report_data_and_save_csv(report_id: str):
+def _iter_report_rows(db: DBSession, report_id: str, store_ids: list, report_end_time_utc: datetime, bulk_store_filter: bool = True, stage_timer: StageTimer = None):
+    """
+    Yields one report row (dict) per store, in the order of store_ids.
+    Unless the engine is per_store, inputs are loaded once for the given stores before the first row;
+    bulk_store_filter=False loads them for the whole fleet without an IN filter.
+    stage_timer: Optional; receives the "db_fetch", "intervals" and "sweep" times.
+    """
+    stage_timer = stage_timer or StageTimer()
+    reporting_periods = _get_reporting_periods(report_end_time_utc)
+    window_starts_utc = [period['start_utc'] for period in reporting_periods]
+    widest_period_start_utc = min(window_starts_utc)
+
+    if REPORT_ENGINE != "per_store":
+        filter_store_ids = store_ids if bulk_store_filter else None
+        with stage_timer.time("db_fetch"):
+            all_store_details = _get_all_store_details(db, store_ids, filter_store_ids)
+            all_status_data = _get_all_relevant_status_data(db, widest_period_start_utc, report_end_time_utc, filter_store_ids)
+
+    for store_id in store_ids:
+        store_report_row = {"store_id": store_id}
+
+        try:
+            if REPORT_ENGINE != "per_store":
+                timezone_obj, menu_hours_data = all_store_details[store_id]
+            else:
+                with stage_timer.time("db_fetch"):
+                    timezone_obj, menu_hours_data = _get_store_details(db, store_id)
+        except Exception as e:
+            print(f"Report {report_id}: Error fetching details for store {store_id}: {e}. Skipping store.")
+            for period in reporting_periods:
+                store_report_row[f"uptime_{period['name']}({period['unit']})"] = 0.0
+                store_report_row[f"downtime_{period['name']}({period['unit']})"] = 0.0
+            yield store_report_row
+            continue
+
+        if REPORT_ENGINE != "per_store":
+            store_status_data = all_status_data.get(store_id, EMPTY_STATUS_SERIES)
+        else:
+            with stage_timer.time("db_fetch"):
+                store_status_data = _get_relevant_status_data(db, store_id, widest_period_start_utc, report_end_time_utc)
+
+        store_compute_start = timer_module.perf_counter()
+        window_results = _calculate_uptime_downtime_for_windows(
+            store_status_data, timezone_obj, menu_hours_data,
+            window_starts_utc, report_end_time_utc, stage_timer
+        )
+        metrics.REPORT_STORE_COMPUTE_SECONDS.observe(timer_module.perf_counter() - store_compute_start)
+
+        yield _build_report_row(store_id, reporting_periods, window_results)
+
+def _compute_report_shard(report_id: str, store_ids: list, report_end_time_utc: datetime) -> tuple[list[dict], dict, dict, dict]:
+    """
+    Process-pool entry point: computes the rows of one shard of stores with its own
+    database session.
+    Returns: Tuple (rows, business-interval cache hits/misses, stage seconds, metrics for this shard)
+    """
+    db = Session()
+    stage_timer = StageTimer()
+    cache_stats_before = _business_interval_cache_stats()
+    store_compute_before = metrics.REPORT_STORE_COMPUTE_SECONDS.snapshot()
+    sql_queries_before = metrics.thread_sql_query_count()
+    try:
+        rows = list(_iter_report_rows(db, report_id, store_ids, report_end_time_utc, stage_timer=stage_timer))
+    finally:
+        db.close()
+
+    cache_stats_after = _business_interval_cache_stats()
+    shard_metrics = {
+        "store_compute_before": store_compute_before,
+        "store_compute_after": metrics.REPORT_STORE_COMPUTE_SECONDS.snapshot(),
+        "sql_queries": metrics.thread_sql_query_count() - sql_queries_before,
+    }
+    return rows, {key: cache_stats_after[key] - cache_stats_before[key] for key in cache_stats_after}, stage_timer.seconds, shard_metrics
+
+def _split_into_shards(store_ids: list, shard_size: int) -> list[list]:
+    """
+    Splits the (sorted) store list into contiguous shards, preserving order.
+    """
+    return [store_ids[i:i + shard_size] for i in range(0, len(store_ids), shard_size)]
+
+def _update_report(db: DBSession, report_entry: Report, claim: ReportClaim, **values) -> bool:
+    """
+    Writes values to the report row. For a worker run (claim given) only while the row still
+    carries its claim: after missed heartbeats it may have been requeued to another run.
+    Returns: False if the claim no longer holds.
+    """
+    if claim is None:
+        for column, value in values.items():
+            setattr(report_entry, column, value)
+        db.commit()
+        return True
+    updated = db.execute(update(Report).where(*claim_filter(claim)).values(**values)).rowcount
+    db.commit()
+    return updated == 1
+
+def generate_report_data_and_save_csv(report_id: str, claim: ReportClaim = None):
     """
     Main function to generate the report, save it to CSV, and update DB status.
-    This function will be called as a background task.
+    This function will be called as a background task, or by a report worker with its claim
+    (business/report_queue.py); a worker run whose claim is lost stops without touching the report.
     """
     db: DBSession = None
     report_entry: Report = None
+    duckdb_con = None
+    report_filepath = report_csv_path(report_id, claim.attempt if claim is not None else None)
+    sql_queries_before = metrics.thread_sql_query_count()
     try:
         db = Session()
         report_entry = db.query(Report).filter(Report.report_id == report_id).first()
@@ -293,19 +715,29 @@ def generate_report_data_and_save_csv(report_id: str):
             print(f"Report ID {report_id} not found in DB for generation.")
             return
         
-        report_entry.status = "Running"
-        report_entry.generated_at = datetime.now(timezone.utc)
-        db.commit()
+        if not _update_report(db, report_entry, claim, status="Running", started_at=datetime.now(timezone.utc)):
+            raise ReportClaimLost(report_id)
         print(f"Report {report_id}: Status set to 'Running'.")
 
-        latest_status_timestamp_utc = db.query(func.max(Store_Status.timestamp_utc)).scalar()
+        if REPORT_ENGINE == "duckdb":
+            # Imported here: duckdb is an optional dependency of this engine only.
+            from business.duckdb_report import connect as duckdb_connect, get_duckdb_report_inputs, compute_duckdb_report_rows
+
+            # Status data and stores come from the DuckDB/Parquet files; Postgres only tracks the report.
+            duckdb_con = duckdb_connect(read_only=True)
+            latest_status_timestamp_utc, duckdb_store_ids = get_duckdb_report_inputs(duckdb_con)
+        else:
+            latest_status_timestamp_utc = db.query(func.max(Store_Status.timestamp_utc)).scalar()
 
         if not latest_status_timestamp_utc:
             print(f"Report {report_id}: No store status data found. Cannot generate report.")
-            report_entry.status = "Failed"
-            report_entry.error_message = "No store status data available for report generation."
-            report_entry.completed_at = datetime.now(timezone.utc)
-            db.commit()
+            if not _update_report(
+                db, report_entry, claim, status="Failed",
+                error_message="No store status data available for report generation.",
+                completed_at=datetime.now(timezone.utc)
+            ):
+                raise ReportClaimLost(report_id)
+            metrics.REPORTS_TOTAL.inc(1, REPORT_ENGINE, "Failed")
             return
 
         if latest_status_timestamp_utc.tzinfo is None:
@@ -314,107 +746,171 @@ def generate_report_data_and_save_csv(report_id: str):
         report_end_time_utc = latest_status_timestamp_utc.replace(second=0, microsecond=0) + timedelta(minutes=1)
         print(f"Report {report_id}: Calculations relative to: {report_end_time_utc} UTC")
 
-        reporting_periods = [
-            {
-                "name": "last_hour",
-                "start_utc": report_end_time_utc - timedelta(hours=1),
-                "end_utc": report_end_time_utc
-            },
-            {
-                "name": "last_day",
-                "start_utc": report_end_time_utc - timedelta(hours=24),
-                "end_utc": report_end_time_utc
-            },
-            {
-                "name": "last_week",
-                "start_utc": report_end_time_utc - timedelta(days=7),
-                "end_utc": report_end_time_utc
-            }
-        ]
-
-        all_store_ids_query = db.query(Store.store_id).distinct().all()
-        all_store_ids = [s[0] for s in all_store_ids_query]
-
-        report_data_list = []
+        reporting_periods = _get_reporting_periods(report_end_time_utc)
+
+        if REPORT_ENGINE == "duckdb":
+            all_store_ids = duckdb_store_ids
+        else:
+            all_store_ids_query = db.query(Store.store_id).distinct().order_by(Store.store_id).all()
+            all_store_ids = [s[0] for s in all_store_ids_query]
+
         total_stores = len(all_store_ids)
         print(f"Report {report_id}: Found {total_stores} unique stores to process.")
         process_start_time = timer_module.monotonic()
-
-        for i,store_id in enumerate(all_store_ids):
-            elapsed_time_seconds = timer_module.monotonic() - process_start_time
-            elapsed_minutes = int(elapsed_time_seconds // 60)
-            elapsed_seconds = int(elapsed_time_seconds % 60)
-            
-            percentage_done = ((i + 1) / total_stores) * 100
-            
-            print(f"Processing store {store_id} ({i+1}/{total_stores} | {percentage_done:.2f}% done | Elapsed: {elapsed_minutes:02d}m {elapsed_seconds:02d}s)")
-
-            store_report_row = {"store_id": store_id}
-            
-            try:
-                timezone_obj, menu_hours_data = _get_store_details(db, store_id)
-            except Exception as e:
-                print(f"Report {report_id}: Error fetching details for store {store_id}: {e}. Skipping store.")
-                for period in reporting_periods:
-                    store_report_row[f"uptime_{period['name']}(minutes)"] = 0.0
-                    store_report_row[f"downtime_{period['name']}(minutes)"] = 0.0
-                report_data_list.append(store_report_row)
-                continue
-
-
-            for period in reporting_periods:
-                uptime_mins, downtime_mins = _calculate_uptime_downtime_for_period(
-                    db, store_id, timezone_obj, menu_hours_data,
-                    period['start_utc'], period['end_utc']
-                )
-                
-                if period['name'] == 'last_hour':
-                    store_report_row["uptime_last_hour(minutes)"] = round(uptime_mins, 2)
-                    store_report_row["downtime_last_hour(minutes)"] = round(downtime_mins, 2)
-                elif period['name'] == 'last_day':
-                    store_report_row["uptime_last_day(hours)"] = round(uptime_mins / 60.0, 2)
-                    store_report_row["downtime_last_day(hours)"] = round(downtime_mins / 60.0, 2)
-                elif period['name'] == 'last_week':
-                    store_report_row["uptime_last_week(hours)"] = round(uptime_mins / 60.0, 2)
-                    store_report_row["downtime_last_week(hours)"] = round(downtime_mins / 60.0, 2)
-
-            report_data_list.append(store_report_row)
-            db.commit()
-
-        report_df = pd.DataFrame(report_data_list)
-        
-        output_columns = [
-            "store_id",
-            "uptime_last_hour(minutes)",
-            "uptime_last_day(hours)",
-            "uptime_last_week(hours)",
-            "downtime_last_hour(minutes)",
-            "downtime_last_day(hours)",
-            "downtime_last_week(hours)"
-        ]
-        report_df = report_df[output_columns]
-
-        report_filepath = os.path.join(REPORTS_DIR, f"{report_id}.csv")
-        report_df.to_csv(report_filepath, index=False)
+        cache_stats = {"hits": 0, "misses": 0}
+        worker_sql_queries = 0
+
+        # Progress and stage timings land on the Report row, throttled by REPORT_PROGRESS_INTERVAL_SECONDS
+        stage_timer = StageTimer()
+        report_progress = ReportProgress(report_id, total_stores, stage_timer, claim=claim)
+        report_progress.update(0, force=True)
+
+        output_columns = _get_output_columns(reporting_periods)
+
+        use_rollup = False
+        if REPORT_ENGINE == "rollup":
+            # Imported here: rollup_report builds on the helpers of this module.
+            from business.rollup_report import rollup_covers, compute_rollup_report_rows
+
+            use_rollup = rollup_covers(db, latest_status_timestamp_utc)
+            if not use_rollup:
+                print(f"Report {report_id}: store_status_hourly is not built up to {latest_status_timestamp_utc} UTC (run ingestion). Falling back to bulk loading.")
+
+        # Rows are streamed to <report>.csv.part and moved into place once all stores are written
+        with StreamingReportWriter(report_filepath, output_columns) as report_writer:
+            if use_rollup:
+                cache_stats_before = _business_interval_cache_stats()
+                with report_progress.stage("db_fetch"):
+                    all_store_details = _get_all_store_details(db, all_store_ids)
+                with report_progress.stage("compute"):
+                    report_rows = compute_rollup_report_rows(
+                        db, report_id, all_store_ids, all_store_details,
+                        latest_status_timestamp_utc, report_end_time_utc
+                    )
+                with report_progress.stage("write"):
+                    report_writer.write_rows(report_rows)
+                cache_stats_after = _business_interval_cache_stats()
+                cache_stats = {key: cache_stats_after[key] - cache_stats_before[key] for key in cache_stats_after}
+            elif REPORT_ENGINE == "duckdb":
+                with report_progress.stage("compute"):
+                    report_rows = compute_duckdb_report_rows(duckdb_con, report_id, all_store_ids, report_end_time_utc)
+                with report_progress.stage("write"):
+                    report_writer.write_rows(report_rows)
+            elif REPORT_ENGINE == "sql":
+                # Imported here: sql_report builds on the helpers of this module.
+                from business.sql_report import compute_sql_report_rows
+
+                with report_progress.stage("compute"):
+                    report_rows = compute_sql_report_rows(db, report_id, all_store_ids, report_end_time_utc)
+                with report_progress.stage("write"):
+                    report_writer.write_rows(report_rows)
+            elif REPORT_ENGINE == "incremental":
+                # Imported here: incremental_report builds on the helpers of this module.
+                from business.incremental_report import compute_incremental_report_rows
+
+                cache_stats_before = _business_interval_cache_stats()
+                with report_progress.stage("db_fetch"):
+                    all_store_details = _get_all_store_details(db, all_store_ids)
+                with report_progress.stage("compute"):
+                    report_rows = compute_incremental_report_rows(
+                        db, report_id, all_store_ids, all_store_details,
+                        latest_status_timestamp_utc, report_end_time_utc
+                    )
+                with report_progress.stage("write"):
+                    report_writer.write_rows(report_rows)
+                cache_stats_after = _business_interval_cache_stats()
+                cache_stats = {key: cache_stats_after[key] - cache_stats_before[key] for key in cache_stats_after}
+            elif REPORT_WORKERS > 1:
+                shards = _split_into_shards(all_store_ids, REPORT_SHARD_SIZE)
+                print(f"Report {report_id}: Computing {len(shards)} shards of up to {REPORT_SHARD_SIZE} stores on {REPORT_WORKERS} worker processes.")
+
+                mp_context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=mp_context) as executor:
+                    shard_results = executor.map(
+                        _compute_report_shard,
+                        repeat(report_id), shards, repeat(report_end_time_utc)
+                    )
+                    # map() yields in submission order, so rows stay in store order
+                    # Stage times are summed across workers, so they can exceed the wall time
+                    for shard_rows, shard_cache_stats, shard_stage_seconds, shard_metrics in shard_results:
+                        with stage_timer.time("write"):
+                            report_writer.write_rows(shard_rows)
+                        for key, value in shard_cache_stats.items():
+                            cache_stats[key] += value
+                        stage_timer.merge(shard_stage_seconds)
+                        metrics.REPORT_STORE_COMPUTE_SECONDS.merge(shard_metrics["store_compute_after"], shard_metrics["store_compute_before"])
+                        worker_sql_queries += shard_metrics["sql_queries"]
+                        report_progress.update(report_writer.rows_written)
+            else:
+                # Inputs are loaded one chunk of stores at a time so memory does not grow with the fleet
+                store_chunks = _split_into_shards(all_store_ids, REPORT_SHARD_SIZE)
+                if REPORT_ENGINE != "per_store":
+                    print(f"Report {report_id}: Bulk-loading store details and status data since {min(p['start_utc'] for p in reporting_periods)} UTC in {len(store_chunks)} chunks of up to {REPORT_SHARD_SIZE} stores.")
+
+                cache_stats_before = _business_interval_cache_stats()
+                for store_chunk in store_chunks:
+                    report_rows = _iter_report_rows(db, report_id, store_chunk, report_end_time_utc, bulk_store_filter=len(store_chunks) > 1, stage_timer=stage_timer)
+                    for store_report_row in report_rows:
+                        with stage_timer.time("write"):
+                            report_writer.write_row(store_report_row)
+                        report_progress.update(report_writer.rows_written)
+
+                cache_stats_after = _business_interval_cache_stats()
+                cache_stats = {key: cache_stats_after[key] - cache_stats_before[key] for key in cache_stats_after}
+
+            with stage_timer.time("write"):
+                report_writer.commit()
+        report_progress.update(report_writer.rows_written, force=True)
         print(f"Report {report_id}: Report saved to {report_filepath}")
 
-        report_entry.status = "Completed"
-        report_entry.completed_at = datetime.now(timezone.utc)
-        report_entry.report_file_path = report_filepath
-        db.commit()
+        with stage_timer.time("variants"):
+            variant_bytes = build_report_variants(report_id, report_filepath, REPORT_PRECOMPUTED_VARIANTS)
+
+        run_stats = {
+            "stores": total_stores,
+            "elapsed_seconds": round(timer_module.monotonic() - process_start_time, 2),
+            "business_interval_cache_hits": cache_stats["hits"],
+            "business_interval_cache_misses": cache_stats["misses"],
+            "stage_seconds": stage_timer.rounded(),
+            "sql_queries": metrics.thread_sql_query_count() - sql_queries_before + worker_sql_queries,
+            "variant_bytes": variant_bytes,
+        }
+        print(f"Report {report_id}: Run stats: {run_stats}")
+
+        metrics.REPORT_DURATION_SECONDS.observe(run_stats["elapsed_seconds"], REPORT_ENGINE)
+        metrics.REPORT_SQL_QUERIES.observe(run_stats["sql_queries"], REPORT_ENGINE)
+        for stage, seconds in stage_timer.seconds.items():
+            metrics.REPORT_STAGE_SECONDS.observe(seconds, stage)
+
+        if not _update_report(
+            db, report_entry, claim, status="Completed",
+            completed_at=datetime.now(timezone.utc), report_file_path=report_filepath
+        ):
+            raise ReportClaimLost(report_id)
+        metrics.REPORTS_TOTAL.inc(1, REPORT_ENGINE, "Completed")
         print(f"Report {report_id}: Status set to 'Completed'.")
 
+    except ReportClaimLost:
+        # Another run owns the report now; its row and files are left alone
+        print(f"Report {report_id}: Claim of attempt {claim.attempt} by {claim.worker_id} was lost. Discarding this run.")
+        if db:
+            db.rollback()
+        remove_report_files(report_filepath)
+
     except Exception as e:
         print(f"Report {report_id}: An error occurred during report generation: {e}")
         if db and report_entry:
             db.rollback()
-            report_entry.status = "Failed"
-            report_entry.error_message = str(e)
-            report_entry.completed_at = datetime.now(timezone.utc)
-            db.commit()
+            _update_report(
+                db, report_entry, claim, status="Failed",
+                error_message=str(e), completed_at=datetime.now(timezone.utc)
+            )
+        metrics.REPORTS_TOTAL.inc(1, REPORT_ENGINE, "Failed")
         raise
 
     finally:
+        if duckdb_con is not None:
+            duckdb_con.close()
         if db:
             db.close()
             print(f"Report {report_id}: Database session closed.")
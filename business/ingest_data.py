@@ -3,22 +3,27 @@ using engine (no session) to resolve confict with batch commit.
 """
 import os
 import pytz
-import threading
-import pandas as pd
+import hashlib
+import argparse
 
 from sqlalchemy import text
 from datetime import datetime, time
 from sqlalchemy.exc import IntegrityError
-from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.dialects.postgresql import insert
 
 from app.database.db import engine, Base
 from app.database.models import Store, Store_Status, Menu_Hours, Timezone, Report
+from app.services import metrics
 
-from app.database.ingestors.store_status import ingest_store_status
-from app.database.ingestors.menu_hours import ingest_menu_hours
-from app.database.ingestors.timezones import ingest_timezones
-from app.database.ingestors.stores import ingest_stores
+from app.database.ingestors.store_status import ingest_store_status_csv, StoreStatusReadError
+from app.database.ingestors.store_status_hourly import ingest_store_status_hourly
+from app.database.ingestors.menu_hours import ingest_explicit_menu_hours, ingest_default_menu_hours
+from app.database.ingestors.timezones import ingest_explicit_timezones, ingest_default_timezones
+from app.database.ingestors.stores import ingest_store_ids
+from app.database.ingestors import ledger
+
+from business.report_queue import ensure_report_schema
+from business.ingest_scheduler import IngestionTask, run_ingestion_tasks, ingest_process_pool, call_in_pool
 
 from business.config import (
     DATA_DIR,
@@ -27,16 +32,27 @@ from business.config import (
     TIMEZONES_CSV,
     SMALL_TABLE_BATCH_SIZE,
     DEFAULT_MENU_HOURS,
-    DEFAULT_TIMEZONE
+    DEFAULT_TIMEZONE,
+    INGEST_WORKERS
 )
 
 
-def main():
+def main(full: bool = False):
+    """
+    Loads the CSV files: unchanged files are skipped, a grown store_status.csv is loaded from its
+    last checkpoint, and other files are loaded in full. Tables are loaded by a process pool in
+    dependency order (business/ingest_scheduler.py), independent ones concurrently: menu_hours.csv
+    and timezones.csv are read and loaded while store_status.csv streams, and only their defaults
+    for stores without rows wait for the stores table.
+    full: Ignore the ingestion ledger and load every file in full.
+    """
     print("pid:", os.getpid())
     # create tables
     try:
         with engine.begin() as conn:
             Base.metadata.create_all(bind=engine)
+            # create_all does not add columns to an existing reports table
+            ensure_report_schema(conn)
         print("Database tables created successfully.")
     except Exception as e:
         print(f"Error creating database tables: {e}")
@@ -50,26 +66,6 @@ def main():
         raise FileNotFoundError(f"One or more CSV files not found: {[MENU_HOURS_CSV, STORE_STATUS_CSV, TIMEZONES_CSV]}.")
 
 
-    try:
-        print("Starting data ingestion process...")
-        start_time = datetime.now()
-        df_status = pd.read_csv(STORE_STATUS_CSV)
-        df_hours = pd.read_csv(MENU_HOURS_CSV)
-        df_timezone = pd.read_csv(TIMEZONES_CSV)
-        print(f"CSV files loaded successfully in {datetime.now() - start_time} seconds.")
-    except FileNotFoundError as e:
-        print(f"Error: One or more CSV files not found. Please ensure they are in the 'data' directory. {e}")
-        return
-    except pd.errors.EmptyDataError as e:
-        print(f"Error: One or more CSV files are empty. Please check the data files. {e}")
-        return
-    except pd.errors.ParserError as e:
-        print(f"Error: There was a problem parsing one of the CSV files. Please check the data files. {e}")
-        return
-    except Exception as e:
-        print(f"An unexpected error occurred while loading CSV files: {e}")
-        return  
-    
     # pre-flight to conflict check 
     try:
         with engine.begin() as conn:
@@ -79,49 +75,123 @@ def main():
         print(f"Error connecting to the database: {e}")
         return
 
-    # exit(1)
+    # what is already loaded, per file (app/database/ingestors/ledger.py)
+    status_plan = ledger.plan_ingestion(STORE_STATUS_CSV, append_only=True)
+    hours_plan = ledger.plan_ingestion(MENU_HOURS_CSV)
+    timezone_plan = ledger.plan_ingestion(TIMEZONES_CSV)
+    if full:
+        status_plan = status_plan._replace(action=ledger.FULL, start_offset=0, hasher=hashlib.sha256(), checkpoint=None)
+        hours_plan = hours_plan._replace(action=ledger.FULL)
+        timezone_plan = timezone_plan._replace(action=ledger.FULL)
+    for path, plan in ((STORE_STATUS_CSV, status_plan), (MENU_HOURS_CSV, hours_plan), (TIMEZONES_CSV, timezone_plan)):
+        print(f"{os.path.basename(path)}: {plan.action}" + (f" from byte {plan.start_offset}" if plan.action == ledger.RESUME else ""))
+
+    if all(plan.action == ledger.SKIP for plan in (status_plan, hours_plan, timezone_plan)):
+        print("All CSV files are unchanged since the last ingestion. Nothing to ingest.")
+        return
+
     try:
+        print("Starting data ingestion process...")
         start_time = datetime.now()
-        ingest_stores(df_status, df_hours)
-        print(f"Ingested unique store IDs into the database in {datetime.now() - start_time} seconds.")
-        """            
-        ingest_store = threading.Thread(target=ingest_store_status, args=(db,)).start()
-        ingest_menu = threading.Thread(target=ingest_menu_hours, args=(db,)).start()
-        ingest_timezone = threading.Thread(target=ingest_timezones, args=(db,)).start()
-
-        # wait for all threads
-        ingest_store.join()
-        ingest_menu.join()
-        ingest_timezone.join()
-
-        """
-
-        # removing parent lvel threads
-        """
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = [
-                executor.submit(ingest_store_status, df_status.copy()),
-                executor.submit(ingest_menu_hours, df_hours.copy()),
-                executor.submit(ingest_timezones, df_timezone.copy())
-            ]
-
-        for future in futures:
+        print(f"Loading tables on {INGEST_WORKERS} worker processes...")
+
+        def load_store_status(results):
+            if status_plan.action == ledger.SKIP:
+                return set(), None, None
+            # store_status has no foreign key to stores, so its store IDs are collected while streaming
             try:
-                future.result() 
-            except Exception as e:
-                print(f"An error occurred in a thread: {e}")
-        """
-        
-        # direct function call
-        ingest_store_status(df_status)
-        ingest_menu_hours(df_hours)
-        ingest_timezones(df_timezone)
+                status_store_ids, oldest_new_status_utc, newest_new_status_utc = ingest_store_status_csv(
+                    STORE_STATUS_CSV,
+                    executor=pool,
+                    workers=INGEST_WORKERS,
+                    start_offset=status_plan.start_offset,
+                    hasher=status_plan.hasher,
+                    checkpoint=status_plan.checkpoint if status_plan.action == ledger.RESUME else None,
+                    on_checkpoint=lambda *state: ledger.save_checkpoint(STORE_STATUS_CSV, *state)
+                )
+            except StoreStatusReadError as e:
+                # the rows loaded before the error are committed: record them, then fail the run
+                _record_status_load(*e.loaded[1:])
+                raise
+            _record_status_load(oldest_new_status_utc, newest_new_status_utc)
+            return status_store_ids, oldest_new_status_utc, newest_new_status_utc
+
+        # no foreign keys to stores: read, parsed and inserted in the pool while store_status streams;
+        # unchanged files are not read
+        def load_explicit_menu_hours(results):
+            if hours_plan.action == ledger.SKIP:
+                return True, set(), 0
+            return call_in_pool(pool, ingest_explicit_menu_hours, MENU_HOURS_CSV)
+
+        def load_explicit_timezones(results):
+            if timezone_plan.action == ledger.SKIP:
+                return True, 0
+            return call_in_pool(pool, ingest_explicit_timezones, TIMEZONES_CSV)
+
+        def load_stores(results):
+            stores_start_time = datetime.now()
+            status_store_ids, _, _ = results['store_status']
+            _, hours_store_ids, _ = results['menu_hours_explicit']
+            ingest_store_ids(status_store_ids | hours_store_ids)
+            print(f"Ingested unique store IDs into the database in {datetime.now() - stores_start_time} seconds.")
+
+        # defaults for stores without rows need the complete stores table, also for unchanged
+        # files: stores new in store_status.csv get them
+        def load_menu_hours(results):
+            explicit_loaded, _, rows_loaded = results['menu_hours_explicit']
+            if call_in_pool(pool, ingest_default_menu_hours) and explicit_loaded and hours_plan.action != ledger.SKIP:
+                _save_file_checkpoint(MENU_HOURS_CSV, hours_plan, rows_loaded)
+
+        def load_timezones(results):
+            explicit_loaded, rows_loaded = results['timezones_explicit']
+            if call_in_pool(pool, ingest_default_timezones) and explicit_loaded and timezone_plan.action != ledger.SKIP:
+                _save_file_checkpoint(TIMEZONES_CSV, timezone_plan, rows_loaded)
+
+        # rollup needs statuses, menu hours and timezones; rebuilt in full if menu hours or
+        # timezones may have changed, else from the oldest newly loaded poll
+        def load_store_status_hourly(results):
+            _, oldest_new_status_utc, _ = results['store_status']
+            if hours_plan.action != ledger.SKIP or timezone_plan.action != ledger.SKIP:
+                ingest_store_status_hourly()
+            elif oldest_new_status_utc is not None:
+                ingest_store_status_hourly(since_utc=oldest_new_status_utc)
+
+        with ingest_process_pool(INGEST_WORKERS) as pool:
+            run_ingestion_tasks([
+                IngestionTask("store_status", load_store_status, ()),
+                IngestionTask("menu_hours_explicit", load_explicit_menu_hours, ()),
+                IngestionTask("timezones_explicit", load_explicit_timezones, ()),
+                IngestionTask("stores", load_stores, ("store_status", "menu_hours_explicit")),
+                IngestionTask("menu_hours", load_menu_hours, ("stores", "menu_hours_explicit")),
+                IngestionTask("timezones", load_timezones, ("stores", "timezones_explicit")),
+                IngestionTask("store_status_hourly", load_store_status_hourly, ("store_status", "menu_hours", "timezones")),
+            ])
 
         print("\nData ingestion process completed successfully.")
     except Exception as e:
         print(f"An error occurred during the data ingestion process: {e}")
     finally:
+        # picked up by the API's /metrics
+        metrics.write_metrics_textfile("ingestion", [metrics.INGEST_ROWS_TOTAL, metrics.INGEST_ROWS_PER_SECOND, metrics.INGEST_BATCH_INSERT_SECONDS, metrics.INGEST_RECORD_BUILD_SECONDS])
         print(f"Ingestion process finished in {datetime.now() - start_time} seconds.")
 
+def _record_status_load(oldest_new_status_utc, newest_new_status_utc):
+    if oldest_new_status_utc is None:
+        return
+    try:
+        ledger.record_status_load(oldest_new_status_utc, newest_new_status_utc)
+    except Exception as e:
+        print(f"Warning: Could not record the store status load: {e}")
+
+def _save_file_checkpoint(path: str, plan: ledger.IngestionPlan, rows_loaded: int):
+    try:
+        ledger.save_checkpoint(path, plan.hasher.hexdigest(), os.path.getsize(path), rows_loaded)
+    except Exception as e:
+        # the file is simply loaded again next time
+        print(f"Warning: Could not save the checkpoint of {path}: {e}")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the CSV files into the database, skipping what the ingestion ledger shows as loaded.")
+    parser.add_argument("--full", action="store_true", help="Ignore the ledger and load every file in full.")
+    args = parser.parse_args()
+    main(full=args.full)
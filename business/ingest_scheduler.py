@@ -0,0 +1,77 @@
+"""
+Ingestion scheduler: runs the table loads of business/ingest_data.py as a dependency graph.
+
+Each task starts in its own thread as soon as the tasks it depends on are done, so
+independent tables load concurrently. The parsing and inserting happens in a shared process
+pool (ingest_process_pool), so it is not serialized on this process's GIL; the threads only
+wait on it. Metrics recorded in the pool are merged back with call_in_pool().
+"""
+import threading
+import multiprocessing
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services import metrics
+
+# function: Called as function(results), results being a dict of the dependencies' results by name
+IngestionTask = namedtuple("IngestionTask", ["name", "function", "depends_on"])
+
+
+def ingest_process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: no forked copies of the parent's pooled database connections
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+def call_in_pool(executor: ProcessPoolExecutor, function, *args):
+    """
+    Runs function(*args) in the pool and merges the ingestion metrics it recorded.
+    function and args must be picklable (module-level functions, plain data).
+    Returns: function's result.
+    """
+    result, metrics_after, metrics_before = executor.submit(metrics.run_with_ingest_metrics, function, *args).result()
+    metrics.merge_ingest_metrics(metrics_after, metrics_before)
+    return result
+
+def run_ingestion_tasks(tasks: list) -> dict:
+    """
+    Runs every task once the tasks it depends on (listed before it) have finished, independent tasks concurrently.
+    A task whose dependency failed does not run and fails with that dependency's exception.
+    Returns: Dict of results by task name; raises the first failure (in task order) once all tasks ended.
+    """
+    # dependencies listed first: no cycles to deadlock on
+    names = set()
+    for task in tasks:
+        unknown = set(task.depends_on) - names
+        if unknown:
+            raise ValueError(f"Ingestion task {task.name} depends on tasks not listed before it: {sorted(unknown)}")
+        names.add(task.name)
+
+    results, errors = {}, {}
+    done = {task.name: threading.Event() for task in tasks}
+
+    def run(task):
+        try:
+            for dependency in task.depends_on:
+                done[dependency].wait()
+            failed = [dependency for dependency in task.depends_on if dependency in errors]
+            if failed:
+                errors[task.name] = errors[failed[0]]
+                print(f"Ingestion task {task.name} skipped: {failed[0]} failed.")
+                return
+            results[task.name] = task.function({dependency: results[dependency] for dependency in task.depends_on})
+        except Exception as e:
+            errors[task.name] = e
+            print(f"Ingestion task {task.name} failed: {e}")
+        finally:
+            done[task.name].set()
+
+    threads = [threading.Thread(target=run, args=(task,), name=f"ingest-{task.name}") for task in tasks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for task in tasks:
+        if task.name in errors:
+            raise errors[task.name]
+    return results
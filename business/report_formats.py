@@ -0,0 +1,116 @@
+"""
+Download variants of a finished report.
+
+Next to <report>.csv the following variants may exist:
+- <report>.csv.gz: the same CSV, gzip-compressed; served with Content-Encoding: gzip
+- <report>.parquet: a columnar copy (zstd), written with DuckDB
+
+Variants are derived from the CSV, so they can be rebuilt at any time. Each is written to a
+temporary file and renamed into place, so a reader never sees a partial variant.
+"""
+import os
+import gzip
+import uuid
+import shutil
+
+from business.config import REPORT_GZIP_LEVEL
+
+
+CSV = "csv"
+CSV_GZIP = "csv.gz"
+PARQUET = "parquet"
+VARIANTS = (CSV, CSV_GZIP, PARQUET)
+
+MEDIA_TYPES = {
+    CSV: "text/csv",
+    CSV_GZIP: "text/csv",
+    PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def report_variant_path(report_filepath: str, variant: str) -> str:
+    """
+    Returns: Path of a variant of the report whose CSV is at report_filepath.
+    """
+    if variant == CSV:
+        return report_filepath
+    if variant == CSV_GZIP:
+        return report_filepath + ".gz"
+    if variant == PARQUET:
+        return os.path.splitext(report_filepath)[0] + ".parquet"
+    raise ValueError(f"Unknown report variant '{variant}'. Expected one of {', '.join(VARIANTS)}.")
+
+def _write_gzip(report_filepath: str, target_path: str):
+    # mtime of the source keeps the output byte-identical across rebuilds
+    source_mtime = int(os.stat(report_filepath).st_mtime)
+    with open(report_filepath, "rb") as source, open(target_path, "wb") as target:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=target, compresslevel=REPORT_GZIP_LEVEL, mtime=source_mtime) as compressed:
+            shutil.copyfileobj(source, compressed)
+
+def _write_parquet(report_filepath: str, target_path: str):
+    # Imported here: DuckDB is only needed for this variant
+    from business.duckdb_report import import_duckdb
+
+    with open(report_filepath) as f:
+        header = f.readline().rstrip("\n").split(",")
+    # store_id stays text, every other column is a float; explicit so an empty report keeps its schema
+    column_types = ", ".join(
+        f"'{column}': '{'VARCHAR' if column == 'store_id' else 'DOUBLE'}'" for column in header
+    )
+
+    con = import_duckdb().connect()
+    try:
+        con.execute(
+            f"COPY (SELECT * FROM read_csv(?, header = true, columns = {{{column_types}}})) "
+            f"TO '{target_path.replace(chr(39), chr(39) * 2)}' (FORMAT parquet, COMPRESSION zstd)",
+            [report_filepath]
+        )
+    finally:
+        con.close()
+
+def ensure_report_variant(report_filepath: str, variant: str) -> str:
+    """
+    Builds a variant of the report unless it already exists and is not older than the CSV.
+    Returns: Path of the variant.
+    """
+    variant_path = report_variant_path(report_filepath, variant)
+    if variant == CSV:
+        return variant_path
+    if os.path.exists(variant_path) and os.path.getmtime(variant_path) >= os.path.getmtime(report_filepath):
+        return variant_path
+
+    temp_path = f"{variant_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if variant == CSV_GZIP:
+            _write_gzip(report_filepath, temp_path)
+        else:
+            _write_parquet(report_filepath, temp_path)
+        os.replace(temp_path, variant_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return variant_path
+
+def build_report_variants(report_id: str, report_filepath: str, variants: list) -> dict:
+    """
+    Builds the given variants after a report completes. A variant that fails is only
+    logged: it is built again on its first download.
+    Returns: Dict variant -> size in bytes, for the variants built.
+    """
+    sizes = {}
+    for variant in variants:
+        try:
+            sizes[variant] = os.path.getsize(ensure_report_variant(report_filepath, variant))
+        except Exception as e:
+            print(f"Report {report_id}: Warning: Could not build the {variant} variant: {e}")
+    return sizes
+
+def remove_report_files(report_filepath: str):
+    """
+    Removes a report's CSV and every variant built from it.
+    """
+    for variant in VARIANTS:
+        try:
+            os.remove(report_variant_path(report_filepath, variant))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,137 @@
+"""
+Stage timings and progress of a running report.
+
+StageTimer accumulates wall time per stage (db_fetch, intervals, sweep, write, ...).
+ReportProgress persists stores processed and the stage timings on the Report row at most
+every REPORT_PROGRESS_INTERVAL_SECONDS, so /get_report can show progress while Running;
+engines that compute all stores at once record their stage transitions instead.
+"""
+import time as timer_module
+
+from sqlalchemy import update
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from app.database.db import engine
+from app.database.models import Report
+
+from business.report_queue import ReportClaimLost, claim_filter
+from business.config import REPORT_PROGRESS_INTERVAL_SECONDS
+
+
+class StageTimer:
+    """
+    Accumulates elapsed seconds per named stage.
+    Usage:
+        with stage_timer.time("db_fetch"):
+            ...
+    """
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def time(self, stage: str):
+        stage_start = timer_module.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, timer_module.perf_counter() - stage_start)
+
+    def add(self, stage: str, seconds: float):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    def merge(self, stage_seconds: dict):
+        for stage, seconds in stage_seconds.items():
+            self.add(stage, seconds)
+
+    def rounded(self) -> dict:
+        return {stage: round(seconds, 3) for stage, seconds in self.seconds.items()}
+
+
+class ReportProgress:
+    """
+    Throttled writer of a report's progress (stores processed, stage timings) to its Report row.
+    Updates go through their own connection so they do not touch the report's session.
+    claim: ReportClaim of a worker run; updates then apply only while the claim holds.
+    """
+
+    def __init__(self, report_id: str, total_stores: int, stage_timer: StageTimer, interval_seconds: float = REPORT_PROGRESS_INTERVAL_SECONDS, claim=None):
+        self.report_id = report_id
+        self.total_stores = total_stores
+        self.stage_timer = stage_timer
+        self.interval_seconds = interval_seconds
+        self.claim = claim
+        self.start_time = timer_module.monotonic()
+        self._last_update_time = None
+
+    def update(self, stores_processed: int, force: bool = False):
+        """
+        Persists progress if forced or at least interval_seconds passed since the last update.
+        Raises: ReportClaimLost if the run's claim no longer holds.
+        """
+        now = timer_module.monotonic()
+        if not force and self._last_update_time is not None and now - self._last_update_time < self.interval_seconds:
+            return
+        self._last_update_time = now
+
+        conditions = claim_filter(self.claim) if self.claim is not None else [Report.report_id == self.report_id]
+        with engine.begin() as conn:
+            updated = conn.execute(
+                update(Report)
+                .where(*conditions)
+                .values(
+                    total_stores=self.total_stores,
+                    stores_processed=stores_processed,
+                    stage_timings=self.stage_timer.rounded(),
+                    progress_updated_at=datetime.now(timezone.utc)
+                )
+            ).rowcount
+        if self.claim is not None and updated == 0:
+            raise ReportClaimLost(self.report_id)
+
+        elapsed_time_seconds = now - self.start_time
+        percentage_done = (stores_processed / self.total_stores) * 100 if self.total_stores else 100.0
+        print(f"Report {self.report_id}: {stores_processed}/{self.total_stores} stores ({percentage_done:.2f}% done | Elapsed: {int(elapsed_time_seconds // 60):02d}m {int(elapsed_time_seconds % 60):02d}s)")
+
+    @contextmanager
+    def stage(self, stage: str, stores_processed: int = 0):
+        """
+        Times a stage like StageTimer.time and persists the progress as the stage starts (listed
+        in the stage timings with the seconds of its earlier runs) and once it ends.
+        Raises: ReportClaimLost if the run's claim no longer holds.
+        """
+        self.stage_timer.add(stage, 0.0)
+        self.update(stores_processed, force=True)
+        with self.stage_timer.time(stage):
+            yield
+        self.update(stores_processed, force=True)
+
+
+def describe_progress(report_entry: Report):
+    """
+    Progress of a running report as returned by /get_report, with throughput and ETA
+    derived from the persisted counters.
+    Returns: Dict, or None if no progress has been recorded yet.
+    """
+    if report_entry.progress_updated_at is None or report_entry.started_at is None:
+        return None
+
+    stores_processed = report_entry.stores_processed or 0
+    total_stores = report_entry.total_stores or 0
+    elapsed_seconds = max((report_entry.progress_updated_at - report_entry.started_at).total_seconds(), 0.0)
+    stores_per_second = stores_processed / elapsed_seconds if elapsed_seconds > 0 else None
+    eta_seconds = None
+    if stores_per_second:
+        eta_seconds = round((total_stores - stores_processed) / stores_per_second, 1)
+
+    return {
+        "stores_processed": stores_processed,
+        "total_stores": total_stores,
+        "percent_done": round(stores_processed / total_stores * 100, 2) if total_stores else None,
+        "elapsed_seconds": round(elapsed_seconds, 1),
+        "stores_per_second": round(stores_per_second, 1) if stores_per_second else None,
+        "eta_seconds": eta_seconds,
+        "stage_seconds": report_entry.stage_timings or {},
+        "updated_at": report_entry.progress_updated_at,
+    }
@@ -0,0 +1,185 @@
+"""
+Report job queue on the reports table.
+
+A report is queued as a Pending row. Workers (business/worker.py) claim the oldest one with
+SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers never claim the same report and never
+wait on each other's locks. A claimed report is Running with the worker's id, and the worker
+refreshes heartbeat_at while it runs. A Running report whose heartbeat is older than
+REPORT_WORKER_STALE_SECONDS belonged to a dead worker: it is queued again, or marked Failed
+once it has been claimed REPORT_MAX_ATTEMPTS times. A worker that was only slow may still be
+running it, so a claim is (report_id, worker_id, attempt) and every write of a claimed run is
+conditional on the row still carrying that claim (claim_filter); a stale run stops with
+ReportClaimLost instead of overwriting the run that replaced it.
+
+Every status change and progress update of a report is published with pg_notify on
+REPORT_EVENTS_CHANNEL as "<report_id>:<status>" (app/services/report_events.py listens for it).
+"""
+import uuid
+
+from sqlalchemy import text
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from app.database.db import engine, Base
+from app.database.models import Report
+
+
+# Report columns added after the reports table first shipped; create_all does not add columns
+# to an existing table
+REPORT_PROGRESS_COLUMNS = [
+    "started_at TIMESTAMP WITH TIME ZONE",
+    "total_stores INTEGER",
+    "stores_processed INTEGER",
+    "stage_timings JSON",
+    "progress_updated_at TIMESTAMP WITH TIME ZONE",
+]
+REPORT_QUEUE_COLUMNS = [
+    "worker_id VARCHAR",
+    "heartbeat_at TIMESTAMP WITH TIME ZONE",
+    "attempts INTEGER",
+]
+
+CLAIM_REPORT_SQL = text("""
+    UPDATE reports
+    SET status = 'Running',
+        worker_id = :worker_id,
+        heartbeat_at = now(),
+        started_at = now(),
+        attempts = COALESCE(attempts, 0) + 1
+    WHERE report_id = (
+        SELECT report_id FROM reports
+        WHERE status = 'Pending'
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING report_id, attempts
+""")
+
+HEARTBEAT_SQL = text("""
+    UPDATE reports SET heartbeat_at = now()
+    WHERE report_id = ANY(:report_ids) AND worker_id = :worker_id AND status = 'Running'
+""")
+
+# Rows without a heartbeat (background-task reports) are never requeued
+REQUEUE_STALE_SQL = text("""
+    UPDATE reports
+    SET status = CASE WHEN COALESCE(attempts, 0) >= :max_attempts THEN 'Failed' ELSE 'Pending' END,
+        error_message = CASE WHEN COALESCE(attempts, 0) >= :max_attempts
+            THEN 'Report worker stopped responding (claimed ' || COALESCE(attempts, 0) || ' times).'
+            ELSE error_message END,
+        completed_at = CASE WHEN COALESCE(attempts, 0) >= :max_attempts THEN now() ELSE completed_at END,
+        worker_id = NULL
+    WHERE status = 'Running'
+      AND heartbeat_at IS NOT NULL
+      AND heartbeat_at < now() - make_interval(secs => :stale_seconds)
+    RETURNING report_id, status
+""")
+
+REPORT_EVENTS_CHANNEL = "report_events"
+
+ReportClaim = namedtuple("ReportClaim", ["report_id", "worker_id", "attempt"])
+
+# A trigger, so reports written by workers, background tasks and the requeue above all notify
+REPORT_EVENTS_TRIGGER_SQL = [
+    text(f"""
+        CREATE OR REPLACE FUNCTION notify_report_event() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{REPORT_EVENTS_CHANNEL}', NEW.report_id || ':' || NEW.status);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """),
+    text("""
+        CREATE OR REPLACE TRIGGER reports_notify_event
+        AFTER UPDATE OF status, progress_updated_at ON reports
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.progress_updated_at IS DISTINCT FROM NEW.progress_updated_at)
+        EXECUTE FUNCTION notify_report_event()
+    """),
+]
+
+
+class ReportClaimLost(Exception):
+    """
+    The report was requeued or failed after missed heartbeats; this run's results are discarded.
+    """
+    pass
+
+
+def ensure_report_schema(conn):
+    """
+    Creates the reports table, or adds the progress and queue columns and the claim index to an older one,
+    and installs the report event trigger.
+    """
+    Base.metadata.create_all(bind=conn, tables=[Report.__table__])
+    for column_ddl in REPORT_PROGRESS_COLUMNS + REPORT_QUEUE_COLUMNS:
+        conn.execute(text(f"ALTER TABLE reports ADD COLUMN IF NOT EXISTS {column_ddl}"))
+    for index in Report.__table__.indexes:
+        index.create(bind=conn, checkfirst=True)
+    for statement in REPORT_EVENTS_TRIGGER_SQL:
+        conn.execute(statement)
+
+def _new_report() -> Report:
+    return Report(report_id=str(uuid.uuid4()), status="Pending", created_at=datetime.now(timezone.utc), attempts=0)
+
+def enqueue_report(db) -> str:
+    """
+    Adds a Pending report for the workers to claim.
+    Returns: report_id
+    """
+    report = _new_report()
+    # read before the commit expires the instance, which would cost a refresh query
+    report_id = report.report_id
+    db.add(report)
+    db.commit()
+    return report_id
+
+async def enqueue_report_async(db) -> str:
+    """
+    enqueue_report for an AsyncSession (API routes).
+    Returns: report_id
+    """
+    report = _new_report()
+    db.add(report)
+    await db.commit()
+    return report.report_id
+
+def claim_next_report(worker_id: str):
+    """
+    Claims the oldest Pending report for worker_id (status Running, first heartbeat, attempts + 1).
+    Returns: ReportClaim, or None if nothing is queued.
+    """
+    with engine.begin() as conn:
+        row = conn.execute(CLAIM_REPORT_SQL, {"worker_id": worker_id}).first()
+    return ReportClaim(row.report_id, worker_id, row.attempts) if row else None
+
+def claim_filter(claim: ReportClaim) -> list:
+    """
+    Returns: WHERE conditions matching the report row only while it is Running under this claim.
+    """
+    return [
+        Report.report_id == claim.report_id,
+        Report.worker_id == claim.worker_id,
+        Report.attempts == claim.attempt,
+        Report.status == "Running",
+    ]
+
+def heartbeat_reports(worker_id: str, report_ids: list) -> int:
+    """
+    Refreshes heartbeat_at of the given reports while this worker still owns them.
+    Returns: Number of reports refreshed.
+    """
+    if not report_ids:
+        return 0
+    with engine.begin() as conn:
+        return conn.execute(HEARTBEAT_SQL, {"worker_id": worker_id, "report_ids": list(report_ids)}).rowcount
+
+def requeue_stale_reports(stale_seconds: float, max_attempts: int) -> list:
+    """
+    Requeues Running reports whose worker stopped heartbeating, or fails them after max_attempts claims.
+    Returns: List of (report_id, new status).
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(REQUEUE_STALE_SQL, {"stale_seconds": stale_seconds, "max_attempts": max_attempts}).all()
+    return [(row.report_id, row.status) for row in rows]
@@ -0,0 +1,48 @@
+"""
+Report windows, columns and row formatting shared by all report engines.
+Kept free of database imports so file-based engines (business/duckdb_report.py) can run
+without DATABASE_URL.
+"""
+from datetime import datetime
+
+from business.config import REPORT_WINDOWS
+
+
+def _minutes_to_unit(minutes: float, unit: str) -> float:
+    """
+    Converts minutes to a report column unit ('minutes' or 'hours').
+    """
+    return minutes / 60.0 if unit == "hours" else minutes
+
+def _get_reporting_periods(report_end_time_utc: datetime) -> list[dict]:
+    """
+    Builds the configured report windows, all ending at report_end_time_utc.
+    """
+    return [
+        {
+            "name": window["name"],
+            "unit": window["unit"],
+            "start_utc": report_end_time_utc - window["duration"],
+            "end_utc": report_end_time_utc
+        }
+        for window in REPORT_WINDOWS
+    ]
+
+def _get_output_columns(reporting_periods: list[dict]) -> list[str]:
+    """
+    CSV columns: store_id, then uptime_<name>(<unit>) and downtime_<name>(<unit>) per window.
+    """
+    output_columns = ["store_id"]
+    output_columns += [f"uptime_{period['name']}({period['unit']})" for period in reporting_periods]
+    output_columns += [f"downtime_{period['name']}({period['unit']})" for period in reporting_periods]
+    return output_columns
+
+def _build_report_row(store_id: str, reporting_periods: list[dict], window_results: list) -> dict:
+    """
+    Builds one report row from per-window (uptime_minutes, downtime_minutes), rounded per column unit.
+    """
+    store_report_row = {"store_id": store_id}
+    for period, (uptime_mins, downtime_mins) in zip(reporting_periods, window_results):
+        store_report_row[f"uptime_{period['name']}({period['unit']})"] = round(_minutes_to_unit(uptime_mins, period['unit']), 2)
+        store_report_row[f"downtime_{period['name']}({period['unit']})"] = round(_minutes_to_unit(downtime_mins, period['unit']), 2)
+    return store_report_row
@@ -0,0 +1,92 @@
+"""
+Streaming CSV writer for reports.
+
+Rows are buffered and appended to `<report>.csv.part` every REPORT_WRITE_CHUNK_SIZE rows,
+so memory stays flat and progress is visible on disk while the report runs. On completion
+the part file is atomically renamed to `<report>.csv`; on failure it is removed.
+"""
+import os
+import csv
+
+from business.config import REPORTS_DIR, REPORT_WRITE_CHUNK_SIZE
+
+
+PARTIAL_SUFFIX = ".part"
+
+
+def report_csv_path(report_id: str, attempt: int = None) -> str:
+    """
+    Returns: Path of a report's CSV. Attempts after the first (reports requeued by the worker
+    queue) get their own file, so a stale run of an earlier attempt never writes into it.
+    """
+    if attempt is None or attempt <= 1:
+        return os.path.join(REPORTS_DIR, f"{report_id}.csv")
+    return os.path.join(REPORTS_DIR, f"{report_id}.attempt{attempt}.csv")
+
+def partial_report_path(report_filepath: str) -> str:
+    return report_filepath + PARTIAL_SUFFIX
+
+
+class StreamingReportWriter:
+    """
+    Context manager writing report rows (dicts keyed by column name) in chunks.
+    Usage:
+        with StreamingReportWriter(path, columns) as writer:
+            writer.write_rows(rows)
+            writer.commit()
+    Leaving the block without commit() (e.g. on an exception) discards the partial file.
+    """
+
+    def __init__(self, report_filepath: str, columns: list, chunk_size: int = REPORT_WRITE_CHUNK_SIZE):
+        self.report_filepath = report_filepath
+        self.partial_filepath = partial_report_path(report_filepath)
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._buffer = []
+        self._file = None
+        self._writer = None
+        self._committed = False
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.partial_filepath) or ".", exist_ok=True)
+        self._file = open(self.partial_filepath, "w", newline="")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(self.columns)
+        self._file.flush()
+        return self
+
+    def write_row(self, row: dict):
+        self._buffer.append([row[column] for column in self.columns])
+        self.rows_written += 1
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self):
+        """
+        Appends buffered rows to the part file.
+        """
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self._buffer = []
+        self._file.flush()
+
+    def commit(self):
+        """
+        Flushes the remaining rows and atomically moves the part file into place.
+        """
+        self.flush()
+        self._file.close()
+        os.replace(self.partial_filepath, self.report_filepath)
+        self._committed = True
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._file.closed:
+            self._file.close()
+        if not self._committed and os.path.exists(self.partial_filepath):
+            os.remove(self.partial_filepath)
+        return False
@@ -0,0 +1,152 @@
+"""
+Rollup-backed report engine.
+
+Whole UTC hours inside a window come from the store_status_hourly rollup (filled at ingest
+time by app/database/ingestors/store_status_hourly.py), so the weekly window sums at most
+168 pre-aggregated rows per store. Only the partial hours at the window start and at the
+report end are replayed from store_status, starting from the previous hour's closing status.
+"""
+import numpy as np
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session as DBSession
+from datetime import datetime, timedelta, timezone
+
+from app.database.models import Store_Status, Store_Status_Hourly
+
+from business import uptime_kernel
+from business.status_series import split_by_store
+from business.generate_report import (
+    _get_reporting_periods,
+    _build_batch_kernel_arrays,
+    _build_report_row,
+)
+
+
+ONE_HOUR = timedelta(hours=1)
+
+
+def _floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+def rollup_covers(db: DBSession, latest_status_timestamp_utc: datetime) -> bool:
+    """
+    True if the rollup has been built up to the hour of the latest poll, i.e. every hour
+    before it is complete.
+    """
+    latest_rollup_hour_utc = db.query(func.max(Store_Status_Hourly.hour_start_utc)).scalar()
+    if latest_rollup_hour_utc is None:
+        return False
+    # Naive from databases without time zone support (SQLite in tests)
+    if latest_rollup_hour_utc.tzinfo is None:
+        latest_rollup_hour_utc = latest_rollup_hour_utc.replace(tzinfo=timezone.utc)
+    return latest_rollup_hour_utc >= _floor_hour(latest_status_timestamp_utc)
+
+def _sum_rollup_hours(db: DBSession, store_ids: list, start_utc: datetime, end_utc: datetime) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sums the rollup rows with start <= hour_start_utc < end for each store.
+    Returns: (uptime_us, downtime_us) int64 arrays in the order of store_ids.
+    """
+    uptime_us = np.zeros(len(store_ids), dtype=np.int64)
+    downtime_us = np.zeros(len(store_ids), dtype=np.int64)
+    if start_utc >= end_utc:
+        return uptime_us, downtime_us
+
+    position_by_store = {store_id: position for position, store_id in enumerate(store_ids)}
+    sums_query = db.query(
+        Store_Status_Hourly.store_id,
+        func.sum(Store_Status_Hourly.uptime_seconds),
+        func.sum(Store_Status_Hourly.downtime_seconds)
+    ).filter(
+        Store_Status_Hourly.hour_start_utc >= start_utc,
+        Store_Status_Hourly.hour_start_utc < end_utc
+    ).group_by(Store_Status_Hourly.store_id)
+
+    for store_id, uptime_seconds, downtime_seconds in sums_query:
+        position = position_by_store.get(store_id)
+        if position is None:
+            continue
+        # Numeric sums come back as exact Decimals
+        uptime_us[position] = int(uptime_seconds * 1_000_000)
+        downtime_us[position] = int(downtime_seconds * 1_000_000)
+
+    return uptime_us, downtime_us
+
+def _replay_partial_hour(db: DBSession, store_ids: list, store_details: dict, start_utc: datetime, end_utc: datetime) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates uptime/downtime over [start, end) from raw polls, for spans within one or two
+    hours of the rollup's edge. The status at the start of start's hour is the closing status
+    of the rollup row before it (inactive if the store has none).
+    Returns: (uptime_us, downtime_us) int64 arrays in the order of store_ids.
+    """
+    hour_start_utc = _floor_hour(start_utc)
+    closing_status_by_store = dict(db.query(
+        Store_Status_Hourly.store_id, Store_Status_Hourly.closing_status
+    ).filter(
+        Store_Status_Hourly.hour_start_utc == hour_start_utc - ONE_HOUR
+    ).all())
+
+    # Each store starts with its closing status at hour start; a poll at that instant wins
+    store_index = {store_id: position for position, store_id in enumerate(store_ids)}
+    store_positions = list(range(len(store_ids)))
+    timestamps_us = [uptime_kernel.to_epoch_us(hour_start_utc)] * len(store_ids)
+    status_codes = [uptime_kernel.to_status_code(closing_status_by_store.get(store_id, False)) for store_id in store_ids]
+
+    polls_query = db.query(Store_Status.store_id, Store_Status.timestamp_utc, Store_Status.status).filter(
+        Store_Status.timestamp_utc >= hour_start_utc,
+        Store_Status.timestamp_utc < end_utc
+    ).order_by(Store_Status.store_id, Store_Status.timestamp_utc)
+    for row in polls_query:
+        position = store_index.get(row.store_id)
+        if position is not None:
+            store_positions.append(position)
+            timestamps_us.append(uptime_kernel.to_epoch_us(row.timestamp_utc))
+            status_codes.append(uptime_kernel.to_status_code(row.status))
+    status_by_store = split_by_store(store_ids, store_positions, timestamps_us, status_codes)
+
+    uptime_us, downtime_us = uptime_kernel.calculate_uptime_downtime_windows_batch_us(
+        *_build_batch_kernel_arrays(store_ids, status_by_store, store_details, start_utc, end_utc),
+        [uptime_kernel.to_epoch_us(start_utc)], uptime_kernel.to_epoch_us(end_utc)
+    )
+    return uptime_us[0], downtime_us[0]
+
+def compute_rollup_report_rows(db: DBSession, report_id: str, store_ids: list, store_details: dict, latest_status_timestamp_utc: datetime, report_end_time_utc: datetime) -> list[dict]:
+    """
+    Produces the report rows for store_ids from the hourly rollup. Call rollup_covers first.
+    store_details: Dict store_id -> (timezone_obj, menu_hours_data), e.g. from _get_all_store_details.
+    """
+    reporting_periods = _get_reporting_periods(report_end_time_utc)
+    latest_hour_utc = _floor_hour(latest_status_timestamp_utc)
+
+    # The latest poll's hour is only partly rolled up, so it is always replayed.
+    tail_uptime_us, tail_downtime_us = _replay_partial_hour(db, store_ids, store_details, latest_hour_utc, report_end_time_utc)
+
+    window_results = []
+    for period in reporting_periods:
+        window_start_utc = period['start_utc']
+        if window_start_utc >= latest_hour_utc:
+            window_results.append(_replay_partial_hour(db, store_ids, store_details, window_start_utc, report_end_time_utc))
+            continue
+
+        first_whole_hour_utc = _floor_hour(window_start_utc)
+        if first_whole_hour_utc < window_start_utc:
+            first_whole_hour_utc += ONE_HOUR
+
+        uptime_us, downtime_us = _sum_rollup_hours(db, store_ids, first_whole_hour_utc, latest_hour_utc)
+        uptime_us = uptime_us + tail_uptime_us
+        downtime_us = downtime_us + tail_downtime_us
+        if first_whole_hour_utc > window_start_utc:
+            head_uptime_us, head_downtime_us = _replay_partial_hour(db, store_ids, store_details, window_start_utc, first_whole_hour_utc)
+            uptime_us = uptime_us + head_uptime_us
+            downtime_us = downtime_us + head_downtime_us
+        window_results.append((uptime_us, downtime_us))
+
+    # Plain Python numbers, so rounding matches the other engines (numpy rounds halves differently).
+    window_results = [
+        ((uptime_us / uptime_kernel.MICROSECONDS_PER_MINUTE).tolist(), (downtime_us / uptime_kernel.MICROSECONDS_PER_MINUTE).tolist())
+        for uptime_us, downtime_us in window_results
+    ]
+    return [
+        _build_report_row(store_id, reporting_periods, [(uptime[position], downtime[position]) for uptime, downtime in window_results])
+        for position, store_id in enumerate(store_ids)
+    ]
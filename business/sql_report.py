@@ -0,0 +1,213 @@
+"""
+SQL push-down report engine.
+
+Uptime/downtime is computed inside Postgres: LEAD() over store_status turns polls into
+status intervals, menu_hours/timezones are expanded into merged UTC business-hour
+intervals, and the two are intersected and summed per store and window. Python only
+receives one aggregate row per store and window.
+"""
+import numpy as np
+
+from sqlalchemy import text
+from collections import defaultdict
+from sqlalchemy.orm import Session as DBSession
+from datetime import datetime, timedelta
+
+from business import uptime_kernel
+from business.timezones import SECOND_US, get_local_offset_segments
+from business.generate_report import _get_reporting_periods, _build_report_row
+from business.config import DEFAULT_TIMEZONE, DEFAULT_MENU_HOURS as DEFAULT_BUSINESS_HOURS
+
+
+LOCAL_EPOCH = datetime(1970, 1, 1)
+
+# :period_start is the widest window's start, :period_end the report end.
+# Window i is [window_starts[i], :period_end).
+UPTIME_DOWNTIME_SQL = text("""
+WITH
+-- Offset-transition segments per zone: a local time t in [local_from, local_to) is UTC t - offset.
+tz_segments AS (
+    SELECT * FROM unnest(
+        CAST(:seg_timezones AS text[]), CAST(:seg_local_from AS timestamp[]),
+        CAST(:seg_local_to AS timestamp[]), CAST(:seg_offset_seconds AS integer[])
+    ) AS t(timezone_str, local_from, local_to, offset_seconds)
+),
+store_zones AS (
+    SELECT s.store_id, COALESCE(tz.timezone_str, :default_timezone) AS timezone_str
+    FROM stores s
+    LEFT JOIN timezones tz ON tz.store_id = s.store_id
+),
+-- Explicit hours replace the default for their day; days without any use the default.
+store_hours AS (
+    SELECT mh.store_id, mh.day_of_week, mh.start_time_local, mh.end_time_local
+    FROM menu_hours mh
+    UNION ALL
+    SELECT s.store_id, dow.day_of_week, CAST(:default_start AS time), CAST(:default_end AS time)
+    FROM stores s
+    CROSS JOIN generate_series(0, 6) AS dow(day_of_week)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM menu_hours mh WHERE mh.store_id = s.store_id AND mh.day_of_week = dow.day_of_week
+    )
+),
+local_days AS (
+    SELECT CAST(d AS date) AS local_date
+    FROM generate_series(CAST(:period_start AS date) - 3, CAST(:period_end AS date) + 3, interval '1 day') AS d
+),
+-- Local wall-clock hours, each end converted with the offset in effect at it, clipped to the period.
+bh_local AS (
+    SELECT
+        sz.store_id,
+        sz.timezone_str,
+        ld.local_date + h.start_time_local AS local_start,
+        ld.local_date + h.end_time_local
+            + CASE WHEN h.start_time_local > h.end_time_local THEN interval '1 day' ELSE interval '0' END AS local_end
+    FROM store_zones sz
+    JOIN store_hours h ON h.store_id = sz.store_id
+    JOIN local_days ld ON CAST(EXTRACT(ISODOW FROM ld.local_date) AS integer) - 1 = h.day_of_week
+),
+bh_clipped AS (
+    SELECT
+        bl.store_id,
+        GREATEST(bh.utc_start, :period_start) AS bh_start,
+        LEAST(bh.utc_end, :period_end) AS bh_end
+    FROM bh_local bl
+    JOIN tz_segments ss
+        ON ss.timezone_str = bl.timezone_str AND bl.local_start >= ss.local_from AND bl.local_start < ss.local_to
+    JOIN tz_segments se
+        ON se.timezone_str = bl.timezone_str AND bl.local_end >= se.local_from AND bl.local_end < se.local_to
+    CROSS JOIN LATERAL (
+        SELECT
+            (bl.local_start - make_interval(secs => ss.offset_seconds)) AT TIME ZONE 'UTC' AS utc_start,
+            (bl.local_end - make_interval(secs => se.offset_seconds)) AT TIME ZONE 'UTC' AS utc_end
+    ) bh
+    WHERE bh.utc_start < :period_end AND bh.utc_end > :period_start
+),
+-- Gaps-and-islands merge of overlapping or touching intervals.
+bh_marked AS (
+    SELECT
+        store_id, bh_start, bh_end,
+        CASE WHEN bh_start <= MAX(bh_end) OVER (
+            PARTITION BY store_id ORDER BY bh_start, bh_end ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ) THEN 0 ELSE 1 END AS starts_island
+    FROM bh_clipped
+    WHERE bh_start < bh_end
+),
+bh_islands AS (
+    SELECT store_id, bh_start, bh_end,
+        SUM(starts_island) OVER (PARTITION BY store_id ORDER BY bh_start, bh_end ROWS UNBOUNDED PRECEDING) AS island
+    FROM bh_marked
+),
+business_hours AS (
+    SELECT store_id, MIN(bh_start) AS bh_start, MAX(bh_end) AS bh_end
+    FROM bh_islands
+    GROUP BY store_id, island
+),
+-- Polls in the period, each store's last poll before it, and an inactive sentinel so
+-- time before a store's first poll counts as downtime.
+polls AS (
+    SELECT store_id, timestamp_utc, status
+    FROM store_status
+    WHERE timestamp_utc >= :period_start AND timestamp_utc < :period_end
+    UNION ALL
+    (
+        SELECT DISTINCT ON (store_id) store_id, timestamp_utc, status
+        FROM store_status
+        WHERE timestamp_utc < :period_start
+        ORDER BY store_id, timestamp_utc DESC
+    )
+    UNION ALL
+    SELECT store_id, CAST('-infinity' AS timestamptz), false
+    FROM stores
+),
+status_intervals AS (
+    SELECT
+        store_id,
+        status,
+        GREATEST(timestamp_utc, :period_start) AS status_start,
+        LEAST(GREATEST(COALESCE(LEAD(timestamp_utc) OVER (PARTITION BY store_id ORDER BY timestamp_utc), :period_end), :period_start), :period_end) AS status_end
+    FROM polls
+),
+windows AS (
+    SELECT * FROM unnest(CAST(:window_starts AS timestamptz[])) WITH ORDINALITY AS w(window_start, window_index)
+),
+status_overlaps AS (
+    SELECT
+        si.store_id,
+        w.window_index,
+        si.status,
+        EXTRACT(EPOCH FROM LEAST(si.status_end, bh.bh_end) - GREATEST(si.status_start, bh.bh_start, w.window_start)) AS seconds
+    FROM status_intervals si
+    JOIN business_hours bh
+        ON bh.store_id = si.store_id
+       AND bh.bh_start < si.status_end
+       AND bh.bh_end > si.status_start
+    CROSS JOIN windows w
+    WHERE si.status IS NOT NULL
+      AND LEAST(si.status_end, bh.bh_end) > GREATEST(si.status_start, bh.bh_start, w.window_start)
+)
+SELECT
+    store_id,
+    window_index,
+    COALESCE(SUM(seconds) FILTER (WHERE status), 0) AS uptime_seconds,
+    COALESCE(SUM(seconds) FILTER (WHERE NOT status), 0) AS downtime_seconds
+FROM status_overlaps
+GROUP BY store_id, window_index
+""")
+
+
+def _get_timezone_segments(db: DBSession, period_start_utc: datetime, period_end_utc: datetime) -> dict:
+    """
+    Flattened offset-transition segments of every timezone name found in the timezones
+    table, as query parameters (local bounds as naive timestamps, offsets in seconds).
+    """
+    segments = get_local_offset_segments(
+        (row[0] for row in db.execute(text("SELECT DISTINCT timezone_str FROM timezones"))),
+        period_start_utc, period_end_utc
+    )
+    params = {"seg_timezones": [], "seg_local_from": [], "seg_local_to": [], "seg_offset_seconds": []}
+    for timezone_name, zone_segments in segments.items():
+        for local_from_us, local_to_us, offset_us in zone_segments:
+            params["seg_timezones"].append(timezone_name)
+            params["seg_local_from"].append(_local_us_to_timestamp(local_from_us))
+            params["seg_local_to"].append(_local_us_to_timestamp(local_to_us))
+            params["seg_offset_seconds"].append(offset_us // SECOND_US)
+    return params
+
+def _local_us_to_timestamp(local_us: int) -> datetime:
+    # The open-ended first/last segments become the timestamp range limits
+    if local_us == np.iinfo(np.int64).min:
+        return datetime.min
+    if local_us == np.iinfo(np.int64).max:
+        return datetime.max
+    return LOCAL_EPOCH + timedelta(microseconds=local_us)
+
+def compute_sql_report_rows(db: DBSession, report_id: str, store_ids: list, report_end_time_utc: datetime) -> list[dict]:
+    """
+    Produces the report rows for store_ids with a single aggregate query.
+    """
+    reporting_periods = _get_reporting_periods(report_end_time_utc)
+    window_starts_utc = [period['start_utc'] for period in reporting_periods]
+
+    print(f"Report {report_id}: Computing uptime/downtime in the database.")
+    result = db.execute(UPTIME_DOWNTIME_SQL, {
+        **_get_timezone_segments(db, min(window_starts_utc), report_end_time_utc),
+        "default_timezone": DEFAULT_TIMEZONE,
+        "default_start": DEFAULT_BUSINESS_HOURS['start_time_local'],
+        "default_end": DEFAULT_BUSINESS_HOURS['end_time_local'],
+        "period_start": min(window_starts_utc),
+        "period_end": report_end_time_utc,
+        "window_starts": window_starts_utc,
+    })
+
+    # EXTRACT(EPOCH ...) is numeric, so the sums are exact Decimals
+    window_us_by_store = defaultdict(lambda: [(0, 0)] * len(reporting_periods))
+    for store_id, window_index, uptime_seconds, downtime_seconds in result:
+        window_us_by_store[store_id][window_index - 1] = (int(uptime_seconds * 1_000_000), int(downtime_seconds * 1_000_000))
+
+    return [
+        _build_report_row(store_id, reporting_periods, [
+            (uptime_us / uptime_kernel.MICROSECONDS_PER_MINUTE, downtime_us / uptime_kernel.MICROSECONDS_PER_MINUTE)
+            for uptime_us, downtime_us in window_us_by_store[store_id]
+        ])
+        for store_id in store_ids
+    ]
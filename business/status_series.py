@@ -0,0 +1,180 @@
+"""
+Compact per-store status series.
+
+A store's polls as a sorted int64 epoch-microsecond array plus packed status bitmaps
+(one bit "active", one bit "known"), built once per store instead of passing lists of
+ORM rows around. Lookups are binary searches; slices share the parent's arrays, so the
+bulk loader can cut every store's series out of one fleet-wide series without copies.
+"""
+import numpy as np
+
+from datetime import datetime
+
+from business import uptime_kernel
+
+
+class StatusSeries:
+    """
+    Polls of one store in timestamp order (split_by_store's fleet-wide parent is ordered
+    by store, then timestamp).
+    timestamps_us: int64 epoch microseconds; a read-only view.
+    Status values are True (active), False (inactive) or None (unknown).
+    """
+
+    __slots__ = ("timestamps_us", "_active_bits", "_known_bits", "_bit_offset")
+
+    def __init__(self, timestamps_us: np.ndarray, active_bits: np.ndarray, known_bits: np.ndarray = None, bit_offset: int = 0):
+        self.timestamps_us = timestamps_us
+        self._active_bits = active_bits
+        # None when every status is known
+        self._known_bits = known_bits
+        self._bit_offset = bit_offset
+
+    @classmethod
+    def from_arrays(cls, timestamps_us, status_codes) -> "StatusSeries":
+        """
+        Builds a series from epoch-microsecond timestamps and int8 status codes
+        (uptime_kernel.STATUS_*), sorting them by timestamp if needed (stable).
+        """
+        timestamps_us = np.array(timestamps_us, dtype=np.int64)
+        status_codes = np.asarray(status_codes, dtype=np.int8)
+        if len(timestamps_us) > 1 and np.any(timestamps_us[1:] < timestamps_us[:-1]):
+            order = np.argsort(timestamps_us, kind="stable")
+            timestamps_us, status_codes = timestamps_us[order], status_codes[order]
+        return cls._from_ordered(timestamps_us, status_codes)
+
+    @classmethod
+    def _from_ordered(cls, timestamps_us: np.ndarray, status_codes: np.ndarray) -> "StatusSeries":
+        # Takes ownership of timestamps_us; callers keep the order they need
+        timestamps_us.flags.writeable = False
+        known = status_codes != uptime_kernel.STATUS_UNKNOWN
+        known_bits = None if known.all() else np.packbits(known)
+        return cls(timestamps_us, np.packbits(status_codes == uptime_kernel.STATUS_ACTIVE), known_bits)
+
+    @classmethod
+    def from_rows(cls, rows) -> "StatusSeries":
+        """
+        Builds a series from rows exposing timestamp_utc/status (ORM objects, Row tuples).
+        """
+        rows = list(rows)
+        return cls.from_arrays(*uptime_kernel.status_rows_to_arrays(rows))
+
+    def __len__(self) -> int:
+        return len(self.timestamps_us)
+
+    def __getitem__(self, index: slice) -> "StatusSeries":
+        """
+        Positional slice sharing this series' arrays (no copy). Only step-1 slices.
+        """
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("StatusSeries slices must be contiguous")
+        stop = max(start, stop)
+        return StatusSeries(self.timestamps_us[start:stop], self._active_bits, self._known_bits, self._bit_offset + start)
+
+    def __iter__(self):
+        """
+        Yields (timestamp_utc as aware UTC datetime, status) in timestamp order.
+        """
+        return zip(self.datetimes(), self.statuses())
+
+    def __repr__(self) -> str:
+        return f"StatusSeries({len(self)} polls)"
+
+    @property
+    def codes(self) -> np.ndarray:
+        """
+        int8 status codes aligned with timestamps_us (unpacked on each access).
+        """
+        return self._unpack_range(0, len(self))
+
+    def _unpack_range(self, start: int, stop: int) -> np.ndarray:
+        first_bit = self._bit_offset + start
+        last_bit = self._bit_offset + stop
+        byte_start, byte_stop = first_bit >> 3, (last_bit + 7) >> 3
+        bit_start = first_bit - (byte_start << 3)
+
+        codes = np.unpackbits(self._active_bits[byte_start:byte_stop])[bit_start:bit_start + stop - start].astype(np.int8)
+        if self._known_bits is not None:
+            known = np.unpackbits(self._known_bits[byte_start:byte_stop])[bit_start:bit_start + stop - start]
+            codes[known == 0] = uptime_kernel.STATUS_UNKNOWN
+        return codes
+
+    def status_code(self, index: int) -> int:
+        """
+        Returns: int8 status code of the poll at position index.
+        """
+        if index < 0:
+            index += len(self)
+        bit = self._bit_offset + index
+        if self._known_bits is not None and not (self._known_bits[bit >> 3] >> (7 - (bit & 7))) & 1:
+            return uptime_kernel.STATUS_UNKNOWN
+        return int((self._active_bits[bit >> 3] >> (7 - (bit & 7))) & 1)
+
+    def statuses(self) -> list:
+        """
+        Returns: List of statuses (True/False/None) aligned with timestamps_us.
+        """
+        return [None if code == uptime_kernel.STATUS_UNKNOWN else code == uptime_kernel.STATUS_ACTIVE for code in self.codes.tolist()]
+
+    def datetimes(self) -> list[datetime]:
+        """
+        Returns: List of aware UTC datetimes aligned with timestamps_us.
+        """
+        return [uptime_kernel.from_epoch_us(epoch_us) for epoch_us in self.timestamps_us.tolist()]
+
+    def index_at(self, at) -> int:
+        """
+        Returns: Number of polls at or before `at` (datetime or epoch microseconds).
+        """
+        at_us = uptime_kernel.to_epoch_us(at) if isinstance(at, datetime) else at
+        return int(np.searchsorted(self.timestamps_us, at_us, side="right"))
+
+    def status_code_at(self, at) -> int:
+        """
+        Status code in effect at `at`: the last poll at or before it holds, and time
+        before the first poll counts as inactive.
+        """
+        index = self.index_at(at)
+        return self.status_code(index - 1) if index > 0 else uptime_kernel.STATUS_INACTIVE
+
+    def status_at(self, at):
+        """
+        Returns: True/False/None status in effect at `at` (see status_code_at).
+        """
+        code = self.status_code_at(at)
+        return None if code == uptime_kernel.STATUS_UNKNOWN else code == uptime_kernel.STATUS_ACTIVE
+
+    def slice_range(self, start_us: int = None, end_us: int = None, include_previous: bool = False) -> "StatusSeries":
+        """
+        Polls with start_us <= timestamp < end_us (either bound optional), as a view.
+        include_previous: Also keep the last poll before start_us, which sets the status at start_us.
+        """
+        start = 0 if start_us is None else int(np.searchsorted(self.timestamps_us, start_us, side="left"))
+        stop = len(self) if end_us is None else int(np.searchsorted(self.timestamps_us, end_us, side="left"))
+        if include_previous and start > 0:
+            start -= 1
+        return self[start:stop]
+
+
+EMPTY_STATUS_SERIES = StatusSeries.from_arrays(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8))
+
+
+def split_by_store(store_ids: list, store_positions, timestamps_us, status_codes) -> dict:
+    """
+    Builds one fleet-wide series sorted by (store, timestamp) and cuts it into per-store views.
+    store_positions: Index into store_ids of each poll.
+    Returns: Dict store_id -> StatusSeries, for the stores that have polls.
+    """
+    store_positions = np.asarray(store_positions, dtype=np.int64)
+    timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+    order = np.lexsort((timestamps_us, store_positions))
+    # Ordered by store first, so only each store's slice is ascending
+    fleet_series = StatusSeries._from_ordered(timestamps_us[order], np.asarray(status_codes, dtype=np.int8)[order])
+
+    bounds = np.searchsorted(store_positions[order], np.arange(len(store_ids) + 1), side="left").tolist()
+    return {
+        store_id: fleet_series[bounds[position]:bounds[position + 1]]
+        for position, store_id in enumerate(store_ids)
+        if bounds[position + 1] > bounds[position]
+    }
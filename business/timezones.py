@@ -0,0 +1,147 @@
+"""
+Timezone layer: zoneinfo zones and precomputed UTC offset-transition tables.
+
+For each zone and span, the transitions (UTC instants where the offset changes) are found
+once, so local wall-clock times are converted to UTC epoch microseconds with one sorted
+array lookup instead of per-datetime tz arithmetic. The set-based engines (SQL, DuckDB)
+get the same table as local-time segments, so every engine converts identically.
+
+Local -> UTC rules (those of datetime with fold=0):
+- A time inside a DST gap takes the offset from before the gap, so it moves forward
+  (02:30 on a spring-forward night becomes 03:30).
+- An ambiguous time inside a DST overlap takes its first occurrence.
+"""
+import numpy as np
+
+from functools import lru_cache
+from collections import namedtuple
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from business.config import DEFAULT_TIMEZONE
+
+
+SECOND_US = 1_000_000
+DAY_US = 86400 * SECOND_US
+# Tables are built for aligned blocks around the requested span so that nearby spans share one
+TABLE_BLOCK_SECONDS = 32 * 86400
+TABLE_MARGIN_SECONDS = 3 * 86400
+SCAN_STEP_SECONDS = 3600
+
+# utc_transitions_us[i] is where the offset changes from offsets_us[i] to offsets_us[i + 1];
+# local_boundaries_us[i] is the same change on the local clock (see local_to_utc_us).
+OffsetTable = namedtuple("OffsetTable", ["utc_transitions_us", "local_boundaries_us", "offsets_us"])
+
+
+class UnknownTimezoneError(KeyError):
+    pass
+
+
+@lru_cache(maxsize=None)
+def get_timezone(timezone_str: str) -> ZoneInfo:
+    """
+    Returns: The ZoneInfo for timezone_str.
+    Raises: UnknownTimezoneError if the name is not in the tz database.
+    """
+    try:
+        return ZoneInfo(timezone_str)
+    except (ZoneInfoNotFoundError, ValueError, OSError, TypeError):
+        raise UnknownTimezoneError(timezone_str)
+
+def is_known_timezone(timezone_str: str) -> bool:
+    try:
+        get_timezone(timezone_str)
+        return True
+    except UnknownTimezoneError:
+        return False
+
+
+def _offset_seconds_at(zone: ZoneInfo, epoch_seconds: int) -> int:
+    return int(datetime.fromtimestamp(epoch_seconds, tz=zone).utcoffset().total_seconds())
+
+def _find_transitions(zone: ZoneInfo, start_seconds: int, end_seconds: int) -> tuple[list, list]:
+    """
+    Scans [start_seconds, end_seconds] hourly and bisects every offset change to the second.
+    Returns: (transition epoch seconds, offsets in seconds) with len(offsets) == len(transitions) + 1
+    """
+    transitions = []
+    offsets = [_offset_seconds_at(zone, start_seconds)]
+    scan_seconds = start_seconds
+    while scan_seconds < end_seconds:
+        next_seconds = min(scan_seconds + SCAN_STEP_SECONDS, end_seconds)
+        next_offset = _offset_seconds_at(zone, next_seconds)
+        if next_offset != offsets[-1]:
+            low, high = scan_seconds, next_seconds
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _offset_seconds_at(zone, middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append(high)
+            offsets.append(next_offset)
+        scan_seconds = next_seconds
+    return transitions, offsets
+
+@lru_cache(maxsize=1024)
+def _get_offset_table_for_block(timezone_str: str, block_start_seconds: int, block_end_seconds: int) -> OffsetTable:
+    transitions, offsets = _find_transitions(get_timezone(timezone_str), block_start_seconds, block_end_seconds)
+    utc_transitions_us = np.array(transitions, dtype=np.int64) * SECOND_US
+    offsets_us = np.array(offsets, dtype=np.int64) * SECOND_US
+    # On the local clock a change happens at the later of its two readings: a gap's
+    # missing times stay with the old offset, an overlap's repeated times too.
+    local_boundaries_us = utc_transitions_us + np.maximum(offsets_us[:-1], offsets_us[1:])
+    for array in (utc_transitions_us, local_boundaries_us, offsets_us):
+        array.flags.writeable = False
+    return OffsetTable(utc_transitions_us, local_boundaries_us, offsets_us)
+
+def get_offset_table(timezone_str: str, span_start_utc: datetime, span_end_utc: datetime) -> OffsetTable:
+    """
+    Offset-transition table of a zone covering at least [span_start_utc - 3 days, span_end_utc + 3 days].
+    Returns: OffsetTable (cached; treat as read-only).
+    Raises: UnknownTimezoneError for names not in the tz database.
+    """
+    start_seconds = int(span_start_utc.timestamp()) - TABLE_MARGIN_SECONDS
+    end_seconds = int(span_end_utc.timestamp()) + TABLE_MARGIN_SECONDS
+    block_start_seconds = start_seconds - start_seconds % TABLE_BLOCK_SECONDS
+    block_end_seconds = end_seconds - end_seconds % TABLE_BLOCK_SECONDS + TABLE_BLOCK_SECONDS
+    return _get_offset_table_for_block(timezone_str, block_start_seconds, block_end_seconds)
+
+def utc_offset_us(offset_table: OffsetTable, utc_us):
+    """
+    Returns: UTC offset (microseconds) in effect at the given UTC epoch microsecond(s).
+    """
+    return offset_table.offsets_us[np.searchsorted(offset_table.utc_transitions_us, utc_us, side="right")]
+
+def local_to_utc_us(offset_table: OffsetTable, local_us):
+    """
+    Converts local wall-clock times, as epoch microseconds of the naive local datetime,
+    to UTC epoch microseconds (gap and overlap rules in the module docstring).
+    """
+    return local_us - offset_table.offsets_us[np.searchsorted(offset_table.local_boundaries_us, local_us, side="right")]
+
+
+def get_local_offset_segments(timezone_names, span_start_utc: datetime, span_end_utc: datetime) -> dict:
+    """
+    Offset tables as local-time segments for the set-based engines: a local time t in
+    [local_from_us, local_to_us) converts to t - offset_us. The first and last segments
+    are open-ended (int64 min / max).
+    Always includes DEFAULT_TIMEZONE; unknown names get the default's segments, as in
+    _build_store_details.
+    Returns: Dict timezone name -> list of (local_from_us, local_to_us, offset_us)
+    """
+    def _segments(offset_table: OffsetTable) -> list:
+        bounds = [np.iinfo(np.int64).min] + offset_table.local_boundaries_us.tolist() + [np.iinfo(np.int64).max]
+        return [(bounds[i], bounds[i + 1], offset_us) for i, offset_us in enumerate(offset_table.offsets_us.tolist())]
+
+    default_segments = _segments(get_offset_table(DEFAULT_TIMEZONE, span_start_utc, span_end_utc))
+    segments = {DEFAULT_TIMEZONE: default_segments}
+    for timezone_name in timezone_names:
+        if timezone_name is None or timezone_name in segments:
+            continue
+        try:
+            segments[timezone_name] = _segments(get_offset_table(timezone_name, span_start_utc, span_end_utc))
+        except UnknownTimezoneError:
+            print(f"Warning: Unknown timezone '{timezone_name}'. Using default '{DEFAULT_TIMEZONE}'.")
+            segments[timezone_name] = default_segments
+    return segments
@@ -0,0 +1,317 @@
+"""
+NumPy uptime/downtime kernel working on int64 epoch-microsecond arrays.
+
+Status is a step function: each poll holds until the next one, and time before the
+first poll counts as inactive. Uptime/downtime is the overlap of that step function
+with the store's merged business-hour intervals, computed with searchsorted and
+prefix sums instead of a per-interval Python loop.
+"""
+import numpy as np
+
+from datetime import datetime, timezone, timedelta
+
+
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+MICROSECONDS_PER_MINUTE = 60 * 1_000_000
+
+# Status codes used in the int8 status arrays
+STATUS_INACTIVE = 0
+STATUS_ACTIVE = 1
+STATUS_UNKNOWN = -1
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """
+    Converts a datetime to integer microseconds since the Unix epoch (naive = UTC).
+    """
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - EPOCH_UTC) // ONE_MICROSECOND
+
+
+def to_status_code(status) -> int:
+    """
+    Maps a stored status (True/False/None) to its int8 status code.
+    """
+    if status is None:
+        return STATUS_UNKNOWN
+    return STATUS_ACTIVE if status else STATUS_INACTIVE
+
+
+def from_epoch_us(epoch_us: int) -> datetime:
+    """
+    Converts integer microseconds since the Unix epoch back to an aware UTC datetime.
+    """
+    return EPOCH_UTC + timedelta(microseconds=int(epoch_us))
+
+
+def status_rows_to_arrays(sorted_status_data: list) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts sorted rows exposing timestamp_utc/status into (int64 timestamps, int8 codes).
+    """
+    timestamps = np.fromiter((to_epoch_us(entry.timestamp_utc) for entry in sorted_status_data), dtype=np.int64, count=len(sorted_status_data))
+    statuses = np.fromiter((to_status_code(entry.status) for entry in sorted_status_data), dtype=np.int8, count=len(sorted_status_data))
+    return timestamps, statuses
+
+
+def intervals_to_arrays(intervals: list) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Converts a list of (start_datetime, end_datetime) tuples into (int64 starts, int64 ends).
+    """
+    starts = np.fromiter((to_epoch_us(start) for start, _ in intervals), dtype=np.int64, count=len(intervals))
+    ends = np.fromiter((to_epoch_us(end) for _, end in intervals), dtype=np.int64, count=len(intervals))
+    return starts, ends
+
+
+def _covered_before(points: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    For each point t, returns the total length of the (sorted, disjoint) intervals
+    that lies before t.
+    """
+    if len(starts) == 0:
+        return np.zeros(len(points), dtype=np.int64)
+
+    lengths = ends - starts
+    cumulative = np.concatenate(([0], np.cumsum(lengths)))
+
+    idx = np.searchsorted(starts, points, side="right") - 1
+    safe_idx = np.maximum(idx, 0)
+    partial = np.clip(points - starts[safe_idx], 0, lengths[safe_idx])
+
+    return np.where(idx >= 0, cumulative[safe_idx] + partial, 0)
+
+
+def calculate_uptime_downtime_windows_batch_us(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    status_offsets: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    bh_offsets: np.ndarray,
+    window_starts_us,
+    period_end_us: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates uptime and downtime for a batch of stores over several UTC windows that
+    share the same end, in a single sweep over the widest window. Results are exact
+    integer microseconds.
+
+    Args:
+        status_timestamps: Concatenated, per-store sorted poll timestamps (int64 epoch us).
+            Each store's slice must include its last poll before the widest window, if any.
+        status_codes: int8 status codes matching status_timestamps.
+        status_offsets: CSR offsets, store k owns status_timestamps[status_offsets[k]:status_offsets[k+1]].
+        bh_starts, bh_ends: Concatenated, per-store sorted and merged business-hour intervals.
+        bh_offsets: CSR offsets into bh_starts/bh_ends.
+        window_starts_us: Start of each window [start, period_end) in epoch us.
+        period_end_us: The shared end of all windows in epoch us.
+
+    Returns:
+        (uptime_us, downtime_us) int64 arrays of shape (windows, stores).
+    """
+    window_starts_us = np.asarray(window_starts_us, dtype=np.int64)
+    store_count = len(status_offsets) - 1
+    period_start_us = int(window_starts_us.min())
+    span = period_end_us - period_start_us
+    if store_count <= 0 or span <= 0:
+        empty = np.zeros((len(window_starts_us), max(store_count, 0)), dtype=np.int64)
+        return empty, empty.copy()
+
+    # Lay stores side by side on one axis: store k's period becomes [start + k*span, end + k*span).
+    status_store = np.repeat(np.arange(store_count), np.diff(status_offsets))
+    in_period = status_timestamps < period_end_us
+    status_store = status_store[in_period]
+    shifted_status = np.maximum(status_timestamps[in_period], period_start_us) + status_store * span
+    shifted_codes = status_codes[in_period]
+
+    # Each store starts with an implicit inactive status at its period start. Sentinels go
+    # first so polls at (or clipped to) the period start override them.
+    store_starts = period_start_us + np.arange(store_count, dtype=np.int64) * span
+    points = np.concatenate((store_starts, shifted_status))
+    codes = np.concatenate((np.full(store_count, STATUS_INACTIVE, dtype=np.int8), shifted_codes))
+    order = np.lexsort((np.arange(len(points)), points))
+    points, codes = points[order], codes[order]
+
+    # Segment i runs from points[i] to points[i+1]; the last one ends at the last store's period end.
+    store_ends = store_starts + span
+    segment_ends = np.append(points[1:], store_ends[-1])
+
+    bh_store = np.repeat(np.arange(store_count), np.diff(bh_offsets))
+    clipped_starts = np.clip(bh_starts, period_start_us, period_end_us) + bh_store * span
+    clipped_ends = np.clip(bh_ends, period_start_us, period_end_us) + bh_store * span
+    non_empty = clipped_starts < clipped_ends
+    clipped_starts, clipped_ends = clipped_starts[non_empty], clipped_ends[non_empty]
+
+    covered_at_points = _covered_before(points, clipped_starts, clipped_ends)
+    overlap_us = _covered_before(segment_ends, clipped_starts, clipped_ends) - covered_at_points
+
+    is_active = codes == STATUS_ACTIVE
+    is_inactive = codes == STATUS_INACTIVE
+    cumulative_active = np.concatenate(([0], np.cumsum(np.where(is_active, overlap_us, 0))))
+    cumulative_inactive = np.concatenate(([0], np.cumsum(np.where(is_inactive, overlap_us, 0))))
+
+    def _accumulated_before(times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Business-hours (active, inactive) time before each time on the shared axis.
+        idx = np.searchsorted(points, times, side="right") - 1
+        partial = _covered_before(times, clipped_starts, clipped_ends) - covered_at_points[idx]
+        return (
+            cumulative_active[idx] + np.where(is_active[idx], partial, 0),
+            cumulative_inactive[idx] + np.where(is_inactive[idx], partial, 0)
+        )
+
+    uptime_at_end, downtime_at_end = _accumulated_before(store_ends)
+
+    uptime_us = np.empty((len(window_starts_us), store_count), dtype=np.int64)
+    downtime_us = np.empty((len(window_starts_us), store_count), dtype=np.int64)
+    for w, window_start_us in enumerate(window_starts_us):
+        uptime_before, downtime_before = _accumulated_before(window_start_us + (store_starts - period_start_us))
+        uptime_us[w] = uptime_at_end - uptime_before
+        downtime_us[w] = downtime_at_end - downtime_before
+
+    return uptime_us, downtime_us
+
+
+def calculate_bucketed_uptime_downtime_batch_us(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    status_offsets: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    bh_offsets: np.ndarray,
+    period_start_us: int,
+    period_end_us: int,
+    bucket_us: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Splits [period_start, period_end) into buckets aligned to multiples of bucket_us
+    (e.g. UTC hours) and calculates uptime/downtime per store and bucket, plus the status
+    in effect at the end of each bucket. The last bucket is the one containing period_end;
+    its closing status includes a poll at exactly period_end.
+
+    Args are as for calculate_uptime_downtime_windows_batch_us (a poll before period_start
+    counts as the status at period_start).
+
+    Returns:
+        (uptime_us, downtime_us, closing_codes) arrays of shape (stores, buckets), bucket 0
+        being the one containing period_start.
+    """
+    store_count = len(status_offsets) - 1
+    first_boundary_us = period_start_us - period_start_us % bucket_us
+    bucket_count = (period_end_us - first_boundary_us) // bucket_us + 1
+
+    uptime_us = np.zeros((store_count, bucket_count), dtype=np.int64)
+    downtime_us = np.zeros((store_count, bucket_count), dtype=np.int64)
+    if store_count > 0 and period_end_us > period_start_us:
+        # One window per bucket boundary; bucket values are differences of consecutive windows.
+        window_starts = [period_start_us] + list(range(first_boundary_us + bucket_us, period_end_us, bucket_us))
+        window_uptime, window_downtime = calculate_uptime_downtime_windows_batch_us(
+            status_timestamps, status_codes, status_offsets,
+            bh_starts, bh_ends, bh_offsets,
+            window_starts, period_end_us
+        )
+        zero_row = np.zeros((1, store_count), dtype=np.int64)
+        uptime_us[:, :len(window_starts)] = (window_uptime - np.vstack((window_uptime[1:], zero_row))).T
+        downtime_us[:, :len(window_starts)] = (window_downtime - np.vstack((window_downtime[1:], zero_row))).T
+
+    # Closing status: last poll inside each bucket, carried forward (inactive before the first poll).
+    no_poll = np.int8(-2)
+    closing_codes = np.full((store_count, bucket_count), no_poll, dtype=np.int8)
+    status_store = np.repeat(np.arange(store_count), np.diff(status_offsets))
+    in_period = status_timestamps <= period_end_us
+    status_store, timestamps, codes = status_store[in_period], status_timestamps[in_period], status_codes[in_period]
+    if len(timestamps):
+        buckets = np.maximum((timestamps - first_boundary_us) // bucket_us, 0)
+        last_in_bucket = np.append((status_store[1:] != status_store[:-1]) | (buckets[1:] != buckets[:-1]), True)
+        closing_codes[status_store[last_in_bucket], buckets[last_in_bucket]] = codes[last_in_bucket]
+
+    filled_from = np.maximum.accumulate(np.where(closing_codes != no_poll, np.arange(bucket_count), -1), axis=1)
+    closing_codes = np.where(
+        filled_from >= 0,
+        np.take_along_axis(closing_codes, np.maximum(filled_from, 0), axis=1),
+        np.int8(STATUS_INACTIVE)
+    ).astype(np.int8)
+
+    return uptime_us, downtime_us, closing_codes
+
+
+def calculate_uptime_downtime_windows_batch(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    status_offsets: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    bh_offsets: np.ndarray,
+    window_starts_us,
+    period_end_us: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Minutes form of calculate_uptime_downtime_windows_batch_us.
+    Returns: (uptime_minutes, downtime_minutes) float64 arrays of shape (windows, stores).
+    """
+    uptime_us, downtime_us = calculate_uptime_downtime_windows_batch_us(
+        status_timestamps, status_codes, status_offsets,
+        bh_starts, bh_ends, bh_offsets,
+        window_starts_us, period_end_us
+    )
+    return uptime_us / MICROSECONDS_PER_MINUTE, downtime_us / MICROSECONDS_PER_MINUTE
+
+
+def calculate_uptime_downtime_batch(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    status_offsets: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    bh_offsets: np.ndarray,
+    period_start_us: int,
+    period_end_us: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Single-window form of calculate_uptime_downtime_windows_batch.
+    Returns: (uptime_minutes, downtime_minutes) float64 arrays, one entry per store.
+    """
+    uptime, downtime = calculate_uptime_downtime_windows_batch(
+        status_timestamps, status_codes, status_offsets,
+        bh_starts, bh_ends, bh_offsets,
+        [period_start_us], period_end_us
+    )
+    return uptime[0], downtime[0]
+
+
+def calculate_uptime_downtime_windows(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    window_starts_us,
+    period_end_us: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Single-store form of calculate_uptime_downtime_windows_batch.
+    Returns: (uptime_minutes, downtime_minutes) float64 arrays, one entry per window.
+    """
+    uptime, downtime = calculate_uptime_downtime_windows_batch(
+        status_timestamps, status_codes, np.array([0, len(status_timestamps)]),
+        bh_starts, bh_ends, np.array([0, len(bh_starts)]),
+        window_starts_us, period_end_us
+    )
+    return uptime[:, 0], downtime[:, 0]
+
+
+def calculate_uptime_downtime(
+    status_timestamps: np.ndarray,
+    status_codes: np.ndarray,
+    bh_starts: np.ndarray,
+    bh_ends: np.ndarray,
+    period_start_us: int,
+    period_end_us: int
+) -> tuple[float, float]:
+    """
+    Single-store, single-window form of calculate_uptime_downtime_windows_batch.
+    Returns: (uptime_minutes, downtime_minutes)
+    """
+    uptime, downtime = calculate_uptime_downtime_windows(
+        status_timestamps, status_codes, bh_starts, bh_ends, [period_start_us], period_end_us
+    )
+    return float(uptime[0]), float(downtime[0])
@@ -0,0 +1,156 @@
+"""
+Report worker: runs queued reports outside the API process.
+
+Claims Pending reports from the reports table (business/report_queue.py) and runs up to
+REPORT_WORKER_CONCURRENCY of them at once, each in its own thread; REPORT_WORKERS still
+parallelises the stores of one report in a process pool. While reports run, a heartbeat thread
+refreshes their heartbeat_at and requeues reports abandoned by dead workers. A run whose report
+was requeued meanwhile (missed heartbeats) loses its claim and is discarded without touching
+the report.
+SIGINT/SIGTERM stop claiming and wait for the running reports to finish.
+
+Usage:
+    python -m business.worker [--concurrency 2] [--exit-when-idle]
+
+Exits at once unless REPORT_EXECUTOR=worker: with REPORT_EXECUTOR=background the API process runs
+the reports it queues.
+
+Report metrics are written to METRICS_DIR/report_worker.prom (served on /metrics) after each report;
+run one worker process per METRICS_DIR.
+"""
+import os
+import uuid
+import signal
+import socket
+import argparse
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database.db import engine
+from app.services import metrics
+
+from business.report_queue import ReportClaim, ensure_report_schema, claim_next_report, heartbeat_reports, requeue_stale_reports
+from business.generate_report import generate_report_data_and_save_csv
+from business.config import (
+    REPORT_EXECUTOR,
+    REPORT_WORKER_CONCURRENCY,
+    REPORT_WORKER_POLL_SECONDS,
+    REPORT_WORKER_HEARTBEAT_SECONDS,
+    REPORT_WORKER_STALE_SECONDS,
+    REPORT_MAX_ATTEMPTS
+)
+
+REPORT_METRICS = [
+    metrics.REPORTS_TOTAL,
+    metrics.REPORT_DURATION_SECONDS,
+    metrics.REPORT_STAGE_SECONDS,
+    metrics.REPORT_STORE_COMPUTE_SECONDS,
+    metrics.REPORT_SQL_QUERIES,
+]
+
+
+class ReportWorker:
+    """
+    Claims and runs queued reports with bounded concurrency until stop() is called.
+    """
+
+    def __init__(self, concurrency: int = REPORT_WORKER_CONCURRENCY, worker_id: str = None):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._heartbeat_stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def running_report_ids(self) -> list:
+        with self._running_lock:
+            return [claim.report_id for claim in self._running]
+
+    def _run_report(self, claim: ReportClaim):
+        try:
+            generate_report_data_and_save_csv(claim.report_id, claim)
+        except Exception as e:
+            # generate_report_data_and_save_csv has already marked the report Failed
+            print(f"Worker {self.worker_id}: Report {claim.report_id} failed: {e}")
+        finally:
+            with self._running_lock:
+                self._running.discard(claim)
+            with self._metrics_lock:
+                metrics.write_metrics_textfile("report_worker", REPORT_METRICS)
+
+    def _heartbeat_loop(self):
+        while not self._heartbeat_stop_event.wait(REPORT_WORKER_HEARTBEAT_SECONDS):
+            try:
+                heartbeat_reports(self.worker_id, self.running_report_ids())
+                for report_id, new_status in requeue_stale_reports(REPORT_WORKER_STALE_SECONDS, REPORT_MAX_ATTEMPTS):
+                    print(f"Worker {self.worker_id}: Report {report_id} had no heartbeat for {REPORT_WORKER_STALE_SECONDS}s. Status set to '{new_status}'.")
+            except Exception as e:
+                # the next beat retries; reports only go stale after REPORT_WORKER_STALE_SECONDS
+                print(f"Worker {self.worker_id}: Warning: Heartbeat failed: {e}")
+
+    def run(self, exit_when_idle: bool = False):
+        """
+        Claims reports while fewer than `concurrency` run, polling every REPORT_WORKER_POLL_SECONDS
+        when the queue is empty.
+        exit_when_idle: Return once the queue is empty and no report is running.
+        """
+        with engine.begin() as conn:
+            ensure_report_schema(conn)
+        for report_id, new_status in requeue_stale_reports(REPORT_WORKER_STALE_SECONDS, REPORT_MAX_ATTEMPTS):
+            print(f"Worker {self.worker_id}: Report {report_id} was abandoned by its worker. Status set to '{new_status}'.")
+
+        print(f"Worker {self.worker_id}: Started with concurrency {self.concurrency}.")
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="report-heartbeat", daemon=True)
+        heartbeat_thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="report") as executor:
+                while not self._stop_event.is_set():
+                    claim = None
+                    if len(self.running_report_ids()) < self.concurrency:
+                        try:
+                            claim = claim_next_report(self.worker_id)
+                        except Exception as e:
+                            print(f"Worker {self.worker_id}: Warning: Could not claim a report: {e}")
+
+                    if claim is None:
+                        if exit_when_idle and not self.running_report_ids():
+                            break
+                        self._stop_event.wait(REPORT_WORKER_POLL_SECONDS)
+                        continue
+
+                    print(f"Worker {self.worker_id}: Claimed report {claim.report_id} (attempt {claim.attempt}).")
+                    with self._running_lock:
+                        self._running.add(claim)
+                    executor.submit(self._run_report, claim)
+
+                if self.running_report_ids():
+                    print(f"Worker {self.worker_id}: Stopping. Waiting for {len(self.running_report_ids())} running report(s).")
+        finally:
+            self._heartbeat_stop_event.set()
+            heartbeat_thread.join()
+        print(f"Worker {self.worker_id}: Stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued reports.")
+    parser.add_argument("--concurrency", type=int, default=REPORT_WORKER_CONCURRENCY, help="Reports run at once.")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Exit once the queue is empty.")
+    args = parser.parse_args()
+
+    if REPORT_EXECUTOR != "worker":
+        # the API runs reports itself; a worker would claim the same Pending rows
+        print(f"REPORT_EXECUTOR is '{REPORT_EXECUTOR}', not 'worker'. Report worker not started.")
+        return
+
+    worker = ReportWorker(concurrency=args.concurrency)
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: worker.stop())
+    worker.run(exit_when_idle=args.exit_when_idle)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Shared fixtures for the report engine tests.
+
+A small synthetic fleet covers the cases every engine has to agree on: default and explicit
+hours, overnight and overlapping shifts, a DST change inside the weekly window, polls on
+window and business-hour boundaries, unknown statuses, stores without polls and unknown
+timezones. The SQLAlchemy engines run against a throwaway SQLite database; set
+TEST_POSTGRES_URL to also run the Postgres-only SQL engine.
+"""
+import os
+import random
+import tempfile
+
+from datetime import datetime, timedelta, timezone, time
+
+_TEST_DIR = tempfile.mkdtemp(prefix="store-monitoring-tests-")
+# Before any app import: app/database/db.py builds its engine from DATABASE_URL at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TEST_DIR, 'store_monitoring.db')}"
+os.environ["METRICS_DIR"] = os.path.join(_TEST_DIR, "metrics")
+os.environ["INCREMENTAL_STATE_PATH"] = os.path.join(_TEST_DIR, "incremental_report_state.pkl")
+
+import pytest
+
+from app.database.db import engine, Base, Session
+from app.database.models import Store, Store_Status, Menu_Hours, Timezone
+
+from business import generate_report
+from business.status_series import StatusSeries
+from business.report_rows import _get_reporting_periods, _build_report_row
+
+
+# Spans the US spring-forward night (2023-03-12) in the weekly window
+REPORT_END_UTC = datetime(2023, 3, 13, 12, 0, tzinfo=timezone.utc)
+LATEST_POLL_UTC = REPORT_END_UTC - timedelta(seconds=30)
+FIRST_POLL_UTC = REPORT_END_UTC - timedelta(days=9)
+
+EVERY_DAY = range(7)
+
+# store_id -> (timezone_str or None, {day_of_week: [(start, end), ...]}, poll kind)
+FLEET_STORES = {
+    "s01_default": (None, {}, "random"),
+    "s02_office": ("America/New_York", {day: [(time(9), time(17))] for day in range(5)}, "random"),
+    "s03_overnight": ("America/Denver", {day: [(time(22), time(2))] for day in EVERY_DAY}, "random"),
+    "s04_dst_gap": ("America/Chicago", {day: [(time(1, 30), time(3, 30)), (time(2, 15), time(2, 45))] for day in EVERY_DAY}, "random"),
+    "s05_split": ("Asia/Kolkata", {day: [(time(8), time(11)), (time(10, 30), time(14)), (time(14), time(15))] for day in EVERY_DAY}, "random"),
+    "s06_no_polls": ("America/Chicago", {day: [(time(10), time(20))] for day in EVERY_DAY}, "none"),
+    "s07_unknown_status": ("Europe/London", {day: [(time(6), time(23))] for day in EVERY_DAY}, "unknown"),
+    "s08_boundaries": ("UTC", {day: [(time(11), time(11, 30)), (time(11, 30), time(12))] for day in EVERY_DAY}, "boundaries"),
+    "s09_stale": ("America/Los_Angeles", {}, "stale"),
+    "s10_bad_timezone": ("Not/AZone", {day: [(time(7), time(19))] for day in EVERY_DAY}, "random"),
+    "s11_nearly_all_day": ("America/Los_Angeles", {day: [(time(0), time(23, 59, 59))] for day in EVERY_DAY}, "random"),
+    "s12_midnight_end": ("America/Chicago", {day: [(time(18), time(0))] for day in (0, 2, 4, 6)}, "random"),
+}
+
+
+def _random_polls(rng: random.Random, unknown_share: float = 0.0) -> list:
+    polls = []
+    at = FIRST_POLL_UTC + timedelta(seconds=rng.randrange(3600))
+    status = True
+    while at <= LATEST_POLL_UTC:
+        if rng.random() < 0.25:
+            status = not status
+        polls.append((at, None if rng.random() < unknown_share else status))
+        # Mostly hourly-ish polls, with some long outages of the poller
+        gap_seconds = rng.randrange(20 * 60, 90 * 60) if rng.random() > 0.08 else rng.randrange(6 * 3600, 30 * 3600)
+        at += timedelta(seconds=gap_seconds)
+    return polls
+
+def _boundary_polls() -> list:
+    # Polls exactly on window starts, on business-hour edges and on the latest poll
+    polls = [(FIRST_POLL_UTC, True)]
+    for period in _get_reporting_periods(REPORT_END_UTC):
+        polls.append((period['start_utc'] - timedelta(seconds=1), False))
+        polls.append((period['start_utc'], True))
+    for days_back in range(8):
+        day_utc = (REPORT_END_UTC - timedelta(days=days_back)).replace(hour=0)
+        polls.append((day_utc + timedelta(hours=11), days_back % 2 == 0))
+        polls.append((day_utc + timedelta(hours=11, minutes=30), days_back % 3 == 0))
+        polls.append((day_utc + timedelta(hours=12), True))
+    polls.append((LATEST_POLL_UTC, False))
+    return sorted({at: status for at, status in polls if at <= LATEST_POLL_UTC}.items())
+
+def build_fleet_polls(seed: int = 15) -> dict:
+    """
+    Returns: Dict store_id -> sorted list of (timestamp_utc, status) for stores with polls.
+    """
+    rng = random.Random(seed)
+    polls_by_store = {}
+    for store_id, (_, _, poll_kind) in FLEET_STORES.items():
+        if poll_kind == "random":
+            polls_by_store[store_id] = _random_polls(rng)
+        elif poll_kind == "unknown":
+            polls_by_store[store_id] = _random_polls(rng, unknown_share=0.3)
+        elif poll_kind == "boundaries":
+            polls_by_store[store_id] = _boundary_polls()
+        elif poll_kind == "stale":
+            polls_by_store[store_id] = [(FIRST_POLL_UTC + timedelta(hours=hour), hour % 2 == 0) for hour in range(12)]
+    # Every fleet ends on the same latest poll, so every engine derives the same report end
+    polls_by_store["s01_default"] = [poll for poll in polls_by_store["s01_default"] if poll[0] < LATEST_POLL_UTC] + [(LATEST_POLL_UTC, True)]
+    return polls_by_store
+
+def load_fleet(db, polls_by_store: dict, store_ids=FLEET_STORES):
+    """
+    Inserts the fleet's stores, timezones, menu hours and polls through an ORM session.
+    """
+    for store_id in store_ids:
+        timezone_str, hours, _ = FLEET_STORES[store_id]
+        db.add(Store(store_id=store_id))
+        if timezone_str is not None:
+            db.add(Timezone(store_id=store_id, timezone_str=timezone_str))
+        for day_of_week, day_hours in hours.items():
+            for start_time_local, end_time_local in day_hours:
+                db.add(Menu_Hours(store_id=store_id, day_of_week=day_of_week, start_time_local=start_time_local, end_time_local=end_time_local))
+        for timestamp_utc, status in polls_by_store.get(store_id, []):
+            db.add(Store_Status(store_id=store_id, timestamp_utc=timestamp_utc, status=status))
+    db.commit()
+
+def reference_window_minutes(polls: list, store_details: tuple, window_start_utc: datetime, window_end_utc: datetime) -> tuple:
+    """
+    Uptime/downtime of one store and window from the original per-interval Python loop.
+    """
+    timezone_obj, menu_hours_data = store_details
+    relevant_polls = [poll for poll in polls if poll[0] < window_start_utc][-1:]
+    relevant_polls += [poll for poll in polls if window_start_utc <= poll[0] < window_end_utc]
+    status_series = StatusSeries.from_rows(_PollRow(timestamp_utc, status) for timestamp_utc, status in relevant_polls)
+    previous_kernel = generate_report.UPTIME_KERNEL
+    generate_report.UPTIME_KERNEL = "python"
+    try:
+        return generate_report._calculate_uptime_downtime_from_status_data(
+            status_series, timezone_obj, menu_hours_data, window_start_utc, window_end_utc
+        )
+    finally:
+        generate_report.UPTIME_KERNEL = previous_kernel
+
+class _PollRow:
+    __slots__ = ("timestamp_utc", "status")
+
+    def __init__(self, timestamp_utc, status):
+        self.timestamp_utc = timestamp_utc
+        self.status = status
+
+
+@pytest.fixture(scope="session")
+def fleet_polls():
+    return build_fleet_polls()
+
+@pytest.fixture(scope="session")
+def fleet_db(fleet_polls):
+    """
+    SQLite database holding the fleet; tests that write to it use their own store ids or tables.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = Session()
+    try:
+        load_fleet(db, fleet_polls)
+    finally:
+        db.close()
+    return engine
+
+@pytest.fixture
+def db(fleet_db):
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture(scope="session")
+def store_ids():
+    return sorted(FLEET_STORES)
+
+@pytest.fixture(scope="session")
+def store_details(fleet_db, store_ids):
+    session = Session()
+    try:
+        return generate_report._get_all_store_details(session, store_ids)
+    finally:
+        session.close()
+
+@pytest.fixture(scope="session")
+def reference_rows(fleet_polls, store_details, store_ids):
+    """
+    Report rows from the original per-interval loop, one window at a time.
+    """
+    reporting_periods = _get_reporting_periods(REPORT_END_UTC)
+    return [
+        _build_report_row(store_id, reporting_periods, [
+            reference_window_minutes(fleet_polls.get(store_id, []), store_details[store_id], period['start_utc'], period['end_utc'])
+            for period in reporting_periods
+        ])
+        for store_id in store_ids
+    ]
+
+@pytest.fixture(scope="session")
+def bulk_rows(fleet_db, store_ids):
+    """
+    Report rows of the default bulk engine with the NumPy kernel, the reference for the
+    engines that work in integer microseconds (rounded identically).
+    """
+    session = Session()
+    try:
+        return list(generate_report._iter_report_rows(session, "test", store_ids, REPORT_END_UTC))
+    finally:
+        session.close()
+
+
+def assert_rows_match(rows: list, expected_rows: list, tolerance: float = 0.0):
+    assert [row["store_id"] for row in rows] == [row["store_id"] for row in expected_rows]
+    for row, expected_row in zip(rows, expected_rows):
+        assert row.keys() == expected_row.keys()
+        for column, expected in expected_row.items():
+            if column == "store_id":
+                continue
+            assert row[column] == pytest.approx(expected, abs=tolerance), f"{row['store_id']} {column}"
@@ -0,0 +1,63 @@
+"""
+The memoized business-interval cache returns what the uncached builder does, and counts its
+hits and misses per thread.
+"""
+import threading
+
+from datetime import time, timedelta
+
+from business import generate_report
+from business.timezones import get_timezone
+
+from conftest import REPORT_END_UTC
+
+
+WEEK_START_UTC = REPORT_END_UTC - timedelta(days=7)
+
+
+def test_cached_intervals_match_uncached_builder(store_details, store_ids):
+    for store_id in store_ids:
+        timezone_obj, menu_hours_data = store_details[store_id]
+        intervals, bh_starts, bh_ends = generate_report._get_cached_utc_business_intervals(
+            timezone_obj.key, generate_report._schedule_signature(menu_hours_data), WEEK_START_UTC, REPORT_END_UTC
+        )
+        assert list(intervals) == generate_report._get_all_utc_business_intervals_for_period(
+            timezone_obj, menu_hours_data, WEEK_START_UTC, REPORT_END_UTC
+        ), store_id
+        assert len(bh_starts) == len(bh_ends) == len(intervals)
+
+def test_stores_sharing_a_schedule_share_one_cache_entry():
+    generate_report._build_cached_utc_business_intervals.cache_clear()
+    stats_before = generate_report._business_interval_cache_stats()
+    zone = get_timezone("America/Chicago")
+    first = {day: [{'start_time_local': time(9), 'end_time_local': time(12)}, {'start_time_local': time(13), 'end_time_local': time(18)}] for day in range(7)}
+    # Same schedule, intervals listed in another order
+    second = {day: list(reversed(hours)) for day, hours in first.items()}
+
+    for menu_hours_data in (first, second):
+        generate_report._get_cached_utc_business_intervals(
+            zone.key, generate_report._schedule_signature(menu_hours_data), WEEK_START_UTC, REPORT_END_UTC
+        )
+    stats_after = generate_report._business_interval_cache_stats()
+    assert {key: stats_after[key] - stats_before[key] for key in stats_after} == {"hits": 1, "misses": 1}
+
+def test_cache_stats_leave_out_other_threads():
+    signature = generate_report._schedule_signature({day: [{'start_time_local': time(2), 'end_time_local': time(3)}] for day in range(7)})
+    stats_before = generate_report._business_interval_cache_stats()
+
+    # another report running in a worker thread meanwhile
+    other_thread = threading.Thread(target=generate_report._get_cached_utc_business_intervals, args=("UTC", signature, WEEK_START_UTC, REPORT_END_UTC))
+    other_thread.start()
+    other_thread.join()
+    assert generate_report._business_interval_cache_stats() == stats_before
+
+    generate_report._get_cached_utc_business_intervals("UTC", signature, WEEK_START_UTC, REPORT_END_UTC)
+    stats_after = generate_report._business_interval_cache_stats()
+    assert {key: stats_after[key] - stats_before[key] for key in stats_after} == {"hits": 1, "misses": 0}
+
+def test_cached_arrays_are_read_only():
+    _, bh_starts, bh_ends = generate_report._get_cached_utc_business_intervals(
+        "UTC", generate_report._schedule_signature({day: [{'start_time_local': time(0), 'end_time_local': time(1)}] for day in range(7)}),
+        WEEK_START_UTC, REPORT_END_UTC
+    )
+    assert not bh_starts.flags.writeable and not bh_ends.flags.writeable
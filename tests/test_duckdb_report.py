@@ -0,0 +1,42 @@
+"""
+Parity of the embedded DuckDB engine with the bulk engine.
+"""
+import pytest
+
+from business.duckdb_report import SCHEMA_SQL, get_duckdb_report_inputs, compute_duckdb_report_rows
+
+from conftest import REPORT_END_UTC, LATEST_POLL_UTC, FLEET_STORES, assert_rows_match
+
+
+duckdb = pytest.importorskip("duckdb")
+
+
+@pytest.fixture(scope="module")
+def con(fleet_polls):
+    con = duckdb.connect()
+    con.execute(SCHEMA_SQL)
+    con.executemany("INSERT INTO stores VALUES (?)", [[store_id] for store_id in FLEET_STORES])
+    con.executemany("INSERT INTO store_status VALUES (?, ?, ?)", [
+        [store_id, status, timestamp_utc] for store_id, polls in fleet_polls.items() for timestamp_utc, status in polls
+    ])
+    con.executemany("INSERT INTO menu_hours VALUES (?, ?, ?, ?)", [
+        [store_id, day_of_week, start_time_local, end_time_local]
+        for store_id, (_, hours, _) in FLEET_STORES.items()
+        for day_of_week, day_hours in hours.items()
+        for start_time_local, end_time_local in day_hours
+    ])
+    con.executemany("INSERT INTO timezones VALUES (?, ?)", [
+        [store_id, timezone_str] for store_id, (timezone_str, _, _) in FLEET_STORES.items() if timezone_str is not None
+    ])
+    try:
+        yield con
+    finally:
+        con.close()
+
+
+def test_duckdb_report_inputs(con, store_ids):
+    assert get_duckdb_report_inputs(con) == (LATEST_POLL_UTC, store_ids)
+
+def test_duckdb_engine_matches_bulk_engine(con, store_ids, bulk_rows):
+    rows = compute_duckdb_report_rows(con, "test", store_ids, REPORT_END_UTC)
+    assert_rows_match(rows, bulk_rows)
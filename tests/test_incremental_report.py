@@ -0,0 +1,121 @@
+"""
+Parity of the incremental engine with the bulk engine as polls arrive between runs, and the
+lock that serializes runs over the state file.
+"""
+import os
+import fcntl
+import threading
+import pytest
+
+from datetime import time, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.models import Store_Status, Status_Load, Menu_Hours
+
+from business import generate_report, incremental_report
+from business.incremental_report import compute_incremental_report_rows
+
+from conftest import REPORT_END_UTC, load_fleet, assert_rows_match
+
+
+@pytest.fixture
+def incremental_db(tmp_path):
+    # Own database: these tests add polls and change menu hours
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'incremental.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    session = sessionmaker(bind=test_engine)()
+    if os.path.exists(incremental_report.INCREMENTAL_STATE_PATH):
+        os.remove(incremental_report.INCREMENTAL_STATE_PATH)
+    try:
+        yield session
+    finally:
+        session.close()
+        test_engine.dispose()
+
+def _add_polls(db, polls):
+    db.add_all(Store_Status(store_id=store_id, timestamp_utc=timestamp_utc, status=status) for store_id, timestamp_utc, status in polls)
+    # as ingestion records every load once its rows are committed
+    timestamps = [timestamp_utc for _, timestamp_utc, _ in polls]
+    db.add(Status_Load(oldest_timestamp_utc=min(timestamps), newest_timestamp_utc=max(timestamps), loaded_at=REPORT_END_UTC))
+    db.commit()
+
+def _run_and_compare(db, store_ids):
+    latest_status_utc = db.query(func.max(Store_Status.timestamp_utc)).scalar().replace(tzinfo=REPORT_END_UTC.tzinfo)
+    report_end_utc = latest_status_utc.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    store_details = generate_report._get_all_store_details(db, store_ids)
+
+    rows = compute_incremental_report_rows(db, "test", store_ids, store_details, latest_status_utc, report_end_utc)
+    expected_rows = list(generate_report._iter_report_rows(db, "test", store_ids, report_end_utc))
+    assert_rows_match(rows, expected_rows)
+
+
+def test_incremental_runs_match_bulk_engine(incremental_db, fleet_polls, store_ids):
+    first_delivery_utc = REPORT_END_UTC - timedelta(days=2, minutes=13)
+    load_fleet(incremental_db, {}, store_ids)
+    _add_polls(incremental_db, [
+        (store_id, timestamp_utc, status)
+        for store_id, polls in fleet_polls.items()
+        for timestamp_utc, status in polls if timestamp_utc <= first_delivery_utc
+    ])
+    _run_and_compare(incremental_db, store_ids)
+
+    # Later polls and changed menu hours
+    _add_polls(incremental_db, [
+        (store_id, timestamp_utc, status)
+        for store_id, polls in fleet_polls.items()
+        for timestamp_utc, status in polls if timestamp_utc > first_delivery_utc
+    ])
+    incremental_db.add(Menu_Hours(store_id="s02_office", day_of_week=5, start_time_local=time(10), end_time_local=time(14)))
+    incremental_db.commit()
+    _run_and_compare(incremental_db, store_ids)
+
+def test_incremental_run_without_new_polls_is_stable(incremental_db, fleet_polls, store_ids):
+    load_fleet(incremental_db, fleet_polls, store_ids)
+    _run_and_compare(incremental_db, store_ids)
+    _run_and_compare(incremental_db, store_ids)
+
+@pytest.mark.parametrize("late_by", [timedelta(minutes=50), timedelta(days=1, hours=3), timedelta(days=8)])
+def test_polls_behind_the_watermark_are_applied(incremental_db, fleet_polls, store_ids, late_by):
+    first_delivery_utc = REPORT_END_UTC - timedelta(days=2, minutes=13)
+    late_store = "s05_split"
+    load_fleet(incremental_db, {}, store_ids)
+    _add_polls(incremental_db, [
+        (store_id, timestamp_utc, status)
+        for store_id, polls in fleet_polls.items() if store_id != late_store
+        for timestamp_utc, status in polls if timestamp_utc <= first_delivery_utc - late_by or store_id == "s01_default"
+    ])
+    _run_and_compare(incremental_db, store_ids)
+
+    # One load that reaches back behind the watermark, e.g. chunks committed out of order
+    _add_polls(incremental_db, [
+        (store_id, timestamp_utc, status)
+        for store_id, polls in fleet_polls.items() if store_id != "s01_default"
+        for timestamp_utc, status in polls if timestamp_utc > first_delivery_utc - late_by or store_id == late_store
+    ])
+    _run_and_compare(incremental_db, store_ids)
+
+def test_runs_wait_for_the_state_file_lock(incremental_db, fleet_polls, store_ids):
+    load_fleet(incremental_db, fleet_polls, store_ids)
+    errors = []
+
+    def run_report():
+        try:
+            _run_and_compare(incremental_db, store_ids)
+        except Exception as e:
+            errors.append(e)
+
+    # another process's run: flock excludes other open file descriptions as it does other processes
+    with open(f"{incremental_report.INCREMENTAL_STATE_PATH}.lock", "ab") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        run = threading.Thread(target=run_report)
+        run.start()
+        run.join(0.5)
+        assert run.is_alive()
+        assert not os.path.exists(incremental_report.INCREMENTAL_STATE_PATH)
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    run.join()
+    assert errors == []
+    assert os.path.exists(incremental_report.INCREMENTAL_STATE_PATH)
+    assert [name for name in os.listdir(os.path.dirname(incremental_report.INCREMENTAL_STATE_PATH)) if name.endswith(".tmp")] == []
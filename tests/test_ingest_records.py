@@ -0,0 +1,143 @@
+"""
+The column-wise record builders and the COPY loader give the rows of the original iterrows
+ingestion: status mapping, timestamp parsing, time and timezone parsing, and duplicates skipped
+against uq_store_status. The COPY test needs a scratch Postgres database in TEST_POSTGRES_URL;
+its tables are dropped and recreated.
+"""
+import io
+import os
+import pytz
+import pytest
+import pandas as pd
+
+from datetime import datetime
+from sqlalchemy import create_engine, select, text
+
+from app.database.db import Base
+from app.database.models import Store_Status
+from app.database.ingestors import store_status
+from app.database.ingestors.store_status import STORE_STATUS_CSV_DTYPES, _prepare_status_frame, build_status_records
+from app.database.ingestors.menu_hours import build_menu_hours_records
+from app.database.ingestors.timezones import build_timezone_records
+from app.services import conflict
+from app.services.conflict import _get_insert_statement_on_conflict
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+STORE_STATUS_CSV = """store_id,status,timestamp_utc
+s01,active,2023-01-22 12:09:39.388884 UTC
+s01,inactive,2023-01-22 13:09:39.388884 UTC
+s01,active,2023-01-22 13:09:39.388884 UTC
+s02,Active,2023-01-24 09:06:42 UTC
+s02,INACTIVE,2023-01-24 10:06:42.1 UTC
+s02,,2023-01-24 11:06:42.000001 UTC
+,active,2023-01-24 12:06:42.5 UTC
+s03,active,
+s03,unknown,2023-01-25 00:00:00.000000 UTC
+1234567,active,2023-01-25 01:00:00.000000 UTC
+"""
+
+MENU_HOURS_CSV = """store_id,dayOfWeek,start_time_local,end_time_local
+s01,0,00:00:00,23:59:59
+s01,6,22:30:00,02:15:30
+1234567,3,09:00:00,17:00:00
+"""
+
+TIMEZONES_CSV = """store_id,timezone_str
+s01,America/Chicago
+s02,Not/AZone
+s03,Asia/Kolkata
+1234567,UTC
+"""
+
+
+def _reference_status_records(csv_text: str) -> list:
+    # The original ingest_store_status/ingest_batch, timestamps parsed one by one
+    df = pd.read_csv(io.StringIO(csv_text))
+    df['timestamp_utc'] = df['timestamp_utc'].apply(lambda x: pd.to_datetime(x, utc=True))
+    df.dropna(subset=['store_id', 'status', 'timestamp_utc'], inplace=True)
+    df['status'] = df['status'].apply(lambda x: True if str(x).lower() == 'active' else False)
+    return [
+        {'store_id': str(row['store_id']), 'timestamp_utc': row['timestamp_utc'], 'status': row['status']}
+        for _, row in df.iterrows()
+    ]
+
+def _status_records(csv_text: str) -> list:
+    chunk = pd.read_csv(io.StringIO(csv_text), dtype=STORE_STATUS_CSV_DTYPES, usecols=list(STORE_STATUS_CSV_DTYPES))
+    return build_status_records(_prepare_status_frame(chunk))
+
+
+def test_status_records_match_iterrows_path():
+    records = _status_records(STORE_STATUS_CSV)
+    assert records == _reference_status_records(STORE_STATUS_CSV)
+    assert len(records) == 7
+
+def test_menu_hours_records_match_iterrows_path():
+    df = pd.read_csv(io.StringIO(MENU_HOURS_CSV)).rename(columns={'dayOfWeek': 'day_of_week'})
+    expected = [
+        {
+            'store_id': str(record['store_id']),
+            'day_of_week': int(record['day_of_week']),
+            'start_time_local': datetime.strptime(record['start_time_local'], '%H:%M:%S').time(),
+            'end_time_local': datetime.strptime(record['end_time_local'], '%H:%M:%S').time(),
+        }
+        for _, record in df.iterrows()
+    ]
+    assert build_menu_hours_records(df) == expected
+
+def test_timezone_records_match_iterrows_path():
+    df = pd.read_csv(io.StringIO(TIMEZONES_CSV))
+    expected = []
+    for _, record in df.iterrows():
+        try:
+            pytz.timezone(record['timezone_str'])
+            expected.append({'store_id': str(record['store_id']), 'timezone_str': record['timezone_str']})
+        except pytz.UnknownTimeZoneError:
+            pass
+    assert build_timezone_records(df) == expected
+
+
+@pytest.fixture(scope="module")
+def postgres_engine():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    test_engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    try:
+        yield test_engine
+    finally:
+        Base.metadata.drop_all(bind=test_engine)
+        test_engine.dispose()
+
+# Already loaded: the CSV's s01 poll at 12:09 comes again with another status
+EXISTING_ROWS = [{'store_id': 's01', 'timestamp_utc': pd.Timestamp('2023-01-22 12:09:39.388884', tz='UTC'), 'status': False}]
+
+def _load_and_read(test_engine, load) -> list:
+    with test_engine.begin() as conn:
+        conn.execute(text("DELETE FROM store_status"))
+        conn.execute(Store_Status.__table__.insert(), EXISTING_ROWS)
+    load()
+    with test_engine.connect() as conn:
+        return sorted(conn.execute(select(Store_Status.store_id, Store_Status.timestamp_utc, Store_Status.status)).all())
+
+@pytest.mark.parametrize("loader", ["copy", "insert"])
+def test_loaders_match_iterrows_path(postgres_engine, monkeypatch, loader):
+    monkeypatch.setattr(store_status, "engine", postgres_engine)
+    monkeypatch.setattr(conflict, "engine", postgres_engine)
+    monkeypatch.setattr(store_status, "STORE_STATUS_LOADER", loader)
+
+    def load_reference():
+        records = _reference_status_records(STORE_STATUS_CSV)
+        with postgres_engine.begin() as conn:
+            conn.execute(_get_insert_statement_on_conflict(Store_Status.__table__, records, ['store_id', 'timestamp_utc']))
+
+    def load_chunk():
+        chunk = pd.read_csv(io.StringIO(STORE_STATUS_CSV), dtype=STORE_STATUS_CSV_DTYPES, usecols=list(STORE_STATUS_CSV_DTYPES))
+        assert store_status.ingest_batch(_prepare_status_frame(chunk))
+
+    expected_rows = _load_and_read(postgres_engine, load_reference)
+    assert len(expected_rows) == 6
+    assert ('s01', EXISTING_ROWS[0]['timestamp_utc'], False) in expected_rows
+    assert _load_and_read(postgres_engine, load_chunk) == expected_rows
@@ -0,0 +1,72 @@
+"""
+The ingestion dependency graph: tasks start once their dependencies finished, independent ones
+concurrently, and failures (also those raised in the spawn pool) reach the caller.
+"""
+import operator
+import threading
+import pytest
+
+from business.ingest_scheduler import IngestionTask, run_ingestion_tasks, ingest_process_pool, call_in_pool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ingest_process_pool(2) as executor:
+        yield executor
+
+
+def test_tasks_run_after_their_dependencies(pool):
+    events = []
+    events_lock = threading.Lock()
+    # only passes if both explicit loads run at the same time
+    explicit_loads = threading.Barrier(2, timeout=10)
+
+    def task(name, result=None, concurrent=False):
+        def run(results):
+            with events_lock:
+                events.append(("start", name))
+            if concurrent:
+                explicit_loads.wait()
+            with events_lock:
+                events.append(("end", name))
+            return result if result is not None else sorted(results)
+        return run
+
+    results = run_ingestion_tasks([
+        IngestionTask("store_status", task("store_status", concurrent=True), ()),
+        IngestionTask("menu_hours_explicit", task("menu_hours_explicit", concurrent=True), ()),
+        IngestionTask("stores", task("stores"), ("store_status", "menu_hours_explicit")),
+        IngestionTask("pooled", lambda results: call_in_pool(pool, operator.add, 2, 3), ("stores",)),
+        IngestionTask("store_status_hourly", task("store_status_hourly"), ("stores", "pooled")),
+    ])
+
+    assert results["stores"] == ["menu_hours_explicit", "store_status"]
+    assert results["pooled"] == 5
+    assert results["store_status_hourly"] == ["pooled", "stores"]
+    for name, dependencies in (("stores", ("store_status", "menu_hours_explicit")), ("store_status_hourly", ("stores",))):
+        for dependency in dependencies:
+            assert events.index(("end", dependency)) < events.index(("start", name))
+
+def test_pool_failures_skip_dependents_and_reach_the_caller(pool):
+    ran = []
+
+    def record(name):
+        def run(results):
+            ran.append(name)
+        return run
+
+    with pytest.raises(ZeroDivisionError):
+        run_ingestion_tasks([
+            IngestionTask("store_status", record("store_status"), ()),
+            IngestionTask("menu_hours_explicit", lambda results: call_in_pool(pool, operator.truediv, 1, 0), ()),
+            IngestionTask("stores", record("stores"), ("store_status", "menu_hours_explicit")),
+            IngestionTask("timezones_explicit", record("timezones_explicit"), ()),
+        ])
+    assert sorted(ran) == ["store_status", "timezones_explicit"]
+
+def test_dependencies_must_be_listed_first():
+    with pytest.raises(ValueError):
+        run_ingestion_tasks([
+            IngestionTask("stores", lambda results: None, ("store_status",)),
+            IngestionTask("store_status", lambda results: None, ()),
+        ])
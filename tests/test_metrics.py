@@ -0,0 +1,48 @@
+"""
+/metrics merges the textfiles of other processes with this process's families.
+"""
+import os
+import pytest
+
+from app.services import metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    return tmp_path
+
+def _write_textfile(metrics_dir, name: str, registry: list):
+    with open(os.path.join(metrics_dir, f"{name}.prom"), "w") as f:
+        f.write(metrics._render_families(registry))
+
+
+def test_textfile_samples_are_merged_with_live_ones(metrics_dir, monkeypatch):
+    live = metrics.Counter("reports_total", "Reports finished, by engine and final status.", ("engine", "status"))
+    live.inc(2, "bulk", "Completed")
+    monkeypatch.setattr(metrics, "REGISTRY", [live])
+
+    worker = metrics.Counter("reports_total", "Reports finished, by engine and final status.", ("engine", "status"))
+    worker.inc(5, "bulk", "Completed")
+    ingestion = metrics.Histogram("ingest_batch_insert_seconds", "Latency of one batch insert, by table.", (0.1, 1.0), ("table",))
+    ingestion.observe(0.5, "stores")
+    queries = metrics.Counter("sql_queries_total", "SQL statements executed.")
+    queries.inc(3)
+    _write_textfile(metrics_dir, "report_worker", [worker, queries])
+    _write_textfile(metrics_dir, "ingestion", [ingestion, queries])
+
+    lines = metrics.render_metrics().splitlines()
+    type_lines = [line for line in lines if line.startswith("# TYPE ")]
+    assert len(type_lines) == len(set(type_lines)) == 3
+    assert 'store_monitoring_reports_total{engine="bulk",status="Completed"} 2' in lines
+    assert 'store_monitoring_reports_total{engine="bulk",status="Completed",source="report_worker"} 5' in lines
+    assert 'store_monitoring_sql_queries_total{source="ingestion"} 3' in lines
+    assert 'store_monitoring_sql_queries_total{source="report_worker"} 3' in lines
+    assert 'store_monitoring_ingest_batch_insert_seconds_bucket{table="stores",le="1",source="ingestion"} 1' in lines
+    # every sample follows its own family's TYPE line
+    family = None
+    for line in lines:
+        if line.startswith("# TYPE "):
+            family = line.split()[2]
+        elif not line.startswith("#"):
+            assert line.startswith(family), line
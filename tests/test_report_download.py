@@ -0,0 +1,114 @@
+"""
+Downloads of a finished report through GET /get_report/{report_id}: content-coding negotiation,
+ETag validation, the Parquet variant and Range requests. The API runs on the test SQLite database,
+its routes through ThreadedSession. Needs httpx for the TestClient.
+"""
+import gzip
+import pytest
+
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.database.models import Report
+
+
+REPORT_CSV = (
+    "store_id,uptime_last_hour(minutes),downtime_last_hour(minutes)\n"
+    "s01_default,60.0,0.0\n"
+    "s02_office,45.5,14.5\n"
+    "s03_overnight,0.0,0.0\n"
+).encode()
+
+
+@pytest.fixture
+def report_id(db, tmp_path):
+    report_filepath = tmp_path / "report.csv"
+    report_filepath.write_bytes(REPORT_CSV)
+    report_entry = Report(status="Completed", report_file_path=str(report_filepath))
+    db.add(report_entry)
+    db.commit()
+    try:
+        yield report_entry.report_id
+    finally:
+        db.delete(report_entry)
+        db.commit()
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+def _download(client, report_id: str, accept_encoding: str = "identity", **kwargs):
+    headers = {"Accept-Encoding": accept_encoding, **kwargs.pop("headers", {})}
+    return client.get(f"/get_report/{report_id}", headers=headers, **kwargs)
+
+
+def test_plain_csv_without_gzip(client, report_id):
+    response = _download(client, report_id)
+    assert response.status_code == 200
+    assert response.content == REPORT_CSV
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].startswith('"csv-')
+
+@pytest.mark.parametrize("accept_encoding,encoded", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("*", True),
+    ("gzip;q=0, *", False),
+    ("deflate", False),
+])
+def test_gzip_follows_accept_encoding(client, report_id, accept_encoding, encoded):
+    # raw bytes: httpx would otherwise decode the body
+    with client.stream("GET", f"/get_report/{report_id}", headers={"Accept-Encoding": accept_encoding}) as response:
+        body = b"".join(response.iter_raw())
+    assert response.status_code == 200
+    if encoded:
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"].startswith('"csv.gz-')
+        assert gzip.decompress(body) == REPORT_CSV
+    else:
+        assert "content-encoding" not in response.headers
+        assert body == REPORT_CSV
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+def test_matching_etag_is_not_modified(client, report_id, accept_encoding):
+    etag = _download(client, report_id, accept_encoding).headers["etag"]
+
+    response = _download(client, report_id, accept_encoding, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # the other coding has another ETag
+    other_encoding = "gzip" if accept_encoding == "identity" else "identity"
+    assert _download(client, report_id, other_encoding, headers={"If-None-Match": etag}).status_code == 200
+
+def test_parquet_variant(client, report_id, tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    response = _download(client, report_id, params={"format": "parquet"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    assert "vary" not in response.headers
+
+    parquet_path = tmp_path / "download.parquet"
+    parquet_path.write_bytes(response.content)
+    con = duckdb.connect()
+    try:
+        rows = con.execute("SELECT * FROM read_parquet(?) ORDER BY store_id", [str(parquet_path)]).fetchall()
+    finally:
+        con.close()
+    assert rows == [("s01_default", 60.0, 0.0), ("s02_office", 45.5, 14.5), ("s03_overnight", 0.0, 0.0)]
+
+def test_range_request(client, report_id):
+    response = _download(client, report_id, headers={"Range": "bytes=9-20"})
+    assert response.status_code == 206
+    assert response.content == REPORT_CSV[9:21]
+    assert response.headers["content-range"] == f"bytes 9-20/{len(REPORT_CSV)}"
+
+    # If-Range with a stale ETag: the whole file
+    response = _download(client, report_id, headers={"Range": "bytes=9-20", "If-Range": '"csv-0-0"'})
+    assert response.status_code == 200
+    assert response.content == REPORT_CSV
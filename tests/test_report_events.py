@@ -0,0 +1,114 @@
+"""
+Status pushes of a pending report through the API: the ?wait= long-poll, cut to
+REPORT_MAX_WAIT_SECONDS, and the Server-Sent Events stream ending after the terminal status. On
+the SQLite test database waiters poll every REPORT_EVENTS_FALLBACK_POLL_SECONDS. Needs httpx
+for the TestClient.
+"""
+import json
+import time
+import threading
+import pytest
+
+pytest.importorskip("httpx")
+
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.main import app
+from app.api import routes
+from app.database.db import Session
+from app.database.models import Report
+from app.services import report_events
+
+
+@pytest.fixture
+def report_id(db, monkeypatch):
+    monkeypatch.setattr(report_events, "REPORT_EVENTS_FALLBACK_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(routes, "REPORT_SSE_KEEPALIVE_SECONDS", 0.05)
+    report_entry = Report(status="Pending")
+    db.add(report_entry)
+    db.commit()
+    try:
+        yield report_entry.report_id
+    finally:
+        db.delete(report_entry)
+        db.commit()
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+def _update_later(report_id: str, changes: list) -> threading.Thread:
+    """
+    Applies each (delay seconds, values) to the report from another thread, as a report run would.
+    """
+    def run():
+        for delay, values in changes:
+            time.sleep(delay)
+            db = Session()
+            try:
+                db.execute(update(Report).where(Report.report_id == report_id).values(**values))
+                db.commit()
+            finally:
+                db.close()
+    updater = threading.Thread(target=run)
+    updater.start()
+    return updater
+
+def _parse_events(stream_text: str) -> list:
+    events = []
+    for message in stream_text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_wait_is_cut_to_the_max_wait(client, report_id, monkeypatch):
+    monkeypatch.setattr(routes, "REPORT_MAX_WAIT_SECONDS", 0.3)
+    wait_start = time.monotonic()
+    response = client.get(f"/get_report/{report_id}", params={"wait": 3600})
+    waited = time.monotonic() - wait_start
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "Pending"
+    assert 0.3 <= waited < 5
+
+def test_negative_wait_is_rejected(client, report_id):
+    assert client.get(f"/get_report/{report_id}", params={"wait": -1}).status_code == 422
+
+def test_wait_returns_on_status_change(client, report_id):
+    updater = _update_later(report_id, [(0.2, {"status": "Running"})])
+    response = client.get(f"/get_report/{report_id}", params={"wait": 30})
+    updater.join()
+    assert response.json()["status"] == "Running"
+
+def test_events_end_after_the_terminal_status(client, report_id):
+    started_at = datetime.now(timezone.utc)
+    updater = _update_later(report_id, [
+        (0.3, {"status": "Running", "started_at": started_at, "total_stores": 4, "stores_processed": 1, "progress_updated_at": started_at + timedelta(seconds=1)}),
+        (0.3, {"stores_processed": 3, "progress_updated_at": started_at + timedelta(seconds=2)}),
+        (0.3, {"status": "Completed", "completed_at": started_at + timedelta(seconds=3)}),
+    ])
+    # returns once the stream ended
+    response = client.get(f"/get_report/{report_id}/events")
+    updater.join()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_events(response.text)
+    assert [(event, body["status"]) for event, body in events] == [
+        ("status", "Pending"),
+        ("status", "Running"),
+        ("progress", "Running"),
+        ("status", "Completed"),
+    ]
+    assert events[2][1]["progress"]["stores_processed"] == 3
+    assert events[-1][1]["download_url"] == f"/get_report/{report_id}"
+
+def test_events_of_a_finished_report_end_at_once(client, report_id, db):
+    db.execute(update(Report).where(Report.report_id == report_id).values(status="Failed", error_message="boom"))
+    db.commit()
+    events = _parse_events(client.get(f"/get_report/{report_id}/events").text)
+    assert events == [("status", {"status": "Failed", "message": "Report generation failed: boom"})]
@@ -0,0 +1,81 @@
+"""
+Progress on the Report row: stage transitions of engines that compute every store at once are
+persisted as they happen, not only when the report is done.
+"""
+import time
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.models import Report
+
+from business import generate_report, incremental_report, report_progress, report_writer
+from business.report_progress import StageTimer, ReportProgress
+
+from conftest import load_fleet
+
+
+@pytest.fixture
+def progress_session(tmp_path, monkeypatch, fleet_polls):
+    # Own database: these tests add reports
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'progress.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    test_session = sessionmaker(bind=test_engine)
+    monkeypatch.setattr(report_progress, "engine", test_engine)
+    monkeypatch.setattr(generate_report, "Session", test_session)
+    monkeypatch.setattr(report_writer, "REPORTS_DIR", str(tmp_path))
+    monkeypatch.setattr(incremental_report, "INCREMENTAL_STATE_PATH", str(tmp_path / "incremental_report_state.pkl"))
+    db = test_session()
+    try:
+        load_fleet(db, fleet_polls)
+        yield db
+    finally:
+        db.close()
+        test_engine.dispose()
+
+def _add_report(db) -> str:
+    report_entry = Report(status="Pending")
+    db.add(report_entry)
+    db.commit()
+    return report_entry.report_id
+
+def _report(db, report_id: str) -> Report:
+    db.expire_all()
+    return db.get(Report, report_id)
+
+
+def test_stages_are_persisted_as_they_start_and_end(progress_session):
+    report_id = _add_report(progress_session)
+    progress = ReportProgress(report_id, 12, StageTimer(), interval_seconds=3600)
+    progress.update(0)
+
+    with progress.stage("compute"):
+        report_entry = _report(progress_session, report_id)
+        assert report_entry.stage_timings == {"compute": 0.0}
+        started_update_at = report_entry.progress_updated_at
+        time.sleep(0.01)
+
+    report_entry = _report(progress_session, report_id)
+    assert report_entry.stage_timings["compute"] > 0
+    assert report_entry.progress_updated_at > started_update_at
+
+def test_incremental_engine_records_stage_transitions(progress_session, monkeypatch):
+    report_id = _add_report(progress_session)
+    monkeypatch.setattr(generate_report, "REPORT_ENGINE", "incremental")
+    persisted_stages = []
+    update = ReportProgress.update
+
+    def record_update(progress, stores_processed, force=False):
+        persisted_stages.append(tuple(progress.stage_timer.seconds))
+        update(progress, stores_processed, force)
+
+    monkeypatch.setattr(ReportProgress, "update", record_update)
+    generate_report.generate_report_data_and_save_csv(report_id)
+
+    assert _report(progress_session, report_id).status == "Completed"
+    # each stage is persisted as it starts, while the report is still Running
+    assert ("db_fetch",) in persisted_stages
+    assert ("db_fetch", "compute") in persisted_stages
+    assert ("db_fetch", "compute", "write") in persisted_stages
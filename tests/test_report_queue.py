@@ -0,0 +1,153 @@
+"""
+The Postgres report queue: SKIP LOCKED claims, heartbeats, requeue of stale reports, and the
+claim guard that keeps a stale run from finalizing a requeued report. Needs a scratch Postgres
+database in TEST_POSTGRES_URL; its tables are dropped and recreated.
+"""
+import os
+import pytest
+
+from datetime import timedelta
+from sqlalchemy import create_engine, text, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.models import Report
+
+from business import generate_report, report_progress, report_queue, report_writer
+from business.report_formats import VARIANTS, report_variant_path
+from business.report_queue import enqueue_report, claim_next_report, heartbeat_reports, requeue_stale_reports
+
+from conftest import load_fleet
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def postgres_engine(fleet_polls):
+    test_engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    with test_engine.begin() as conn:
+        report_queue.ensure_report_schema(conn)
+    session = sessionmaker(bind=test_engine)()
+    try:
+        load_fleet(session, fleet_polls)
+    finally:
+        session.close()
+    try:
+        yield test_engine
+    finally:
+        Base.metadata.drop_all(bind=test_engine)
+        test_engine.dispose()
+
+@pytest.fixture
+def queue_session(postgres_engine, tmp_path, monkeypatch):
+    test_session = sessionmaker(bind=postgres_engine)
+    monkeypatch.setattr(report_queue, "engine", postgres_engine)
+    monkeypatch.setattr(report_progress, "engine", postgres_engine)
+    monkeypatch.setattr(generate_report, "Session", test_session)
+    monkeypatch.setattr(report_writer, "REPORTS_DIR", str(tmp_path))
+    with postgres_engine.begin() as conn:
+        conn.execute(text("DELETE FROM reports"))
+    db = test_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _enqueue(db, count: int) -> list:
+    report_ids = [enqueue_report(db) for _ in range(count)]
+    # claim order follows created_at
+    for age, report_id in enumerate(reversed(report_ids), start=1):
+        db.execute(update(Report).where(Report.report_id == report_id).values(created_at=Report.created_at - timedelta(minutes=age)))
+    db.commit()
+    return report_ids
+
+def _age_heartbeat(db, report_id: str, seconds: float):
+    db.execute(update(Report).where(Report.report_id == report_id).values(heartbeat_at=Report.heartbeat_at - timedelta(seconds=seconds)))
+    db.commit()
+
+def _report(db, report_id: str) -> Report:
+    db.expire_all()
+    return db.get(Report, report_id)
+
+
+def test_claims_skip_locked_reports_in_queue_order(queue_session, postgres_engine):
+    first_id, second_id = _enqueue(queue_session, 2)
+
+    # another worker's claim transaction holds the oldest row
+    with postgres_engine.connect() as locking_conn:
+        locking_conn.execute(text("SELECT 1 FROM reports WHERE report_id = :report_id FOR UPDATE"), {"report_id": first_id})
+        claim = claim_next_report("w1")
+        assert (claim.report_id, claim.worker_id, claim.attempt) == (second_id, "w1", 1)
+        locking_conn.rollback()
+
+    claim = claim_next_report("w2")
+    assert (claim.report_id, claim.attempt) == (first_id, 1)
+    assert claim_next_report("w3") is None
+    report_entry = _report(queue_session, first_id)
+    assert (report_entry.status, report_entry.worker_id, report_entry.attempts) == ("Running", "w2", 1)
+
+def test_heartbeats_refresh_only_the_claiming_worker(queue_session):
+    (report_id,) = _enqueue(queue_session, 1)
+    claim_next_report("w1")
+    _age_heartbeat(queue_session, report_id, 120)
+    aged_heartbeat = _report(queue_session, report_id).heartbeat_at
+
+    assert heartbeat_reports("w2", [report_id]) == 0
+    assert _report(queue_session, report_id).heartbeat_at == aged_heartbeat
+    assert heartbeat_reports("w1", [report_id]) == 1
+    assert _report(queue_session, report_id).heartbeat_at > aged_heartbeat
+
+def test_stale_reports_are_requeued_until_max_attempts(queue_session):
+    report_id, background_id = _enqueue(queue_session, 2)
+    # a background-task report: Running without heartbeats, never requeued
+    queue_session.execute(update(Report).where(Report.report_id == background_id).values(status="Running"))
+    queue_session.commit()
+
+    claim_next_report("w1")
+    assert requeue_stale_reports(60, 2) == []
+    _age_heartbeat(queue_session, report_id, 120)
+    assert requeue_stale_reports(60, 2) == [(report_id, "Pending")]
+    assert _report(queue_session, report_id).worker_id is None
+
+    assert claim_next_report("w2").attempt == 2
+    _age_heartbeat(queue_session, report_id, 120)
+    assert requeue_stale_reports(60, 2) == [(report_id, "Failed")]
+    report_entry = _report(queue_session, report_id)
+    assert report_entry.error_message == "Report worker stopped responding (claimed 2 times)."
+    assert _report(queue_session, background_id).status == "Running"
+
+def test_claimed_run_completes(queue_session):
+    (report_id,) = _enqueue(queue_session, 1)
+    claim = claim_next_report("w1")
+    generate_report.generate_report_data_and_save_csv(report_id, claim)
+
+    report_entry = _report(queue_session, report_id)
+    assert report_entry.status == "Completed"
+    assert report_entry.report_file_path == report_writer.report_csv_path(report_id, claim.attempt)
+    assert os.path.exists(report_entry.report_file_path)
+
+def test_stale_run_does_not_finalize_a_requeued_report(queue_session, monkeypatch):
+    (report_id,) = _enqueue(queue_session, 1)
+    stale_claim = claim_next_report("w1")
+
+    class RequeuedWhileWritingWriter(report_writer.StreamingReportWriter):
+        def commit(self):
+            # w1 missed its heartbeats meanwhile: the report was requeued and claimed by w2
+            _age_heartbeat(queue_session, report_id, 120)
+            assert requeue_stale_reports(60, 3) == [(report_id, "Pending")]
+            assert claim_next_report("w2").attempt == 2
+            super().commit()
+
+    monkeypatch.setattr(generate_report, "StreamingReportWriter", RequeuedWhileWritingWriter)
+    generate_report.generate_report_data_and_save_csv(report_id, stale_claim)
+
+    report_entry = _report(queue_session, report_id)
+    assert (report_entry.status, report_entry.worker_id, report_entry.attempts) == ("Running", "w2", 2)
+    assert report_entry.report_file_path is None
+    stale_filepath = report_writer.report_csv_path(report_id, stale_claim.attempt)
+    assert not any(os.path.exists(report_variant_path(stale_filepath, variant)) for variant in VARIANTS)
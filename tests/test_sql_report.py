@@ -0,0 +1,40 @@
+"""
+Parity of the Postgres push-down engine with the bulk engine. Needs a scratch Postgres
+database in TEST_POSTGRES_URL; its tables are dropped and recreated.
+"""
+import os
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+
+from business.sql_report import compute_sql_report_rows
+
+from conftest import REPORT_END_UTC, load_fleet, assert_rows_match
+
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def postgres_db(fleet_polls):
+    test_engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.drop_all(bind=test_engine)
+    Base.metadata.create_all(bind=test_engine)
+    session = sessionmaker(bind=test_engine)()
+    try:
+        load_fleet(session, fleet_polls)
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=test_engine)
+        test_engine.dispose()
+
+
+def test_sql_engine_matches_bulk_engine(postgres_db, store_ids, bulk_rows):
+    rows = compute_sql_report_rows(postgres_db, "test", store_ids, REPORT_END_UTC)
+    assert_rows_match(rows, bulk_rows)
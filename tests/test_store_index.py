@@ -0,0 +1,115 @@
+"""
+The in-memory store index behind GET /stores/{store_id}/uptime answers as the report does,
+picks up rows committed out of id order, and keeps only the polls its windows can reach.
+"""
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.db import Base
+from app.database.models import Store_Status, Status_Load
+from app.services import store_index
+from app.services.store_index import StoreStatusIndex, INDEX_HORIZON
+
+from business import uptime_kernel
+from business.config import STORE_INDEX_MAX_WINDOW
+
+from conftest import REPORT_END_UTC, LATEST_POLL_UTC, load_fleet
+
+
+@pytest.fixture
+def index_session(tmp_path, monkeypatch, fleet_polls):
+    # Own database: these tests add polls
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'store_index.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    test_session = sessionmaker(bind=test_engine)
+    monkeypatch.setattr(store_index, "Session", test_session)
+    db = test_session()
+    try:
+        load_fleet(db, fleet_polls)
+        yield db
+    finally:
+        db.close()
+        test_engine.dispose()
+
+
+def test_index_matches_bulk_engine(index_session, store_ids, bulk_rows):
+    index = StoreStatusIndex()
+    for expected_row in bulk_rows:
+        store_uptime = index.get_store_uptime(expected_row["store_id"])
+        assert store_uptime["end_utc"] == REPORT_END_UTC
+        assert {column: store_uptime[column] for column in expected_row} == expected_row
+
+def test_rows_committed_below_the_last_id_are_indexed_after_their_load(index_session):
+    index = StoreStatusIndex()
+    index.refresh(force=True)
+    store_id = "s06_no_polls"
+    polled_at = REPORT_END_UTC - timedelta(minutes=40)
+
+    # A lower id committed after the index has seen higher ones, as with concurrent COPY batches
+    index_session.add(Store_Status(id=-1, store_id=store_id, timestamp_utc=polled_at, status=True))
+    index_session.commit()
+    index.refresh(force=True)
+    assert store_id not in index._timestamps
+
+    index_session.add(Status_Load(oldest_timestamp_utc=polled_at, newest_timestamp_utc=polled_at, loaded_at=REPORT_END_UTC))
+    index_session.commit()
+    index.refresh(force=True)
+    assert index._timestamps[store_id].tolist() == [uptime_kernel.to_epoch_us(polled_at)]
+
+    # Re-read rows of other stores are not indexed twice
+    index.refresh(force=True)
+    for timestamps in index._timestamps.values():
+        assert (timestamps[1:] > timestamps[:-1]).all()
+
+@pytest.mark.parametrize("start_utc,end_utc", [
+    (REPORT_END_UTC, REPORT_END_UTC),
+    (REPORT_END_UTC, REPORT_END_UTC - timedelta(hours=1)),
+    (REPORT_END_UTC - STORE_INDEX_MAX_WINDOW - timedelta(seconds=1), REPORT_END_UTC),
+    (datetime(1, 1, 1, tzinfo=timezone.utc), REPORT_END_UTC),
+    (None, datetime(1, 1, 2, tzinfo=timezone.utc)),
+    # before the evicted polls
+    (LATEST_POLL_UTC - INDEX_HORIZON - timedelta(hours=1), LATEST_POLL_UTC - INDEX_HORIZON),
+])
+def test_unbounded_windows_are_rejected(index_session, start_utc, end_utc):
+    with pytest.raises(ValueError):
+        StoreStatusIndex().get_store_uptime("s01_default", start_utc, end_utc)
+
+def test_widest_window_matches_the_weekly_column(index_session, bulk_rows):
+    store_uptime = StoreStatusIndex().get_store_uptime("s01_default", REPORT_END_UTC - STORE_INDEX_MAX_WINDOW, REPORT_END_UTC)
+    expected_row = next(row for row in bulk_rows if row["store_id"] == "s01_default")
+    assert store_uptime["uptime_custom(minutes)"] / 60 == pytest.approx(expected_row["uptime_last_week(hours)"], abs=0.01)
+
+def test_polls_before_the_horizon_are_evicted(index_session, fleet_polls):
+    index = StoreStatusIndex()
+    index.refresh(force=True)
+    horizon_us = uptime_kernel.to_epoch_us(LATEST_POLL_UTC - INDEX_HORIZON)
+    for store_id, timestamps in index._timestamps.items():
+        polls_us = sorted({uptime_kernel.to_epoch_us(polled_at) for polled_at, _ in fleet_polls.get(store_id, [])})
+        # the last poll before the horizon still decides the status at the start of a window
+        kept_us = [poll_us for poll_us in polls_us if poll_us >= horizon_us]
+        before_us = [poll_us for poll_us in polls_us if poll_us < horizon_us]
+        assert timestamps.tolist() == before_us[-1:] + kept_us
+
+def test_refresh_reads_only_new_loads(index_session):
+    index = StoreStatusIndex()
+    index.refresh(force=True)
+    polled_at = REPORT_END_UTC - timedelta(minutes=40)
+    index_session.add(Status_Load(oldest_timestamp_utc=polled_at, newest_timestamp_utc=polled_at, loaded_at=REPORT_END_UTC))
+    index_session.commit()
+    index.refresh(force=True)
+    last_load_id = index._last_load_id
+    assert last_load_id > 0
+
+    statements = []
+    record_statement = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(index_session.get_bind(), "before_cursor_execute", record_statement)
+    try:
+        index.refresh(force=True)
+    finally:
+        event.remove(index_session.get_bind(), "before_cursor_execute", record_statement)
+    load_query = next(statement for statement in statements if "FROM status_loads" in statement)
+    assert "status_loads.id >" in load_query
+    assert index._last_load_id == last_load_id
@@ -0,0 +1,158 @@
+"""
+Streaming store_status.csv: line-aligned blocks, the ingestion ledger's SKIP/RESUME/FULL plans,
+and resuming a grown file from its checkpoint.
+"""
+import hashlib
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, select, func
+
+from app.database.db import Base
+from app.database.models import Store_Status, Ingestion_Ledger
+from app.database.ingestors import ledger, store_status
+from app.database.ingestors.store_status import _read_csv_blocks, ingest_store_status_csv, StoreStatusReadError
+
+HEADER = b"store_id,status,timestamp_utc\n"
+FIRST_POLL_UTC = datetime(2023, 1, 24, 9, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def ingest_engine(tmp_path, monkeypatch):
+    # Own database: the loaders and the ledger write through their module's engine
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    Base.metadata.create_all(bind=test_engine)
+    monkeypatch.setattr(store_status, "engine", test_engine)
+    monkeypatch.setattr(ledger, "engine", test_engine)
+    try:
+        yield test_engine
+    finally:
+        test_engine.dispose()
+
+def _status_lines(first: int, count: int) -> bytes:
+    lines = []
+    for index in range(first, first + count):
+        polled_at = FIRST_POLL_UTC + timedelta(minutes=17 * index)
+        lines.append(f"s{index % 7:02d},{'active' if index % 3 else 'inactive'},{polled_at:%Y-%m-%d %H:%M:%S.%f} UTC\n")
+    return "".join(lines).encode()
+
+def _write_csv(tmp_path, content: bytes):
+    csv_path = tmp_path / "store_status.csv"
+    csv_path.write_bytes(content)
+    return str(csv_path)
+
+def _loaded_rows(test_engine) -> int:
+    with test_engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Store_Status)).scalar()
+
+
+@pytest.mark.parametrize("block_bytes", [7, 64, 1 << 20])
+def test_blocks_end_at_line_breaks(tmp_path, block_bytes):
+    body = _status_lines(0, 40)
+    csv_path = _write_csv(tmp_path, HEADER + body)
+    blocks = list(_read_csv_blocks(csv_path, block_bytes, 0, hashlib.sha256()))
+
+    assert b"".join(block for _, block, _, _ in blocks) == body
+    for header, block, end_offset, content_hash in blocks:
+        assert header == HEADER
+        assert block.endswith(b"\n")
+        assert content_hash == hashlib.sha256((HEADER + body)[:end_offset]).hexdigest()
+    assert blocks[-1][2] == len(HEADER + body)
+
+def test_header_only_file_has_no_blocks(tmp_path):
+    csv_path = _write_csv(tmp_path, HEADER)
+    assert list(_read_csv_blocks(csv_path, 64, 0, hashlib.sha256())) == []
+
+def test_unterminated_last_line_is_read_but_not_checkpointed(tmp_path):
+    body = _status_lines(0, 5)
+    csv_path = _write_csv(tmp_path, HEADER + body + b"s01,active")
+    blocks = list(_read_csv_blocks(csv_path, 64, 0, hashlib.sha256()))
+    assert blocks[-1][1:] == (b"s01,active", None, None)
+    assert blocks[-2][2] == len(HEADER + body)
+
+def test_blocks_resume_at_a_byte_offset(tmp_path):
+    content = HEADER + _status_lines(0, 30)
+    resume_offset = len(HEADER + _status_lines(0, 12))
+    csv_path = _write_csv(tmp_path, content)
+    blocks = list(_read_csv_blocks(csv_path, 50, resume_offset, ledger.hash_file(csv_path, resume_offset)))
+
+    assert b"".join(block for _, block, _, _ in blocks) == content[resume_offset:]
+    assert blocks[0][0] == HEADER
+    assert blocks[-1][3] == hashlib.sha256(content).hexdigest()
+
+
+def test_plans_follow_the_checkpoint(tmp_path, ingest_engine):
+    content = HEADER + _status_lines(0, 10)
+    csv_path = _write_csv(tmp_path, content)
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.FULL
+    assert ledger.plan_ingestion(csv_path).action == ledger.FULL
+
+    ledger.save_checkpoint(csv_path, hashlib.sha256(content).hexdigest(), len(content), 10)
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.SKIP
+    assert ledger.plan_ingestion(csv_path).action == ledger.SKIP
+
+    # appended to: append-only files resume at the checkpoint, others reload in full
+    _write_csv(tmp_path, content + _status_lines(10, 3))
+    plan = ledger.plan_ingestion(csv_path, append_only=True)
+    assert (plan.action, plan.start_offset) == (ledger.RESUME, len(content))
+    assert plan.hasher.hexdigest() == hashlib.sha256(content).hexdigest()
+    assert ledger.plan_ingestion(csv_path).action == ledger.FULL
+
+    # rewritten, or truncated below the checkpoint
+    _write_csv(tmp_path, content.replace(b"s01", b"s99") + _status_lines(10, 3))
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.FULL
+    _write_csv(tmp_path, content[:len(content) // 2])
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.FULL
+
+
+def _ingest(csv_path, plan):
+    return ingest_store_status_csv(
+        csv_path,
+        chunk_rows=1,
+        workers=2,
+        start_offset=plan.start_offset,
+        hasher=plan.hasher,
+        checkpoint=plan.checkpoint if plan.action == ledger.RESUME else None,
+        on_checkpoint=lambda *state: ledger.save_checkpoint(csv_path, *state)
+    )
+
+def test_grown_file_resumes_from_its_checkpoint(tmp_path, ingest_engine):
+    content = HEADER + _status_lines(0, 25)
+    csv_path = _write_csv(tmp_path, content)
+    store_ids, oldest_utc, newest_utc = _ingest(csv_path, ledger.plan_ingestion(csv_path, append_only=True))
+    assert _loaded_rows(ingest_engine) == 25
+    assert store_ids == {f"s{index:02d}" for index in range(7)}
+    assert (oldest_utc, newest_utc) == (FIRST_POLL_UTC, FIRST_POLL_UTC + timedelta(minutes=17 * 24))
+    checkpoint = ledger.load_checkpoint(csv_path)
+    assert (checkpoint['byte_offset'], checkpoint['rows_loaded']) == (len(content), 25)
+
+    _write_csv(tmp_path, content + _status_lines(25, 8))
+    plan = ledger.plan_ingestion(csv_path, append_only=True)
+    assert plan.action == ledger.RESUME
+    _, oldest_utc, _ = _ingest(csv_path, plan)
+    # only the appended rows were read
+    assert oldest_utc == FIRST_POLL_UTC + timedelta(minutes=17 * 25)
+    assert _loaded_rows(ingest_engine) == 33
+    checkpoint = ledger.load_checkpoint(csv_path)
+    assert (checkpoint['byte_offset'], checkpoint['rows_loaded']) == (len(content + _status_lines(25, 8)), 33)
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.SKIP
+
+def test_read_error_fails_after_loading_what_was_read(tmp_path, ingest_engine, monkeypatch):
+    content = HEADER + _status_lines(0, 20)
+    csv_path = _write_csv(tmp_path, content)
+
+    def failing_blocks(*args):
+        blocks = _read_csv_blocks(*args)
+        yield next(blocks)
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+    monkeypatch.setattr(store_status, "_read_csv_blocks", failing_blocks)
+    with pytest.raises(StoreStatusReadError) as raised:
+        _ingest(csv_path, ledger.plan_ingestion(csv_path, append_only=True))
+
+    store_ids, oldest_utc, _ = raised.value.loaded
+    assert (store_ids, oldest_utc) == ({"s00"}, FIRST_POLL_UTC)
+    assert _loaded_rows(ingest_engine) == 1
+    checkpoint = ledger.load_checkpoint(csv_path)
+    assert (checkpoint['byte_offset'], checkpoint['rows_loaded']) == (len(HEADER + _status_lines(0, 1)), 1)
+    assert ledger.plan_ingestion(csv_path, append_only=True).action == ledger.RESUME
@@ -0,0 +1,117 @@
+"""
+Offset-transition tables convert exactly as per-datetime zoneinfo arithmetic does, gap and
+overlap nights included.
+"""
+import pytest
+
+from datetime import datetime, timedelta, timezone, time
+
+from business import uptime_kernel, generate_report
+from business.config import DEFAULT_TIMEZONE
+from business.timezones import (
+    get_timezone,
+    get_offset_table,
+    utc_offset_us,
+    local_to_utc_us,
+    get_local_offset_segments,
+)
+
+
+# Zones and the local dates of DST changes in them (Lord Howe shifts by 30 minutes)
+DST_NIGHTS = [
+    ("America/Chicago", datetime(2023, 3, 12)),
+    ("America/Chicago", datetime(2023, 11, 5)),
+    ("America/New_York", datetime(2023, 3, 12)),
+    ("Europe/London", datetime(2023, 3, 26)),
+    ("Europe/London", datetime(2023, 10, 29)),
+    ("Australia/Lord_Howe", datetime(2023, 4, 2)),
+    ("Australia/Lord_Howe", datetime(2023, 10, 1)),
+    ("Asia/Kolkata", datetime(2023, 3, 12)),
+]
+
+SCHEDULES = {
+    "default": {day: [{'start_time_local': time(0), 'end_time_local': time(23, 59, 59)}] for day in range(7)},
+    "inside_gap": {day: [{'start_time_local': time(1, 30), 'end_time_local': time(3, 30)}, {'start_time_local': time(2, 15), 'end_time_local': time(2, 45)}] for day in range(7)},
+    "overnight": {day: [{'start_time_local': time(22), 'end_time_local': time(2)}] for day in range(7)},
+    "midnight_end": {day: [{'start_time_local': time(18), 'end_time_local': time(0)}] for day in range(7)},
+    "weekdays": {day: [{'start_time_local': time(9), 'end_time_local': time(17)}] if day < 5 else [] for day in range(7)},
+}
+
+
+def _local_us(local_dt: datetime) -> int:
+    return uptime_kernel.to_epoch_us(local_dt.replace(tzinfo=timezone.utc))
+
+def _reference_local_to_utc_us(timezone_str: str, local_dt: datetime) -> int:
+    # fold=0: gap times take the offset before the gap, overlap times their first occurrence
+    return uptime_kernel.to_epoch_us(local_dt.replace(tzinfo=get_timezone(timezone_str)).astimezone(timezone.utc))
+
+def _every_quarter_hour_around(night: datetime) -> list:
+    return [night - timedelta(days=1) + timedelta(minutes=15 * step) for step in range(3 * 24 * 4)]
+
+def _reference_business_intervals(timezone_str, menu_hours_data, period_start_utc, period_end_utc) -> list:
+    """
+    The original per-local-day loop, converting every interval end with zoneinfo.
+    """
+    zone = get_timezone(timezone_str)
+    intervals = []
+    local_date = period_start_utc.astimezone(zone).date() - timedelta(days=2)
+    while local_date <= period_end_utc.astimezone(zone).date() + timedelta(days=2):
+        for hours_interval in menu_hours_data[local_date.weekday()]:
+            start_time, end_time = hours_interval['start_time_local'], hours_interval['end_time_local']
+            end_date = local_date + timedelta(days=1) if start_time > end_time else local_date
+            start_utc = max(datetime.combine(local_date, start_time, tzinfo=zone).astimezone(timezone.utc), period_start_utc)
+            end_utc = min(datetime.combine(end_date, end_time, tzinfo=zone).astimezone(timezone.utc), period_end_utc)
+            if start_utc < end_utc:
+                intervals.append((start_utc, end_utc))
+        local_date += timedelta(days=1)
+
+    merged = []
+    for start_utc, end_utc in sorted(intervals):
+        if merged and start_utc <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end_utc))
+        else:
+            merged.append((start_utc, end_utc))
+    return merged
+
+
+@pytest.mark.parametrize("timezone_str,night", DST_NIGHTS)
+def test_local_to_utc_matches_zoneinfo(timezone_str, night):
+    local_times = _every_quarter_hour_around(night)
+    offset_table = get_offset_table(timezone_str, local_times[0].replace(tzinfo=timezone.utc), local_times[-1].replace(tzinfo=timezone.utc))
+    converted = local_to_utc_us(offset_table, [_local_us(local_dt) for local_dt in local_times]).tolist()
+    assert converted == [_reference_local_to_utc_us(timezone_str, local_dt) for local_dt in local_times]
+
+@pytest.mark.parametrize("timezone_str,night", DST_NIGHTS)
+def test_utc_offset_matches_zoneinfo(timezone_str, night):
+    instants_utc = [local_dt.replace(tzinfo=timezone.utc) for local_dt in _every_quarter_hour_around(night)]
+    offset_table = get_offset_table(timezone_str, instants_utc[0], instants_utc[-1])
+    offsets_us = utc_offset_us(offset_table, [uptime_kernel.to_epoch_us(instant) for instant in instants_utc]).tolist()
+    zone = get_timezone(timezone_str)
+    assert offsets_us == [int(instant.astimezone(zone).utcoffset().total_seconds()) * 1_000_000 for instant in instants_utc]
+
+@pytest.mark.parametrize("schedule", sorted(SCHEDULES))
+@pytest.mark.parametrize("timezone_str,night", DST_NIGHTS)
+def test_business_intervals_match_zoneinfo(timezone_str, night, schedule):
+    period_end_utc = (night + timedelta(days=2, hours=7, minutes=13)).replace(tzinfo=timezone.utc)
+    period_start_utc = period_end_utc - timedelta(days=7)
+    assert generate_report._get_all_utc_business_intervals_for_period(
+        get_timezone(timezone_str), SCHEDULES[schedule], period_start_utc, period_end_utc
+    ) == _reference_business_intervals(timezone_str, SCHEDULES[schedule], period_start_utc, period_end_utc)
+
+def test_local_segments_convert_like_the_offset_table():
+    night = datetime(2023, 11, 5)
+    span_start_utc, span_end_utc = (night - timedelta(days=1)).replace(tzinfo=timezone.utc), (night + timedelta(days=1)).replace(tzinfo=timezone.utc)
+    segments = get_local_offset_segments(["Europe/London", "Not/AZone", None], span_start_utc, span_end_utc)
+    assert segments["Not/AZone"] == segments[DEFAULT_TIMEZONE]
+
+    for timezone_str in ("Europe/London", DEFAULT_TIMEZONE):
+        offset_table = get_offset_table(timezone_str, span_start_utc, span_end_utc)
+        for local_dt in _every_quarter_hour_around(night):
+            local_us = _local_us(local_dt)
+            (offset_us,) = [offset_us for local_from_us, local_to_us, offset_us in segments[timezone_str] if local_from_us <= local_us < local_to_us]
+            assert local_us - offset_us == local_to_utc_us(offset_table, local_us), (timezone_str, local_dt)
+
+def test_tables_cover_spans_far_from_the_epoch():
+    offset_table = get_offset_table("America/Chicago", datetime(2031, 3, 1, tzinfo=timezone.utc), datetime(2031, 3, 20, tzinfo=timezone.utc))
+    local_dt = datetime(2031, 3, 9, 2, 30)
+    assert local_to_utc_us(offset_table, _local_us(local_dt)) == _reference_local_to_utc_us("America/Chicago", local_dt)
@@ -0,0 +1,105 @@
+"""
+Parity of the NumPy uptime/downtime kernel (UPTIME_KERNEL=numpy) with the original
+per-interval loop (UPTIME_KERNEL=python).
+"""
+import numpy as np
+import pytest
+
+from datetime import datetime, timedelta, timezone
+
+from business import uptime_kernel, generate_report
+from business.status_series import StatusSeries, EMPTY_STATUS_SERIES
+from business.report_rows import _get_reporting_periods
+
+from conftest import REPORT_END_UTC, FLEET_STORES, reference_window_minutes
+
+
+START_UTC = datetime(2023, 3, 10, 0, 0, tzinfo=timezone.utc)
+
+
+def _us(dt: datetime) -> int:
+    return uptime_kernel.to_epoch_us(dt)
+
+def _series(polls: list) -> StatusSeries:
+    return StatusSeries.from_arrays(
+        [_us(at) for at, _ in polls],
+        [uptime_kernel.to_status_code(status) for _, status in polls]
+    )
+
+def _kernel_minutes(polls: list, intervals: list, start_utc: datetime, end_utc: datetime) -> tuple:
+    series = _series(polls)
+    bh_starts, bh_ends = uptime_kernel.intervals_to_arrays(intervals)
+    return uptime_kernel.calculate_uptime_downtime(series.timestamps_us, series.codes, bh_starts, bh_ends, _us(start_utc), _us(end_utc))
+
+
+@pytest.mark.parametrize("store_id", sorted(FLEET_STORES))
+def test_numpy_kernel_matches_python_loop_for_every_window(fleet_polls, store_details, store_id):
+    polls = fleet_polls.get(store_id, [])
+    timezone_obj, menu_hours_data = store_details[store_id]
+    for period in _get_reporting_periods(REPORT_END_UTC):
+        relevant = [poll for poll in polls if poll[0] < period['start_utc']][-1:]
+        relevant += [poll for poll in polls if period['start_utc'] <= poll[0] < period['end_utc']]
+        numpy_minutes = generate_report._calculate_uptime_downtime_numpy(
+            _series(relevant), timezone_obj, menu_hours_data, period['start_utc'], period['end_utc']
+        )
+        python_minutes = reference_window_minutes(polls, store_details[store_id], period['start_utc'], period['end_utc'])
+        assert numpy_minutes == pytest.approx(python_minutes, abs=1e-6), period['name']
+
+def test_no_polls_counts_as_downtime():
+    end_utc = START_UTC + timedelta(hours=2)
+    intervals = [(START_UTC + timedelta(minutes=30), START_UTC + timedelta(minutes=90))]
+    assert _kernel_minutes([], intervals, START_UTC, end_utc) == (0.0, 60.0)
+
+def test_empty_status_series_and_no_business_hours():
+    uptime, downtime = uptime_kernel.calculate_uptime_downtime(
+        EMPTY_STATUS_SERIES.timestamps_us, EMPTY_STATUS_SERIES.codes,
+        np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+        _us(START_UTC), _us(START_UTC + timedelta(hours=1))
+    )
+    assert (uptime, downtime) == (0.0, 0.0)
+
+def test_poll_before_period_sets_opening_status_and_poll_at_end_is_ignored():
+    end_utc = START_UTC + timedelta(hours=1)
+    polls = [
+        (START_UTC - timedelta(days=1), True),
+        (START_UTC + timedelta(minutes=20), False),
+        (end_utc, True),
+    ]
+    intervals = [(START_UTC, end_utc)]
+    assert _kernel_minutes(polls, intervals, START_UTC, end_utc) == (20.0, 40.0)
+
+def test_poll_exactly_at_period_start_wins_over_earlier_status():
+    end_utc = START_UTC + timedelta(hours=1)
+    polls = [(START_UTC - timedelta(minutes=5), False), (START_UTC, True)]
+    assert _kernel_minutes(polls, [(START_UTC, end_utc)], START_UTC, end_utc) == (60.0, 0.0)
+
+def test_unknown_status_counts_as_neither():
+    end_utc = START_UTC + timedelta(hours=1)
+    polls = [(START_UTC, True), (START_UTC + timedelta(minutes=10), None), (START_UTC + timedelta(minutes=40), False)]
+    assert _kernel_minutes(polls, [(START_UTC, end_utc)], START_UTC, end_utc) == (10.0, 20.0)
+
+def test_gaps_between_polls_and_business_hours():
+    # Status holds across the gap in polls; only the business-hour parts count
+    end_utc = START_UTC + timedelta(hours=10)
+    polls = [(START_UTC + timedelta(hours=1), True), (START_UTC + timedelta(hours=7, minutes=15), False)]
+    intervals = [
+        (START_UTC + timedelta(hours=2), START_UTC + timedelta(hours=3)),
+        (START_UTC + timedelta(hours=7), START_UTC + timedelta(hours=8)),
+    ]
+    uptime, downtime = _kernel_minutes(polls, intervals, START_UTC, end_utc)
+    assert (uptime, downtime) == (75.0, 45.0)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_polls_and_intervals_match_python_loop(seed, store_details):
+    rng = np.random.default_rng(seed)
+    end_utc = START_UTC + timedelta(days=2)
+    poll_seconds = np.sort(rng.choice(np.arange(-3600, 2 * 86400 + 3600, 7), size=int(rng.integers(0, 60)), replace=False))
+    statuses = rng.choice([True, False, None], size=len(poll_seconds), p=[0.6, 0.3, 0.1])
+    polls = [(START_UTC + timedelta(seconds=int(seconds)), status) for seconds, status in zip(poll_seconds, statuses)]
+
+    # Any store's details: the loop and the kernel build the same business intervals from them
+    details = store_details[sorted(store_details)[seed % len(store_details)]]
+    expected = reference_window_minutes(polls, details, START_UTC, end_utc)
+    relevant = [poll for poll in polls if poll[0] < START_UTC][-1:] + [poll for poll in polls if START_UTC <= poll[0] < end_utc]
+    actual = generate_report._calculate_uptime_downtime_numpy(_series(relevant), *details, START_UTC, end_utc)
+    assert actual == pytest.approx(expected, abs=1e-6)